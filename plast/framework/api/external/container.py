@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import errors as _errors
+
+import gzip
+import hashlib
+import json
+import posixpath
+
+__all__ = [
+    "hash_member",
+    "resolve_images"
+]
+
+_INDEX_MEDIA_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json"
+)
+
+_NAME_ANNOTATIONS = (
+    "io.containerd.image.name",
+    "org.opencontainers.image.ref.name"
+)
+
+def _load_json(archive, name):
+    """
+    .. py:function:: _load_json(archive, name)
+
+    Loads a JSON document stored in an image archive.
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    :param name: name of the member
+    :type name: str
+
+    :return: decoded document, :code:`None` if the member does not exist
+    :rtype: dict
+    """
+
+    try:
+        member = archive.getmember(name)
+
+    except KeyError:
+        return None
+
+    try:
+        return json.loads(archive.extractfile(member).read().decode("utf-8"))
+
+    except (ValueError, UnicodeDecodeError):
+        raise _errors.MalformatedData("invalid JSON document <{}>".format(name))
+
+def _blob(digest):
+    """
+    .. py:function:: _blob(digest)
+
+    Renders the name of the member storing a blob in an OCI layout.
+
+    :param digest: digest of the blob (e.g. :code:`sha256:...`)
+    :type digest: str
+
+    :return: name of the member
+    :rtype: str
+    """
+
+    return posixpath.join("blobs", *digest.split(":", 1))
+
+def hash_member(archive, name, buffer_size=65536):
+    """
+    .. py:function:: hash_member(archive, name, buffer_size=65536)
+
+    Computes the SHA-256 digest of a member of an image archive once decompressed, standing for the diff ID of layer(s) whose image configuration is missing.
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    :param name: name of the member
+    :type name: str
+
+    :param buffer_size: size of the buffer
+    :type buffer_size: int
+
+    :return: digest of the member (e.g. :code:`sha256:...`)
+    :rtype: str
+    """
+
+    cipher = hashlib.sha256()
+
+    with archive.extractfile(name) as file:
+        compressed = (file.read(2) == b"\x1f\x8b")
+        file.seek(0)
+
+        if compressed:
+            file = gzip.GzipFile(fileobj=file)
+
+        while True:
+            data = file.read(buffer_size)
+
+            if not data:
+                break
+
+            cipher.update(data)
+
+    return "sha256:{}".format(cipher.hexdigest())
+
+def _load_diff_ids(archive, name):
+    """
+    .. py:function:: _load_diff_ids(archive, name)
+
+    Loads the diff ID(s) of the layer(s) of an image from its configuration, i.e. the digest(s) of the uncompressed layer(s), which do not depend on how the layer(s) are stored.
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    :param name: name of the member storing the image configuration
+    :type name: str
+
+    :return: list of diff ID(s), in layer order
+    :rtype: list
+    """
+
+    config = _load_json(archive, name) or {}
+    return config.get("rootfs", {}).get("diff_ids", [])
+
+def _resolve_docker(archive, manifest):
+    """
+    .. py:function:: _resolve_docker(archive, manifest)
+
+    Resolves the image(s) described by the :code:`manifest.json` file of a :code:`docker save` archive.
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    :param manifest: decoded :code:`manifest.json` file
+    :type manifest: list
+
+    :return: list of tuple(s) containing the name of an image and the list of its layer(s), as tuple(s) containing the diff ID of the layer (:code:`None` if unknown) and the name of the member storing it
+    :rtype: list
+    """
+
+    images = []
+
+    for entry in manifest:
+        identifiers = _load_diff_ids(archive, entry["Config"]) if entry.get("Config") else []
+        layers = [((identifiers[index] if index < len(identifiers) else None), name) for index, name in enumerate(entry.get("Layers", []))]
+
+        images.append(((entry.get("RepoTags") or [None])[0] or posixpath.splitext(posixpath.basename(entry.get("Config", "")))[0], layers))
+
+    return images
+
+def _resolve_oci(archive, index, name=None):
+    """
+    .. py:function:: _resolve_oci(archive, index, name=None)
+
+    Resolves the image(s) referenced by an OCI image index, walking through nested index(es).
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    :param index: decoded image index
+    :type index: dict
+
+    :param name: name inherited from the parent index, if any
+    :type name: str
+
+    :return: list of tuple(s) containing the name of an image and the list of its layer(s), as tuple(s) containing the diff ID of the layer (:code:`None` if unknown) and the name of the member storing it
+    :rtype: list
+    """
+
+    images = []
+
+    for descriptor in index.get("manifests", []):
+        annotations = descriptor.get("annotations") or {}
+        reference = next((annotations[key] for key in _NAME_ANNOTATIONS if key in annotations), name) or descriptor["digest"]
+        document = _load_json(archive, _blob(descriptor["digest"]))
+
+        if document is None:
+            continue
+
+        if descriptor.get("mediaType") in _INDEX_MEDIA_TYPES or "manifests" in document:
+            images += _resolve_oci(archive, document, name=reference)
+            continue
+
+        if descriptor.get("platform"):
+            reference = "{} ({}/{})".format(reference, descriptor["platform"].get("os"), descriptor["platform"].get("architecture"))
+
+        identifiers = (_load_diff_ids(archive, _blob(document["config"]["digest"])) if document.get("config", {}).get("digest") else [])
+        images.append((reference, [((identifiers[index] if index < len(identifiers) else None), _blob(layer["digest"])) for index, layer in enumerate(document.get("layers", []))]))
+
+    return images
+
+def resolve_images(archive):
+    """
+    .. py:function:: resolve_images(archive)
+
+    Resolves the image(s) stored in a :code:`docker save` or OCI layout archive, the :code:`manifest.json` file being preferred as it carries the repository tag(s).
+
+    :param archive: :code:`tarfile.TarFile` instance opened in random access mode
+    :type archive: class
+
+    Layer(s) are identified by their diff ID in both layout(s), so that a layer is keyed identically whether it is stored compressed (OCI blob) or not (:code:`docker save`).
+
+    :return: list of tuple(s) containing the name of an image and the list of its layer(s), as tuple(s) containing the diff ID of the layer (:code:`None` if unknown) and the name of the member storing it
+    :rtype: list
+
+    :raises MalformatedData: if the archive is not an image archive
+    """
+
+    manifest = _load_json(archive, "manifest.json")
+
+    if isinstance(manifest, list):
+        return _resolve_docker(archive, manifest)
+
+    index = _load_json(archive, "index.json")
+
+    if isinstance(index, dict):
+        return _resolve_oci(archive, index)
+
+    raise _errors.MalformatedData("neither manifest.json nor index.json found")
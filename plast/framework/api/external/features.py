@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+try:
+    import numpy
+
+except ImportError as exc:
+    _log.fault("Missing dependency <{0}>. Try <pip install {0}> or manually build the required module to fix the issue.".format(exc.name))
+
+__all__ = [
+    "compute_features",
+    "compute_file_features",
+    "entropy"
+]
+
+def entropy(histograms):
+    """
+    .. py:function:: entropy(histograms)
+
+    Computes the Shannon entropy from one or several byte histogram(s).
+
+    :param histograms: array of shape (..., 256) containing byte count(s)
+    :type histograms: numpy.ndarray
+
+    :return: array containing the entropy of each histogram, in bits per byte
+    :rtype: numpy.ndarray
+    """
+
+    totals = histograms.sum(axis=-1, keepdims=True)
+    probabilities = numpy.divide(histograms, totals, out=numpy.zeros(histograms.shape), where=(totals > 0))
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        entropies = -numpy.where(probabilities > 0, probabilities * numpy.log2(probabilities), 0.0).sum(axis=-1)
+
+    # Empty and single-symbol histogram(s) would otherwise be reported as -0.0.
+    return numpy.abs(entropies)
+
+def _block_histograms(data, block_size):
+    """
+    .. py:function:: _block_histograms(data, block_size)
+
+    Computes the byte histogram of every block of :code:`data`, the last block being possibly shorter. Full blocks are counted 256 at a time so that their offset(s) fit in a :code:`uint16` array, which bounds the temporary memory to a few times the size of 256 blocks whatever the size of :code:`data`.
+
+    :param data: bytes-like object
+    :type data: bytes
+
+    :param block_size: size of a block in bytes
+    :type block_size: int
+
+    :return: array of shape (number of blocks, 256) containing the byte count(s) of each block
+    :rtype: numpy.ndarray
+    """
+
+    data = numpy.frombuffer(data, dtype=numpy.uint8)
+    full = len(data) // block_size
+
+    histograms = numpy.zeros((-(-len(data) // block_size), 256), dtype=numpy.int64)
+
+    for first in range(0, full, 256):
+        rows = min(256, full - first)
+        offsets = (numpy.arange(rows, dtype=numpy.uint16) << 8)[:, numpy.newaxis] + data[first * block_size:(first + rows) * block_size].reshape(rows, block_size)
+
+        histograms[first:first + rows] = numpy.bincount(offsets.ravel(), minlength=(rows * 256)).reshape(rows, 256)
+
+    if len(data) % block_size:
+        histograms[-1] = numpy.bincount(data[full * block_size:], minlength=256)
+
+    return histograms
+
+def _render(histogram, blocks, block_size):
+    """
+    .. py:function:: _render(histogram, blocks, block_size)
+
+    Renders the features of a buffer as a dictionary.
+
+    :param histogram: array containing the byte count(s) of the whole buffer
+    :type histogram: numpy.ndarray
+
+    :param blocks: array containing the entropy of each block
+    :type blocks: numpy.ndarray
+
+    :param block_size: size of a block in bytes
+    :type block_size: int
+
+    :return: dictionary containing the histogram, the whole-buffer entropy and the block entropy statistics
+    :rtype: dict
+    """
+
+    return {
+        "histogram": histogram.tolist(),
+        "entropy": round(float(entropy(histogram)), 6),
+        "blocks": {
+            "size": block_size,
+            "count": len(blocks),
+            "minimum": round(float(blocks.min()), 6) if len(blocks) else 0.0,
+            "maximum": round(float(blocks.max()), 6) if len(blocks) else 0.0,
+            "mean": round(float(blocks.mean()), 6) if len(blocks) else 0.0,
+            "high": int((blocks >= _conf.PACKED_ENTROPY_THRESHOLD).sum())
+        }
+    }
+
+def compute_features(buffers, block_size=_conf.FEATURES_BLOCK_SIZE):
+    """
+    .. py:function:: compute_features(buffers, block_size=_conf.FEATURES_BLOCK_SIZE)
+
+    Computes the byte histogram, the Shannon entropy and the per-block entropy of several in-memory buffers, one buffer at a time so that the memory footprint does not grow with the size of the batch.
+
+    :param buffers: list of bytes-like object(s)
+    :type buffers: list
+
+    :param block_size: size of a block in bytes
+    :type block_size: int
+
+    :return: list of dictionaries containing the features of each buffer
+    :rtype: list
+    """
+
+    features = []
+
+    for buffer in buffers:
+        histograms = _block_histograms(buffer, block_size)
+        features.append(_render(histograms.sum(axis=0), entropy(histograms), block_size))
+
+    return features
+
+def compute_file_features(path, block_size=_conf.FEATURES_BLOCK_SIZE, buffer_size=(_conf.FEATURES_BLOCK_SIZE * 256)):
+    """
+    .. py:function:: compute_file_features(path, block_size=_conf.FEATURES_BLOCK_SIZE, buffer_size=(_conf.FEATURES_BLOCK_SIZE * 256))
+
+    Computes the byte histogram, the Shannon entropy and the per-block entropy of a file without loading it entirely in memory.
+
+    :param path: absolute path to the file
+    :type path: str
+
+    :param block_size: size of a block in bytes
+    :type block_size: int
+
+    :param buffer_size: size of the read buffer, must be a multiple of :code:`block_size`
+    :type buffer_size: int
+
+    :return: dictionary containing the features of the file
+    :rtype: dict
+    """
+
+    total = numpy.zeros(256, dtype=numpy.int64)
+    blocks = []
+
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(buffer_size)
+
+            if not data:
+                break
+
+            histograms = _block_histograms(data, block_size)
+
+            total += histograms.sum(axis=0)
+            blocks.append(entropy(histograms))
+
+    return _render(total, (numpy.concatenate(blocks) if blocks else numpy.zeros(0)), block_size)
@@ -3,6 +3,7 @@
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.logger import Logger as _log
 
+import fnmatch
 import glob
 import itertools
 import os
@@ -143,3 +144,41 @@ def enumerate_matching_files(directory, wildcard_patterns=None, mime_types=None,
                 feedback.add(item)
 
     return feedback
+
+def matches_patterns(target, wildcard_patterns=[]):
+    """
+    .. py:function:: matches_patterns(target, wildcard_patterns=[])
+
+    Tests whether a given file name matches one or more wildcard pattern(s).
+
+    :param target: name of the file to test
+    :type target: str
+
+    :param wildcard_patterns: list of wildcard pattern(s) as strings
+    :type wildcard_patterns: list
+
+    :return: :code:`True` if :code:`target` matches one or more of the given pattern(s), else :code:`False`
+    :rtype: bool
+    """
+
+    return any(fnmatch.fnmatch(target, pattern) for pattern in wildcard_patterns)
+
+def matches_mime_types(target, mime_types=[]):
+    """
+    .. py:function:: matches_mime_types(target, mime_types=[])
+
+    Tests whether a given file matches one or more MIME-type(s).
+
+    :param target: absolute path to the file to test
+    :type target: str
+
+    :param mime_types: list of MIME-type(s) as strings
+    :type mime_types: list
+
+    :return: :code:`True` if :code:`target` matches one or more of the given MIME-type(s), else :code:`False`
+    :rtype: bool
+    """
+
+    meta = guess_file_type(target)
+
+    return bool(meta) and meta.mime in mime_types
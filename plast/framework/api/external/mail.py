@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts.logger import Logger as _log
+
+import hashlib
+import os.path
+
+__all__ = [
+    "iterate_attachments",
+    "render_attachments"
+]
+
+def iterate_attachments(message):
+    """
+    .. py:function:: iterate_attachments(message)
+
+    Iterates through the attachment(s) of a parsed message, including the one(s) of forwarded :code:`message/rfc822` part(s). Payloads are decoded exactly once.
+
+    :param message: :code:`email.message.Message` instance
+    :type message: class
+
+    :return: tuple containing the name of the attachment and its decoded payload
+    :rtype: tuple
+    """
+
+    for index, part in enumerate(message.walk()):
+        if part.is_multipart():
+            continue
+
+        name = part.get_filename()
+
+        if part.get_content_disposition() != "attachment" and not name:
+            continue
+
+        try:
+            payload = part.get_payload(decode=True)
+
+        except Exception:
+            _log.debug("Failed to decode the payload of attachment <{}>.".format(name))
+            continue
+
+        if payload is None:
+            continue
+
+        yield (os.path.basename(name.replace("\\", "/")) if name else None) or "attachment_{}".format(index), payload
+
+def render_attachments(message):
+    """
+    .. py:function:: render_attachments(message)
+
+    Extracts the attachment(s) of a parsed message along with their SHA-256 digest, meant to be called from concurrent process(es) so that deduplication does not require hashing in the main process.
+
+    :param message: :code:`email.message.Message` instance
+    :type message: class
+
+    :return: list of tuple(s) containing the name, the hexadecimal SHA-256 digest and the payload of each attachment
+    :rtype: list
+    """
+
+    return [(name, hashlib.sha256(payload).hexdigest(), payload) for name, payload in iterate_attachments(message)]
@@ -0,0 +1,682 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import errors as _errors
+from framework.contexts.logger import Logger as _log
+
+import collections
+import re
+import socket
+import struct
+import zlib
+
+__all__ = [
+    "Reassembler",
+    "carve_http_bodies",
+    "decode_tcp_segment",
+    "iterate_packets",
+    "render_flow"
+]
+
+_PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9)
+}
+
+_PCAPNG_SECTION = b"\x0a\x0d\x0d\x0a"
+
+_ETHERTYPES = {
+    0x0800: socket.AF_INET,
+    0x86DD: socket.AF_INET6
+}
+
+_IPV6_EXTENSIONS = {0, 43, 51, 60}
+
+_HTTP_START = re.compile(rb"(?:HTTP/1\.[01] \d{3}[^\r\n]*|[A-Z]{3,7} [^ \r\n]+ HTTP/1\.[01])\r\n")
+
+def _iterate_pcap(file, header):
+    """
+    .. py:function:: _iterate_pcap(file, header)
+
+    Iterates through the record(s) of a classic pcap capture.
+
+    :param file: file-like object positioned right after the magic number
+    :type file: class
+
+    :param header: magic number of the capture
+    :type header: bytes
+
+    :return: tuple containing the timestamp, the link type and the data of the current packet
+    :rtype: tuple
+    """
+
+    order, resolution = _PCAP_MAGICS[header]
+    linktype = struct.unpack(order + "I", file.read(20)[16:20])[0] & 0x0FFFFFFF
+    record = struct.Struct(order + "IIII")
+
+    while True:
+        data = file.read(16)
+
+        if len(data) < 16:
+            return
+
+        seconds, fraction, length, _ = record.unpack(data)
+        packet = file.read(length)
+
+        if len(packet) < length:
+            _log.warning("Truncated record found at the end of the capture. Ignoring record.")
+            return
+
+        yield seconds + fraction * resolution, linktype, packet
+
+def _parse_resolution(options, order):
+    """
+    .. py:function:: _parse_resolution(options, order)
+
+    Retrieves the timestamp resolution from the option(s) of a pcapng interface description block.
+
+    :param options: raw option(s) of the block
+    :type options: bytes
+
+    :param order: byte order of the section
+    :type order: str
+
+    :return: duration of a timestamp unit in seconds
+    :rtype: float
+    """
+
+    offset = 0
+
+    while offset + 4 <= len(options):
+        code, length = struct.unpack_from(order + "HH", options, offset)
+
+        if code == 0:
+            break
+
+        if code == 9 and length >= 1:
+            value = options[offset + 4]
+            return (2 ** -(value & 0x7F)) if value & 0x80 else (10 ** -value)
+
+        offset += 4 + ((length + 3) & ~3)
+
+    return 1e-6
+
+def _iterate_pcapng(file):
+    """
+    .. py:function:: _iterate_pcapng(file)
+
+    Iterates through the packet block(s) of a pcapng capture, section(s) and interface(s) being tracked along the way.
+
+    :param file: file-like object positioned at the beginning of the capture
+    :type file: class
+
+    :return: tuple containing the timestamp, the link type and the data of the current packet
+    :rtype: tuple
+    """
+
+    order, interfaces = "<", []
+
+    while True:
+        header = file.read(8)
+
+        if len(header) < 8:
+            return
+
+        if header[:4] == _PCAPNG_SECTION:
+            magic = file.read(4)
+            order = ("<" if magic == b"\x4d\x3c\x2b\x1a" else ">")
+            interfaces = []
+
+        length = struct.unpack(order + "I", header[4:])[0]
+
+        if length < 12 or length % 4:
+            raise _errors.MalformatedData("invalid block length <{}>".format(length))
+
+        body = (magic + file.read(length - 12) if header[:4] == _PCAPNG_SECTION else file.read(length - 8))
+
+        kind = struct.unpack(order + "I", header[:4])[0]
+
+        if kind == 1:
+            interfaces.append((struct.unpack_from(order + "H", body, 0)[0], _parse_resolution(body[8:-4], order)))
+
+        elif kind == 6:
+            interface, high, low, length = struct.unpack_from(order + "IIII", body, 0)
+            linktype, resolution = interfaces[interface]
+
+            yield ((high << 32) | low) * resolution, linktype, body[20:20 + length]
+
+        elif kind == 3 and interfaces:
+            length = min(struct.unpack_from(order + "I", body, 0)[0], len(body) - 8)
+
+            yield None, interfaces[0][0], body[4:4 + length]
+
+        elif kind == 2:
+            interface, _, high, low, length = struct.unpack_from(order + "HHIII", body, 0)
+            linktype, resolution = interfaces[interface]
+
+            yield ((high << 32) | low) * resolution, linktype, body[20:20 + length]
+
+def iterate_packets(file):
+    """
+    .. py:function:: iterate_packets(file)
+
+    Iterates through the packet(s) of a pcap or pcapng capture without loading it in memory.
+
+    :param file: file-like object opened in binary mode
+    :type file: class
+
+    :return: tuple containing the timestamp (:code:`None` if unknown), the link type and the data of the current packet
+    :rtype: tuple
+
+    :raises MalformatedData: if :code:`file` is not a pcap or pcapng capture
+    """
+
+    header = file.read(4)
+
+    if header in _PCAP_MAGICS:
+        yield from _iterate_pcap(file, header)
+
+    elif header == _PCAPNG_SECTION:
+        file.seek(-4, 1)
+        yield from _iterate_pcapng(file)
+
+    else:
+        raise _errors.MalformatedData("unknown capture format")
+
+def _decode_link(linktype, packet):
+    """
+    .. py:function:: _decode_link(linktype, packet)
+
+    Strips the link layer of a packet.
+
+    :param linktype: link type of the capture
+    :type linktype: int
+
+    :param packet: data of the packet
+    :type packet: bytes
+
+    :return: tuple containing the address family and the offset of the network layer, :code:`None` if unsupported
+    :rtype: tuple
+    """
+
+    if linktype == 1:
+        offset, ethertype = 14, int.from_bytes(packet[12:14], "big")
+
+        while ethertype in (0x8100, 0x88A8):
+            offset, ethertype = offset + 4, int.from_bytes(packet[offset + 2:offset + 4], "big")
+
+        return (_ETHERTYPES[ethertype], offset) if ethertype in _ETHERTYPES else None
+
+    if linktype in (101, 12, 228, 229):
+        return ({4: socket.AF_INET, 6: socket.AF_INET6}.get(packet[0] >> 4), 0) if packet else None
+
+    if linktype == 113:
+        ethertype = int.from_bytes(packet[14:16], "big")
+        return (_ETHERTYPES[ethertype], 16) if ethertype in _ETHERTYPES else None
+
+    if linktype == 276:
+        ethertype = int.from_bytes(packet[0:2], "big")
+        return (_ETHERTYPES[ethertype], 20) if ethertype in _ETHERTYPES else None
+
+    if linktype == 0:
+        family = int.from_bytes(packet[0:4], "little")
+        family = (family if family < 0x10000 else int.from_bytes(packet[0:4], "big"))
+
+        return (socket.AF_INET if family == 2 else socket.AF_INET6, 4) if family in (2, 24, 28, 30) else None
+
+    return None
+
+def decode_tcp_segment(linktype, packet):
+    """
+    .. py:function:: decode_tcp_segment(linktype, packet)
+
+    Decodes the IPv4 or IPv6 TCP segment carried by a packet. Fragmented datagram(s) are ignored.
+
+    :param linktype: link type of the capture
+    :type linktype: int
+
+    :param packet: data of the packet
+    :type packet: bytes
+
+    :return: tuple containing the flow key, the sequence number, the TCP flag(s) and the payload of the segment, :code:`None` if the packet does not carry TCP
+    :rtype: tuple
+    """
+
+    link = _decode_link(linktype, packet)
+
+    if not link or link[0] is None:
+        return None
+
+    family, offset = link
+    packet = memoryview(packet)
+
+    if family == socket.AF_INET:
+        if len(packet) < offset + 20 or packet[offset + 9] != 6 or int.from_bytes(packet[offset + 6:offset + 8], "big") & 0x3FFF:
+            return None
+
+        total = int.from_bytes(packet[offset + 2:offset + 4], "big")
+        end = (offset + total if total else len(packet))
+        source, destination = bytes(packet[offset + 12:offset + 16]), bytes(packet[offset + 16:offset + 20])
+        offset += (packet[offset] & 0x0F) * 4
+
+    else:
+        if len(packet) < offset + 40:
+            return None
+
+        protocol, end = packet[offset + 6], offset + 40 + int.from_bytes(packet[offset + 4:offset + 6], "big")
+        source, destination = bytes(packet[offset + 8:offset + 24]), bytes(packet[offset + 24:offset + 40])
+        offset += 40
+
+        while protocol in _IPV6_EXTENSIONS and len(packet) >= offset + 8:
+            protocol, offset = packet[offset], offset + ((packet[offset + 1] + 2) * 4 if protocol == 51 else (packet[offset + 1] + 1) * 8)
+
+        if protocol != 6:
+            return None
+
+    if len(packet) < offset + 20:
+        return None
+
+    sport, dport, sequence = struct.unpack_from("!HHI", packet, offset)
+    flags = packet[offset + 13]
+
+    return (family, source, sport, destination, dport), sequence, flags, bytes(packet[offset + (packet[offset + 12] >> 4) * 4:min(end, len(packet))])
+
+def render_flow(key):
+    """
+    .. py:function:: render_flow(key)
+
+    Renders the 5-tuple of a flow.
+
+    :param key: flow key returned by :code:`decode_tcp_segment`
+    :type key: tuple
+
+    :return: dictionary containing the protocol, the source and destination address(es) and port(s) of the flow
+    :rtype: dict
+    """
+
+    family, source, sport, destination, dport = key
+
+    return {
+        "protocol": "tcp",
+        "source": socket.inet_ntop(family, source),
+        "source_port": sport,
+        "destination": socket.inet_ntop(family, destination),
+        "destination_port": dport
+    }
+
+class _Stream:
+    """One direction of a TCP connection being reassembled."""
+
+    __slots__ = ("next", "data", "offset", "pending", "first", "last", "gaps")
+
+    def __init__(self, timestamp):
+        """
+        .. py:function:: __init__(self, timestamp)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param timestamp: capture time of the first segment
+        :type timestamp: float
+        """
+
+        self.next = None
+        self.data = bytearray()
+        self.offset = 0
+        self.pending = {}
+        self.first = self.last = timestamp
+        self.gaps = 0
+
+class Reassembler:
+    """Reassembles TCP stream(s) using bounded per-flow buffer(s), evicting idle flow(s)."""
+
+    def __init__(self, max_flows, buffer_size, overlap, idle_timeout, max_pending):
+        """
+        .. py:function:: __init__(self, max_flows, buffer_size, overlap, idle_timeout, max_pending)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param max_flows: maximum number of stream(s) reassembled concurrently, the least recently active one being evicted first
+        :type max_flows: int
+
+        :param buffer_size: maximum size of a stream buffer, full buffer(s) being flushed as is
+        :type buffer_size: int
+
+        :param overlap: number of trailing byte(s) kept from a flushed buffer so that patterns spanning two buffers can still match
+        :type overlap: int
+
+        :param idle_timeout: number of second(s) of capture time after which an inactive stream is evicted
+        :type idle_timeout: float
+
+        :param max_pending: maximum number of out-of-order segment(s) held per stream
+        :type max_pending: int
+        """
+
+        self.streams = collections.OrderedDict()
+        self.max_flows = max_flows
+        self.buffer_size = buffer_size
+        self.overlap = overlap
+        self.idle_timeout = idle_timeout
+        self.max_pending = max_pending
+        self.clock = 0.0
+
+    def _render(self, key, stream):
+        """
+        .. py:function:: _render(self, key, stream)
+
+        Renders a stream buffer along with its context.
+
+        :param self: current class instance
+        :type self: class
+
+        :param key: flow key of the stream
+        :type key: tuple
+
+        :param stream: :code:`_Stream` instance
+        :type stream: class
+
+        :return: tuple containing the flow key, the data of the buffer and its context
+        :rtype: tuple
+        """
+
+        context = render_flow(key)
+        context.update({
+            "offset": stream.offset,
+            "first_seen": stream.first,
+            "last_seen": stream.last,
+            "gaps": stream.gaps
+        })
+
+        return key, bytes(stream.data), context
+
+    def _append(self, key, stream, payload):
+        """
+        .. py:function:: _append(self, key, stream, payload)
+
+        Appends in-order data to a stream, flushing its buffer whenever it is full.
+
+        :param self: current class instance
+        :type self: class
+
+        :param key: flow key of the stream
+        :type key: tuple
+
+        :param stream: :code:`_Stream` instance
+        :type stream: class
+
+        :param payload: in-order data
+        :type payload: bytes
+
+        :return: flushed buffer(s)
+        :rtype: tuple
+        """
+
+        stream.next = (stream.next + len(payload)) & 0xFFFFFFFF
+        stream.data += payload
+
+        while len(stream.data) >= self.buffer_size:
+            yield self._render(key, stream)
+
+            kept = min(self.overlap, len(stream.data))
+            stream.offset += len(stream.data) - kept
+            del stream.data[:len(stream.data) - kept]
+
+    def _evict(self, key):
+        """
+        .. py:function:: _evict(self, key)
+
+        Removes a stream and flushes its remaining data.
+
+        :param self: current class instance
+        :type self: class
+
+        :param key: flow key of the stream
+        :type key: tuple
+
+        :return: remaining buffer, if any
+        :rtype: tuple
+        """
+
+        stream = self.streams.pop(key, None)
+
+        if stream and len(stream.data) > (self.overlap if stream.offset else 0):
+            yield self._render(key, stream)
+
+    def feed(self, timestamp, key, sequence, flags, payload):
+        """
+        .. py:function:: feed(self, timestamp, key, sequence, flags, payload)
+
+        Processes a TCP segment.
+
+        :param self: current class instance
+        :type self: class
+
+        :param timestamp: capture time of the segment, :code:`None` if unknown
+        :type timestamp: float
+
+        :param key: flow key of the segment
+        :type key: tuple
+
+        :param sequence: sequence number of the segment
+        :type sequence: int
+
+        :param flags: TCP flag(s) of the segment
+        :type flags: int
+
+        :param payload: data of the segment
+        :type payload: bytes
+
+        :return: tuple containing the flow key, the data and the context of each flushed buffer
+        :rtype: tuple
+        """
+
+        self.clock = (timestamp if timestamp is not None else self.clock)
+        stream = self.streams.get(key)
+
+        if stream is None:
+            if not payload and not flags & 0x02:
+                if flags & 0x04:
+                    yield from self._evict((key[0], key[3], key[4], key[1], key[2]))
+
+                return
+
+            stream = self.streams[key] = _Stream(self.clock)
+
+        else:
+            self.streams.move_to_end(key)
+
+        stream.last = self.clock
+
+        if flags & 0x02:
+            stream.next = (sequence + 1) & 0xFFFFFFFF
+
+        elif payload:
+            if stream.next is None:
+                stream.next = sequence
+
+            delta = (sequence - stream.next) & 0xFFFFFFFF
+            delta = (delta - 0x100000000 if delta & 0x80000000 else delta)
+
+            if delta < 0:
+                payload = payload[-delta:]
+
+            elif delta > 0:
+                if len(stream.pending) < self.max_pending:
+                    stream.pending[sequence] = payload
+                    payload = b""
+
+                else:
+                    stream.gaps += 1
+                    stream.pending.clear()
+                    stream.next = sequence
+
+            if payload:
+                yield from self._append(key, stream, payload)
+
+                while stream.next in stream.pending:
+                    yield from self._append(key, stream, stream.pending.pop(stream.next))
+
+        if flags & 0x05:
+            yield from self._evict(key)
+
+            if flags & 0x04:
+                yield from self._evict((key[0], key[3], key[4], key[1], key[2]))
+
+        while self.streams:
+            oldest, stream = next(iter(self.streams.items()))
+
+            if len(self.streams) <= self.max_flows and self.clock - stream.last <= self.idle_timeout:
+                break
+
+            yield from self._evict(oldest)
+
+    def flush(self):
+        """
+        .. py:function:: flush(self)
+
+        Flushes every remaining stream, typically at the end of the capture.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: tuple containing the flow key, the data and the context of each flushed buffer
+        :rtype: tuple
+        """
+
+        while self.streams:
+            yield from self._evict(next(iter(self.streams)))
+
+def _dechunk(data, offset):
+    """
+    .. py:function:: _dechunk(data, offset)
+
+    Decodes an HTTP body using the chunked transfer encoding.
+
+    :param data: data of the stream
+    :type data: bytes
+
+    :param offset: offset of the body in :code:`data`
+    :type offset: int
+
+    :return: tuple containing the decoded body and the offset of its end
+    :rtype: tuple
+    """
+
+    chunks = []
+
+    while True:
+        end = data.find(b"\r\n", offset)
+
+        if end < 0:
+            return b"".join(chunks), len(data)
+
+        try:
+            size = int(data[offset:end].split(b";", 1)[0].strip() or b"0", 16)
+
+        except ValueError:
+            return b"".join(chunks), end
+
+        if size == 0:
+            trailer = data.find(b"\r\n\r\n", end)
+            return b"".join(chunks), (trailer + 4 if trailer >= 0 else len(data))
+
+        chunks.append(data[end + 2:end + 2 + size])
+        offset = end + 4 + size
+
+def _decode_content(body, encoding, limit):
+    """
+    .. py:function:: _decode_content(body, encoding, limit)
+
+    Decompresses a gzip- or deflate-encoded HTTP body.
+
+    :param body: encoded body
+    :type body: bytes
+
+    :param encoding: value of the :code:`Content-Encoding` header
+    :type encoding: str
+
+    :param limit: maximum number of byte(s) to inflate
+    :type limit: int
+
+    :return: decoded body, :code:`None` if it cannot be decoded
+    :rtype: bytes
+    """
+
+    for wbits in ({"gzip": [31], "x-gzip": [31], "deflate": [15, -15]}.get(encoding) or []):
+        try:
+            return zlib.decompressobj(wbits).decompress(body, limit)
+
+        except zlib.error:
+            continue
+
+    return None
+
+def carve_http_bodies(data, limit):
+    """
+    .. py:function:: carve_http_bodies(data, limit)
+
+    Carves the body of the HTTP/1.x message(s) found in a reassembled stream, honoring the :code:`Content-Length`, :code:`Transfer-Encoding` and :code:`Content-Encoding` header(s).
+
+    :param data: data of the stream
+    :type data: bytes
+
+    :param limit: maximum number of byte(s) to inflate per body
+    :type limit: int
+
+    :return: tuple containing the index of the message in the stream, the raw size and the decoded data of the body
+    :rtype: tuple
+    """
+
+    offset, index = 0, 0
+
+    while True:
+        start = _HTTP_START.search(data, offset)
+
+        if not start:
+            return
+
+        end = data.find(b"\r\n\r\n", start.end() - 2)
+
+        if end < 0:
+            return
+
+        headers = {}
+
+        for line in data[start.end():end].split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        offset = end + 4
+
+        if b"chunked" in headers.get(b"transfer-encoding", b""):
+            body, offset = _dechunk(data, offset)
+
+        elif headers.get(b"content-length", b"").isdigit():
+            body = data[offset:offset + int(headers[b"content-length"])]
+            offset += len(body)
+
+        elif data.startswith(b"HTTP/", start.start()):
+            following = _HTTP_START.search(data, offset)
+            body = data[offset:(following.start() if following else len(data))]
+            offset += len(body)
+
+        else:
+            body = b""
+
+        if body:
+            raw = len(body)
+            encoding = headers.get(b"content-encoding", b"identity").decode("ascii", "replace")
+
+            if encoding != "identity":
+                body = _decode_content(body, encoding, limit)
+
+            if body:
+                yield index, raw, body
+
+        index += 1
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import errors as _errors
+from framework.contexts.logger import Logger as _log
+
+import codecs
+import struct
+
+__all__ = [
+    "decompress_vba",
+    "iterate_vba_modules",
+    "parse_ole10native"
+]
+
+def decompress_vba(data):
+    """
+    .. py:function:: decompress_vba(data)
+
+    Decompresses a VBA container compressed using the MS-OVBA run-length algorithm, stopping at the first chunk bearing an invalid signature (e.g. stream padding).
+
+    :param data: compressed container, starting with its signature byte
+    :type data: bytes
+
+    :return: decompressed data
+    :rtype: bytes
+
+    :raises MalformatedData: if :code:`data` is not a compressed container
+    """
+
+    if not data or data[0] != 0x01:
+        raise _errors.MalformatedData("invalid compressed container signature")
+
+    output, position = bytearray(), 1
+
+    while position + 2 <= len(data):
+        header = int.from_bytes(data[position:position + 2], "little")
+
+        if (header >> 12) & 0x7 != 0x3:
+            break
+
+        end = min(position + (header & 0x0FFF) + 3, len(data))
+        position += 2
+
+        if not header & 0x8000:
+            output += data[position:position + 4096]
+            position = end
+            continue
+
+        start = len(output)
+
+        while position < end:
+            flags = data[position]
+            position += 1
+
+            for bit in range(8):
+                if position >= end:
+                    break
+
+                if not flags & (1 << bit):
+                    output.append(data[position])
+                    position += 1
+                    continue
+
+                token = int.from_bytes(data[position:position + 2], "little")
+                position += 2
+
+                count = max((len(output) - start - 1).bit_length(), 4)
+                length = (token & (0xFFFF >> count)) + 3
+                source = len(output) - ((token >> (16 - count)) + 1)
+
+                if source < start:
+                    raise _errors.MalformatedData("copy token pointing before the current chunk")
+
+                if source + length <= len(output):
+                    output += output[source:source + length]
+
+                else:
+                    for index in range(length):
+                        output.append(output[source + index])
+
+    return bytes(output)
+
+def _iterate_records(data):
+    """
+    .. py:function:: _iterate_records(data)
+
+    Iterates through the record(s) of a decompressed VBA :code:`dir` stream.
+
+    :param data: decompressed :code:`dir` stream
+    :type data: bytes
+
+    :return: tuple containing the identifier and the data of the current record
+    :rtype: tuple
+    """
+
+    position = 0
+
+    while position + 6 <= len(data):
+        identifier, size = struct.unpack_from("<HI", data, position)
+
+        if identifier == 0x0009:
+            size = 6
+
+        yield identifier, data[position + 6:position + 6 + size]
+        position += 6 + size
+
+def iterate_vba_modules(ole, storage):
+    """
+    .. py:function:: iterate_vba_modules(ole, storage)
+
+    Iterates through the source code of the module(s) of a VBA project, as described by its :code:`dir` stream.
+
+    :param ole: :code:`olefile.OleFileIO` instance
+    :type ole: class
+
+    :param storage: path to the :code:`VBA` storage, as a list of entry name(s)
+    :type storage: list
+
+    :return: tuple containing the name of the module, the size of its compressed source and its decompressed source
+    :rtype: tuple
+    """
+
+    codepage, module = "cp1252", {}
+
+    for identifier, data in _iterate_records(decompress_vba(ole.openstream(storage + ["dir"]).read())):
+        if identifier == 0x0003:
+            try:
+                codepage = codecs.lookup("cp{}".format(int.from_bytes(data[:2], "little"))).name
+
+            except LookupError:
+                codepage = "latin-1"
+
+        elif identifier == 0x0019:
+            module = {"name": data.decode(codepage, "replace")}
+
+        elif identifier == 0x0047:
+            module["name"] = data.decode("utf-16-le", "replace")
+
+        elif identifier == 0x001A:
+            module["stream"] = data.decode(codepage, "replace")
+
+        elif identifier == 0x0032:
+            module["stream"] = data.decode("utf-16-le", "replace")
+
+        elif identifier == 0x0031:
+            module["offset"] = int.from_bytes(data[:4], "little")
+
+        elif identifier == 0x002B and "stream" in module:
+            try:
+                stream = ole.openstream(storage + [module["stream"]]).read()
+                yield module["name"], len(stream), decompress_vba(stream[module.get("offset", 0):])
+
+            except (OSError, _errors.MalformatedData) as exc:
+                _log.debug("Failed to decompress the source of VBA module <{}>: {}.".format(module["name"], exc))
+
+            module = {}
+
+def parse_ole10native(data):
+    """
+    .. py:function:: parse_ole10native(data)
+
+    Extracts the file embedded in an :code:`Ole10Native` stream (i.e. an OLE Package object).
+
+    :param data: content of the stream
+    :type data: bytes
+
+    :return: tuple containing the name and the content of the embedded file
+    :rtype: tuple
+
+    :raises MalformatedData: if :code:`data` cannot be parsed
+    """
+
+    try:
+        position = 6
+        label_end = data.index(b"\x00", position)
+        path_end = data.index(b"\x00", label_end + 1)
+
+        position = path_end + 1 + 4
+        length = int.from_bytes(data[position:position + 4], "little")
+        position += 4 + length
+
+        size = int.from_bytes(data[position:position + 4], "little")
+        position += 4
+
+    except ValueError:
+        raise _errors.MalformatedData("unterminated Ole10Native header string")
+
+    if position + size > len(data):
+        raise _errors.MalformatedData("Ole10Native payload exceeding the stream")
+
+    name = (data[label_end + 1:path_end] or data[6:label_end]).decode("latin-1").replace("\\", "/").rsplit("/", 1)[-1]
+
+    return name or "ole10native", data[position:position + size]
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import errors as _errors
+
+import base64
+import binascii
+import re
+import zlib
+
+__all__ = [
+    "decode_stream",
+    "is_encrypted",
+    "iterate_streams",
+    "parse_filters"
+]
+
+_ABBREVIATIONS = {
+    "A85": "ASCII85Decode",
+    "AHx": "ASCIIHexDecode",
+    "Fl": "FlateDecode"
+}
+
+_HEADER = re.compile(rb"(\d{1,10})\s+(\d{1,5})\s+obj\b")
+_KEYWORD = re.compile(rb"(?<!end)stream(?:\r\n|\n|\r)")
+_LENGTH = re.compile(rb"/Length\s+(\d+)(?!\s+\d+\s+R)")
+_FILTER = re.compile(rb"/Filter\s*(\[[^\]]*\]|/[^\s/\[\]<>()]+)")
+_NAME = re.compile(rb"/([^\s/\[\]<>()]+)")
+_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_ENCRYPT = re.compile(rb"/Encrypt\s*(?:\d+\s+\d+\s+R|<<)")
+
+_DICTIONARY_WINDOW = 4096
+_INFLATE_CHUNK_SIZE = 65536
+
+def _unescape(name):
+    """
+    .. py:function:: _unescape(name)
+
+    Resolves the :code:`#xx` hexadecimal escape sequence(s) of a PDF name (e.g. :code:`Fl#61teDecode`).
+
+    :param name: raw name
+    :type name: bytes
+
+    :return: resolved name
+    :rtype: bytes
+    """
+
+    return _ESCAPE.sub(lambda match: bytes([int(match.group(1), 16)]), name)
+
+def is_encrypted(data):
+    """
+    .. py:function:: is_encrypted(data)
+
+    Tests whether a PDF document references an encryption dictionary, in which case its stream(s) cannot be decoded.
+
+    :param data: content of the document
+    :type data: bytes
+
+    :return: :code:`True` if the document is encrypted, else :code:`False`
+    :rtype: bool
+    """
+
+    return _ENCRYPT.search(data) is not None
+
+def parse_filters(dictionary):
+    """
+    .. py:function:: parse_filters(dictionary)
+
+    Extracts the filter chain of a stream dictionary, resolving escaped and abbreviated filter name(s).
+
+    :param dictionary: raw stream dictionary
+    :type dictionary: bytes
+
+    :return: list of filter name(s), in decoding order
+    :rtype: list
+    """
+
+    match = _FILTER.search(_unescape(dictionary))
+
+    if not match:
+        return []
+
+    filters = [name.decode("latin-1") for name in _NAME.findall(match.group(1))]
+    return [_ABBREVIATIONS.get(name, name) for name in filters]
+
+def iterate_streams(data):
+    """
+    .. py:function:: iterate_streams(data)
+
+    Locates the stream object(s) of a PDF document with a single pass over its bytes, without parsing the object tree.
+
+    Each :code:`stream` keyword is bound to the closest preceding :code:`obj` header. The extent of the stream is taken from its direct :code:`/Length` entry when it is consistent with the position of the :code:`endstream` keyword, else from the position of the keyword itself.
+
+    :param data: content of the document
+    :type data: bytes
+
+    :return: tuple containing the object number and generation (:code:`None` if the header cannot be found), the raw stream dictionary and the start and end offset(s) of the raw stream data
+    :rtype: tuple
+    """
+
+    position = 0
+
+    while True:
+        keyword = _KEYWORD.search(data, position)
+
+        if not keyword:
+            return
+
+        start = keyword.end()
+        window = data[max(0, keyword.start() - _DICTIONARY_WINDOW):keyword.start()]
+        headers = list(_HEADER.finditer(window))
+
+        if headers:
+            number, generation = int(headers[-1].group(1)), int(headers[-1].group(2))
+            dictionary = window[headers[-1].end():]
+
+        else:
+            number, generation, dictionary = None, None, window
+
+        end = None
+        length = _LENGTH.search(dictionary)
+
+        if length:
+            end = start + int(length.group(1))
+
+            if data[end:end + 32].lstrip(b"\r\n \t\x00\x0c")[:9] != b"endstream":
+                end = None
+
+        if end is None:
+            end = data.find(b"endstream", start)
+
+            if end < 0:
+                end = len(data)
+
+            elif data[end - 2:end] == b"\r\n":
+                end -= 2
+
+            elif data[end - 1:end] in (b"\r", b"\n"):
+                end -= 1
+
+        yield number, generation, dictionary, start, end
+        position = max(end, start)
+
+def _inflate(data, limit):
+    """
+    .. py:function:: _inflate(data, limit)
+
+    Inflates a :code:`FlateDecode` stream, salvaging the data decoded before any corruption.
+
+    :param data: compressed stream
+    :type data: bytes
+
+    :param limit: maximum number of byte(s) to inflate
+    :type limit: int
+
+    :return: tuple containing the inflated data and whether it was truncated
+    :rtype: tuple
+    """
+
+    decompressor, output = zlib.decompressobj(), bytearray()
+
+    for offset in range(0, len(data), _INFLATE_CHUNK_SIZE):
+        try:
+            output += decompressor.decompress(data[offset:offset + _INFLATE_CHUNK_SIZE], limit - len(output) + 1)
+
+        except zlib.error:
+            if not output:
+                raise _errors.MalformatedData("corrupted FlateDecode stream")
+
+            break
+
+        if len(output) > limit or decompressor.unconsumed_tail:
+            return bytes(output[:limit]), True
+
+        if decompressor.eof:
+            break
+
+    return bytes(output), False
+
+def _ascii_hex(data, limit):
+    """
+    .. py:function:: _ascii_hex(data, limit)
+
+    Decodes an :code:`ASCIIHexDecode` stream.
+
+    :param data: encoded stream
+    :type data: bytes
+
+    :param limit: maximum number of byte(s) to decode
+    :type limit: int
+
+    :return: tuple containing the decoded data and whether it was truncated
+    :rtype: tuple
+    """
+
+    data = bytes(data).split(b">", 1)[0].translate(None, b" \t\r\n\x00\x0c")[:2 * limit + 1]
+
+    if len(data) % 2:
+        data += b"0"
+
+    try:
+        output = binascii.unhexlify(data)
+
+    except binascii.Error:
+        raise _errors.MalformatedData("invalid ASCIIHexDecode stream")
+
+    return output[:limit], len(output) > limit
+
+def _ascii85(data, limit):
+    """
+    .. py:function:: _ascii85(data, limit)
+
+    Decodes an :code:`ASCII85Decode` stream.
+
+    :param data: encoded stream
+    :type data: bytes
+
+    :param limit: maximum number of byte(s) to decode
+    :type limit: int
+
+    :return: tuple containing the decoded data and whether it was truncated
+    :rtype: tuple
+    """
+
+    data = bytes(data).split(b"~>", 1)[0].translate(None, b" \t\r\n\x00\x0c")
+
+    if data.startswith(b"<~"):
+        data = data[2:]
+
+    try:
+        output = base64.a85decode(data)
+
+    except ValueError:
+        raise _errors.MalformatedData("invalid ASCII85Decode stream")
+
+    return output[:limit], len(output) > limit
+
+_DECODERS = {
+    "ASCII85Decode": _ascii85,
+    "ASCIIHexDecode": _ascii_hex,
+    "FlateDecode": _inflate
+}
+
+def decode_stream(data, filters, limit):
+    """
+    .. py:function:: decode_stream(data, filters, limit)
+
+    Decodes a raw stream through its filter chain, never producing more than :code:`limit` byte(s) at any stage.
+
+    :param data: raw stream data
+    :type data: bytes
+
+    :param filters: list of filter name(s), in decoding order
+    :type filters: list
+
+    :param limit: maximum size of the decoded stream
+    :type limit: int
+
+    :return: tuple containing the decoded data and whether it was truncated
+    :rtype: tuple
+
+    :raises UnsupportedType: if a filter is not supported (e.g. image codecs)
+    :raises MalformatedData: if the stream cannot be decoded
+    """
+
+    truncated = False
+
+    for name in filters:
+        if name not in _DECODERS:
+            raise _errors.UnsupportedType(name)
+
+        data, clipped = _DECODERS[name](data, limit)
+        truncated = truncated or clipped
+
+    return data, truncated
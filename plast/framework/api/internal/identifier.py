@@ -1,109 +1,146 @@
 # -*- coding: utf-8 -*-
 
-from framework.contexts import errors as _errors
+from framework.api.external import filesystem as _fs
+
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.meta import Meta as _meta
 from framework.contexts.logger import Logger as _log
 
-import fnmatch
+import collections
+import os.path
 
 try:
-    import magic
+    import filetype
+    import yara
 
 except ImportError as exc:
     _log.fault("Missing dependency <{0}>. Try <pip install {0}> or manually build the required module to fix the issue.".format(exc.name))
 
 __all__ = [
-    "Checker"
+    "Identifier",
+    "Type"
 ]
 
+Type = collections.namedtuple("Type", ["mime", "extension", "trigger"])
+
 class Identifier:
     """File identifying class."""
 
+    rules = None
+
     @staticmethod
     def _iterate_signatures(directory=os.path.join(_meta.__root__, "framework", "signatures"), wildcard_patterns=_conf.YARA_EXTENSION_FILTERS):
-        for file in _fs.enumerate_matching_files(directory, wildcard_patterns=wildcard_patterns, recursive=True):
-            yield os.path.splitext(os.path.basename(file))[0], file
+        """
+        .. py:function:: _iterate_signatures(directory=os.path.join(_meta.__root__, "framework", "signatures"), wildcard_patterns=_conf.YARA_EXTENSION_FILTERS)
 
-    @staticmethod
-    def _matches_yara_signatures(evidence):
-        for ruleset in Identifier._iterate_signatures():
-            try:
-                rules = yara.compile(ruleset, includes=True, error_on_warning=True)
+        Iterates through the bundled signature ruleset(s).
 
-            except yara.SyntaxError:
-                _log.exception("Syntax error in YARA ruleset <{}>.".format(ruleset))
+        :param directory: absolute path to the signatures directory
+        :type directory: str
 
-    @staticmethod
-    def _matches_mime_types(self, evidence, types=[]):
+        :param wildcard_patterns: list of wildcard filter(s) to apply for the search
+        :type wildcard_patterns: list
+
+        :return: basename and absolute path to the current ruleset
+        :rtype: tuple
         """
-        .. py:function:: _matches_mime_types(self, evidence, types=[])
 
-        Tests wether a given file matches one or more MIME type(s).
+        for file in sorted(_fs.enumerate_matching_files(directory, wildcard_patterns=wildcard_patterns, recursive=True)):
+            yield os.path.splitext(os.path.basename(file))[0], file
 
-        :param evidence: name of the file to test
-        :type evidence: str
+    @staticmethod
+    def load_signatures():
+        """
+        .. py:function:: load_signatures()
 
-        :param types: list of MIME types rendered as strings
-        :type types: list
+        Compiles the bundled signature ruleset(s) once for the lifetime of the current process.
 
-        :return: True if the file matches one or more of the given MIME type(s), else False
-        :rtype: bool
+        :return: compiled YARA signature(s), :code:`None` if none could be compiled
+        :rtype: class
         """
 
-        mime = magic.Magic(mime=True)
+        if Identifier.rules is None:
+            try:
+                Identifier.rules = yara.compile(filepaths=dict(Identifier._iterate_signatures()), includes=False, error_on_warning=True)
+                _log.debug("Compiled identification signature(s) in process <{}>.".format(os.getpid()))
 
-        if mime.from_file(file) in types:
-            return True
+            except yara.Error:
+                _log.exception("Failed to compile the identification signature(s). Falling back to magic number(s) only.")
+                Identifier.rules = False
 
-        return False
+        return Identifier.rules or None
 
     @staticmethod
-    def _matches_patterns(evidence, wildcard_patterns=[]):
+    def identify_data(data):
         """
-        .. py:function:: _matches_patterns(evidence, wildcard_patterns=[])
+        .. py:function:: identify_data(data)
 
-        Tests whether a given file matches one or more wildcard pattern(s).
+        Identifies the type of an evidence from its header using the bundled signature(s), then :code:`filetype` as a fallback.
 
-        :param evidence: name of the file to test
-        :type evidence: str
+        The first matching signature wins, so more specific signature(s) must be declared before the generic one(s).
 
-        :param wildcard_patterns: list of wildcard patterns as strings
-        :type wildcard_patterns: list
+        :param data: first byte(s) of the evidence
+        :type data: bytes
 
-        :return: True if the file matches one or more of the given patterns, else False
-        :rtype: bool
+        :return: type of the evidence, :code:`None` if it cannot be identified
+        :rtype: class
         """
 
-        return any(fnmatch.fnmatch(file, pattern) for pattern in wildcard_patterns)
+        rules = Identifier.load_signatures()
+
+        if rules:
+            for match in rules.match(data=data, timeout=_conf.YARA_MATCH_TIMEOUT):
+                if "_mime" in match.meta or "_trigger" in match.meta:
+                    return Type(match.meta.get("_mime"), match.meta.get("_extension"), match.meta.get("_trigger"))
+
+        guess = filetype.guess(data)
+
+        if guess:
+            return Type(guess.mime, guess.extension, None)
+
+        return None
 
     @staticmethod
-    def _matches_extensions(evidence, extensions=[]):
+    def identify_evidence(evidence, header_size=_conf.IDENTIFICATION_HEADER_SIZE):
         """
-        .. py:function:: _matches_extensions(evidence, extensions=[])
+        .. py:function:: identify_evidence(evidence, header_size=_conf.IDENTIFICATION_HEADER_SIZE)
 
-        Tests whether a given file matches one or more extension(s).
+        Identifies the type of an evidence by reading its header only.
 
-        :param evidence: name of the file to test
+        :param evidence: absolute path to the evidence
         :type evidence: str
 
-        :param extensions: list of file extension(s)
-        :type extensions: list
+        :param header_size: number of byte(s) to read from the beginning of the evidence
+        :type header_size: int
 
-        :return: True if the file matches one or more of the given patterns, else False
-        :rtype: bool
+        :return: type of the evidence, :code:`None` if it cannot be identified
+        :rtype: class
         """
 
-        return any(evidence.lower().endswith(".{}".format(extension)) for extension in extensions)
+        try:
+            with open(evidence, "rb") as file:
+                return Identifier.identify_data(file.read(header_size))
+
+        except OSError:
+            _log.exception("Failed to read the header of evidence <{}>.".format(evidence))
+
+        except yara.Error:
+            _log.exception("YARA exception raised during identification of evidence <{}>.".format(evidence))
+
+        return None
 
     @staticmethod
-    def identify_evidence(self, evidence):
-        signature = self.
+    def identify_evidences(evidences):
+        """
+        .. py:function:: identify_evidences(evidences)
+
+        Identifies the type of a batch of evidence(s), meant to be mapped to concurrent process(es).
 
-        if not signature:
-            mime = self.get_mime_type(evidence)
+        :param evidences: list of absolute path(s) to the evidence(s)
+        :type evidences: list
 
-            if not mime:
-                raise _errors.UnknownType
+        :return: list of tuple(s) containing the absolute path to an evidence and its type
+        :rtype: list
+        """
 
-        return
+        return [(evidence, Identifier.identify_evidence(evidence)) for evidence in evidences]
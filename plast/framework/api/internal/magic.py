@@ -187,9 +187,9 @@ class OverrideConsoleLogging:
 class Pool:
     """Wrapper around :code:`multiprocessing.Pool` that automatically sets the :code:`SIGINT` signal handler and cleans up on error."""
 
-    def __init__(self, processes=(multiprocessing.cpu_count() or _conf.FALLBACK_PROCESSES)):
+    def __init__(self, processes=(multiprocessing.cpu_count() or _conf.FALLBACK_PROCESSES), initializer=None, initargs=()):
         """
-        .. py:function:: __init__(self, processes=(multiprocessing.cpu_count() or _conf.FALLBACK_PROCESSES))
+        .. py:function:: __init__(self, processes=(multiprocessing.cpu_count() or _conf.FALLBACK_PROCESSES), initializer=None, initargs=())
 
         Initialization method for the class.
 
@@ -198,10 +198,18 @@ class Pool:
 
         :param exception: number of concurrent process(es) to spawn
         :type exception: int
+
+        :param initializer: function to call once in every concurrent process after the signal handler is set
+        :type initializer: class
+
+        :param initargs: tuple containing the argument(s) to pass to :code:`initializer`
+        :type initargs: tuple
         """
 
         self.processes = processes
-        self.pool = multiprocessing.Pool(processes=self.processes, initializer=self.register_signal_hook)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pool = multiprocessing.Pool(processes=self.processes, initializer=self._initialize)
 
         _log.debug("Initialized pool of <{}> concurrent process(es).".format(self.processes))
 
@@ -252,6 +260,21 @@ class Pool:
         self.pool.terminate()
         self.pool.join()
 
+    def _initialize(self):
+        """
+        .. py:function:: _initialize(self)
+
+        Initializing method called once in every concurrent process spawned by :code:`multiprocessing.Pool`.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.register_signal_hook()
+
+        if self.initializer:
+            self.initializer(*self.initargs)
+
     def register_signal_hook(self):
         """
         .. py:function:: register_signal_hook(self)
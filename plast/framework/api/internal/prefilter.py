@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import re
+
+__all__ = [
+    "Prefilter"
+]
+
+class Prefilter:
+    """Derives cheap literal-based prefilter rules from YARA ruleset(s)."""
+
+    _header = re.compile(r"\b(?P<modifiers>(?:(?:private|global)\s+)*)rule\s+(?P<name>\w+)\s*(?::(?P<tags>[\w\s]*?))?\{")
+    _definition = re.compile(r"\$(?P<identifier>\w*)\s*=\s*")
+    _unsafe = re.compile(r"\b(?:or|not|for|none|defined|0\s+of)\b|[#@]|!(?!=)")
+    _reference = re.compile(r"\$\w*\*?|\bthem\b")
+    _quantifier = re.compile(r"\{(\d*)(?:,(\d*))?\}")
+
+    @staticmethod
+    def _mask(source):
+        """
+        .. py:function:: _mask(source)
+
+        Strips the comment(s) from :code:`source` and masks the content of every text string and regular expression.
+
+        :param source: YARA source code
+        :type source: str
+
+        :return: tuple containing the comment-free source and its masked representation, both of the same length
+        :rtype: tuple
+        """
+
+        clean, masked = [], []
+        index = 0
+
+        while index < len(source):
+            char = source[index]
+
+            if source.startswith("//", index):
+                end = source.find("\n", index)
+                end = len(source) if end == -1 else end
+
+                clean.append(" " * (end - index))
+                masked.append(" " * (end - index))
+                index = end
+
+            elif source.startswith("/*", index):
+                end = source.find("*/", index + 2)
+                end = len(source) if end == -1 else end + 2
+
+                clean.append(re.sub(r"[^\n]", " ", source[index:end]))
+                masked.append(re.sub(r"[^\n]", " ", source[index:end]))
+                index = end
+
+            elif char in "\"/":
+                end = index + 1
+
+                while end < len(source) and source[end] != char:
+                    end += 2 if source[end] == "\\" else 1
+
+                end = min(end, len(source) - 1)
+
+                clean.append(source[index:end + 1])
+                masked.append(char + "_" * (end - index - 1) + char)
+                index = end + 1
+
+            else:
+                clean.append(char)
+                masked.append(char)
+                index += 1
+
+        return "".join(clean), "".join(masked)
+
+    @staticmethod
+    def _split_rules(source):
+        """
+        .. py:function:: _split_rules(source)
+
+        Splits YARA source code into its rule(s).
+
+        :param source: YARA source code
+        :type source: str
+
+        :return: tuple containing the list of import directive(s), a flag set if the source includes other file(s) and the list of parsed rule(s)
+        :rtype: tuple
+        """
+
+        clean, masked = Prefilter._mask(source)
+
+        imports = re.findall(r"^\s*import\s+\"[^\"]+\"", clean, re.MULTILINE)
+        includes = bool(re.search(r"^\s*include\s+\"", masked, re.MULTILINE))
+        rules = []
+
+        for header in Prefilter._header.finditer(masked):
+            depth, end = 0, header.end() - 1
+
+            for end in range(header.end() - 1, len(masked)):
+                if masked[end] == "{":
+                    depth += 1
+
+                elif masked[end] == "}":
+                    depth -= 1
+
+                    if not depth:
+                        break
+
+            body = (header.end(), end)
+            section = {
+                "strings": masked.find("strings:", *body),
+                "condition": masked.find("condition:", *body)
+            }
+
+            rule = {
+                "name": header.group("name"),
+                "private": "private" in header.group("modifiers"),
+                "global": "global" in header.group("modifiers"),
+                "tags": (header.group("tags") or "").split(),
+                "source": clean[header.start():end + 1],
+                "condition": (masked[section["condition"] + len("condition:"):end] if section["condition"] != -1 else ""),
+                "strings": []
+            }
+
+            if section["strings"] != -1:
+                rule["strings"] = Prefilter._split_strings(clean, masked, section["strings"] + len("strings:"), (section["condition"] if section["condition"] != -1 else end))
+
+            rules.append(rule)
+
+        return imports, includes, rules
+
+    @staticmethod
+    def _split_strings(clean, masked, start, end):
+        """
+        .. py:function:: _split_strings(clean, masked, start, end)
+
+        Parses the string definition(s) found in the :code:`strings` section of a rule.
+
+        :param clean: comment-free source
+        :type clean: str
+
+        :param masked: masked representation of :code:`clean`
+        :type masked: str
+
+        :param start: start offset of the :code:`strings` section
+        :type start: int
+
+        :param end: end offset of the :code:`strings` section
+        :type end: int
+
+        :return: list of tuple(s) containing the type, value, flag(s) and modifier(s) of each string
+        :rtype: list
+        """
+
+        definitions = list(Prefilter._definition.finditer(masked, start, end))
+        strings = []
+
+        for index, definition in enumerate(definitions):
+            limit = (definitions[index + 1].start() if index + 1 < len(definitions) else end)
+            opening = definition.end()
+
+            if masked[opening] == "{":
+                closing = masked.find("}", opening, limit)
+                kind, flags = "hex", ""
+
+            else:
+                closing = masked.find(masked[opening], opening + 1, limit)
+                kind = ("text" if masked[opening] == "\"" else "regex")
+                flags = re.match(r"[is]*", clean[closing + 1:limit]).group(0) if kind == "regex" else ""
+
+            strings.append((
+                kind,
+                clean[opening + 1:closing],
+                flags,
+                re.findall(r"\w+(?:\([^)]*\))?", clean[closing + 1 + len(flags):limit])
+            ))
+
+        return strings
+
+    @staticmethod
+    def _decode_text(value):
+        """
+        .. py:function:: _decode_text(value)
+
+        Decodes the escape sequence(s) of a YARA text string.
+
+        :param value: raw content of the text string
+        :type value: str
+
+        :return: decoded representation of :code:`value`
+        :rtype: bytes
+        """
+
+        escapes = {"n": b"\n", "t": b"\t", "r": b"\r", "\"": b"\"", "\\": b"\\"}
+        data = bytearray()
+        index = 0
+
+        while index < len(value):
+            if value[index] == "\\" and index + 1 < len(value):
+                if value[index + 1] == "x":
+                    data += bytes.fromhex(value[index + 2:index + 4])
+                    index += 4
+                    continue
+
+                data += escapes.get(value[index + 1], value[index + 1].encode())
+                index += 2
+                continue
+
+            data += value[index].encode()
+            index += 1
+
+        return bytes(data)
+
+    @staticmethod
+    def _longest_hex_run(value):
+        """
+        .. py:function:: _longest_hex_run(value)
+
+        Retrieves the longest sequence of fixed byte(s) outside of any alternation in a hex string.
+
+        :param value: raw content of the hex string
+        :type value: str
+
+        :return: longest mandatory byte sequence
+        :rtype: bytes
+        """
+
+        tokens = re.findall(r"~?[0-9a-fA-F?]{2}|\[[^\]]*\]|[()|]", value)
+        runs, run, depth = [], bytearray(), 0
+
+        for token in tokens:
+            if depth == 0 and re.fullmatch(r"[0-9a-fA-F]{2}", token):
+                run.append(int(token, 16))
+                continue
+
+            runs.append(bytes(run))
+            run = bytearray()
+
+            depth += (token == "(") - (token == ")")
+
+        runs.append(bytes(run))
+        return max(runs, key=len)
+
+    @staticmethod
+    def _longest_regex_run(value):
+        """
+        .. py:function:: _longest_regex_run(value)
+
+        Retrieves the longest sequence of mandatory literal character(s) in a regular expression.
+
+        :param value: raw content of the regular expression
+        :type value: str
+
+        :return: longest mandatory literal sequence, :code:`None` if the expression features a top-level alternation
+        :rtype: bytes
+        """
+
+        escapes = {"n": 0x0a, "t": 0x09, "r": 0x0d, "f": 0x0c, "a": 0x07}
+        runs, run, depth, index = [], bytearray(), 0, 0
+
+        def _flush():
+            nonlocal run
+            runs.append(bytes(run))
+            run = bytearray()
+
+        while index < len(value):
+            char = value[index]
+            literal = None
+
+            if char == "\\" and index + 1 < len(value):
+                escaped = value[index + 1]
+                index += 2
+
+                if escaped == "x":
+                    literal = int(value[index:index + 2], 16)
+                    index += 2
+
+                elif escaped in escapes:
+                    literal = escapes[escaped]
+
+                elif not escaped.isalnum():
+                    literal = ord(escaped)
+
+            elif char == "[":
+                index += 1
+                index += value[index:index + 1] == "^"
+                index += value[index:index + 1] == "]"
+
+                while index < len(value) and value[index] != "]":
+                    index += 2 if value[index] == "\\" else 1
+
+                index += 1
+
+            elif char == "(":
+                depth += 1
+                index += 1
+
+            elif char == ")":
+                depth -= 1
+                index += 1
+
+            elif char == "|":
+                if not depth:
+                    return None
+
+                index += 1
+
+            elif char in ".^$":
+                index += 1
+
+            elif char in "*?+" or (char == "{" and Prefilter._quantifier.match(value, index)):
+                quantifier = Prefilter._quantifier.match(value, index)
+                optional = (char in "*?") or (quantifier and quantifier.group(1) in ("", "0"))
+
+                if optional and run:
+                    run.pop()
+
+                _flush()
+
+                index = quantifier.end() if quantifier else index + 1
+                index += value[index:index + 1] == "?"
+                continue
+
+            else:
+                literal = ord(char) if ord(char) < 0x80 else None
+                index += 1
+
+            if literal is not None and not depth:
+                run.append(literal)
+                continue
+
+            _flush()
+
+        _flush()
+        return max(runs, key=len)
+
+    @staticmethod
+    def _extract_atom(kind, value, flags, modifiers):
+        """
+        .. py:function:: _extract_atom(kind, value, flags, modifiers)
+
+        Extracts a literal atom that is guaranteed to be present whenever the given string matches.
+
+        :param kind: type of the string (:code:`text`, :code:`hex` or :code:`regex`)
+        :type kind: str
+
+        :param value: raw content of the string
+        :type value: str
+
+        :param flags: regular expression flag(s)
+        :type flags: str
+
+        :param modifiers: list of string modifier(s)
+        :type modifiers: list
+
+        :return: tuple containing the atom and its modifier(s), :code:`None` if no usable atom can be extracted
+        :rtype: tuple
+        """
+
+        if any(modifier.startswith("base64") for modifier in modifiers):
+            return None
+
+        kept = tuple(modifier for modifier in modifiers if modifier in ("ascii", "wide", "nocase") or modifier.startswith("xor"))
+
+        if kind == "text":
+            atom = Prefilter._decode_text(value)
+
+        elif kind == "hex":
+            atom = Prefilter._longest_hex_run(value)
+
+        else:
+            atom = Prefilter._longest_regex_run(value)
+
+            if "i" in flags and "nocase" not in kept:
+                kept += ("nocase",)
+
+        if not atom or len(atom) < _conf.YARA_PREFILTER_MINIMUM_ATOM_LENGTH:
+            return None
+
+        return atom, kept
+
+    @staticmethod
+    def extract_atoms(rule):
+        """
+        .. py:function:: extract_atoms(rule)
+
+        Extracts the literal atom(s) required by a rule, one per string.
+
+        At least one of the atom(s) is guaranteed to be present in any data matching the rule.
+
+        :param rule: rule as parsed by :code:`Prefilter.parse`
+        :type rule: dict
+
+        :return: list of tuple(s) containing each atom and its modifier(s), :code:`None` if the rule cannot be reduced to literal atom(s)
+        :rtype: list
+        """
+
+        if not rule["strings"] or Prefilter._unsafe.search(rule["condition"]) or not Prefilter._reference.search(rule["condition"]):
+            return None
+
+        atoms = [Prefilter._extract_atom(*string) for string in rule["strings"]]
+        return (None if None in atoms else atoms)
+
+    @staticmethod
+    def parse(ruleset):
+        """
+        .. py:function:: parse(ruleset)
+
+        Parses a YARA ruleset file.
+
+        :param ruleset: absolute path to the ruleset file
+        :type ruleset: str
+
+        :return: tuple containing the list of import directive(s), a flag set if the ruleset includes other file(s) and the list of parsed rule(s)
+        :rtype: tuple
+        """
+
+        with open(ruleset, encoding="utf-8", errors="replace") as file:
+            return Prefilter._split_rules(file.read())
+
+    @staticmethod
+    def find_references(ruleset, identifiers):
+        """
+        .. py:function:: find_references(ruleset, identifiers)
+
+        Retrieves the identifier(s) referenced by the condition(s) of a ruleset, ignoring their occurrence(s) in comment(s), string(s) and meta section(s).
+
+        Every identifier is considered referenced if the ruleset includes other file(s).
+
+        :param ruleset: absolute path to the ruleset file
+        :type ruleset: str
+
+        :param identifiers: list of identifier(s) to look for
+        :type identifiers: list
+
+        :return: set containing the referenced identifier(s)
+        :rtype: set
+        """
+
+        _, includes, rules = Prefilter.parse(ruleset)
+
+        if includes:
+            return set(identifiers)
+
+        return {identifier for identifier in identifiers if any(re.search(r"(?<![\w.$#@!]){}\b".format(re.escape(identifier)), rule["condition"]) for rule in rules)}
+
+    @staticmethod
+    def _render_atom(index, atom, modifiers):
+        """
+        .. py:function:: _render_atom(index, atom, modifiers)
+
+        Renders an atom as a YARA text string definition.
+
+        :param index: index of the atom in the prefilter rule
+        :type index: int
+
+        :param atom: literal atom
+        :type atom: bytes
+
+        :param modifiers: list of modifier(s) to apply
+        :type modifiers: list
+
+        :return: YARA string definition
+        :rtype: str
+        """
+
+        return "$a{} = \"{}\" {}".format(index, "".join("\\x{:02x}".format(byte) for byte in atom), " ".join(modifiers)).rstrip()
+
+    @staticmethod
+    def render(ruleset, tag=_conf.YARA_PREFILTER_TAG):
+        """
+        .. py:function:: render(ruleset, tag=_conf.YARA_PREFILTER_TAG)
+
+        Renders the prefilter source for a ruleset.
+
+        Rules tagged with :code:`tag` are used as-is when present. Otherwise, the prefilter is derived from the literal atom(s) of every non-private rule.
+
+        :param ruleset: absolute path to the ruleset file
+        :type ruleset: str
+
+        :param tag: tag used by rule authors to flag hand-written prefilter rule(s)
+        :type tag: str
+
+        :return: YARA source code of the prefilter, :code:`None` if the ruleset cannot be prefiltered
+        :rtype: str
+        """
+
+        imports, includes, rules = Prefilter.parse(ruleset)
+
+        tagged = [rule["source"] for rule in rules if tag in rule["tags"]]
+
+        if tagged:
+            return "\n".join(imports + tagged)
+
+        if includes:
+            _log.debug("Ruleset <{}> includes external file(s) and cannot be prefiltered.".format(ruleset))
+            return None
+
+        atoms = set()
+
+        for rule in rules:
+            if rule["private"] or rule["global"]:
+                continue
+
+            extracted = Prefilter.extract_atoms(rule)
+
+            if not extracted:
+                _log.debug("Rule <{}> from ruleset <{}> cannot be reduced to literal atom(s).".format(rule["name"], ruleset))
+                return None
+
+            atoms.update(extracted)
+
+        if not atoms:
+            return None
+
+        return "rule {} {{\n    strings:\n        {}\n    condition:\n        any of them\n}}\n".format(tag, "\n        ".join(Prefilter._render_atom(index, *atom) for index, atom in enumerate(sorted(atoms))))
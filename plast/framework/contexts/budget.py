@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import errors as _errors
+from framework.contexts.logger import Logger as _log
+
+import threading
+
+__all__ = [
+    "Budget"
+]
+
+class Budget:
+    """Bounds the amount of data container module(s) are allowed to inflate during a case."""
+
+    def __init__(self, size, entries, ratio):
+        """
+        .. py:function:: __init__(self, size, entries, ratio)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: maximum number of byte(s) to inflate case-wide
+        :type size: int
+
+        :param entries: maximum number of entry(ies) to extract case-wide
+        :type entries: int
+
+        :param ratio: maximum expansion ratio of a single archive member
+        :type ratio: int
+        """
+
+        self.limits = {
+            "size": size,
+            "entries": entries,
+            "ratio": ratio
+        }
+        self.used = {
+            "size": 0,
+            "entries": 0
+        }
+        self.refusals = {}
+        self.lock = threading.Lock()
+
+    def _refuse(self, reason, message):
+        """
+        .. py:function:: _refuse(self, reason, message)
+
+        Accounts for a refused reservation.
+
+        :param self: current class instance
+        :type self: class
+
+        :param reason: name of the exceeded limit
+        :type reason: str
+
+        :param message: description of the refused reservation
+        :type message: str
+
+        :raises BudgetExceeded: always
+        """
+
+        self.refusals[reason] = self.refusals.get(reason, 0) + 1
+
+        if self.refusals[reason] == 1 and reason != "ratio":
+            _log.warning("Case-wide decompression budget exhausted ({}). Further extraction(s) will be refused.".format(message))
+
+        raise _errors.BudgetExceeded(reason, message)
+
+    def check_ratio(self, size, compressed):
+        """
+        .. py:function:: check_ratio(self, size, compressed)
+
+        Enforces the expansion ratio limit on a stream whose inflated size is only known while decompressing it. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: number of byte(s) inflated so far
+        :type size: int
+
+        :param compressed: compressed size of the stream
+        :type compressed: int
+
+        :raises BudgetExceeded: if the expansion ratio exceeds the limit
+        """
+
+        with self.lock:
+            self._check_ratio(size, compressed)
+
+    def _check_ratio(self, size, compressed):
+        """
+        .. py:function:: _check_ratio(self, size, compressed)
+
+        Enforces the expansion ratio limit, the lock being already held.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: number of inflated byte(s)
+        :type size: int
+
+        :param compressed: number of compressed byte(s)
+        :type compressed: int
+
+        :raises BudgetExceeded: if the expansion ratio exceeds the limit
+        """
+
+        if size > max(compressed, 1) * self.limits["ratio"]:
+            self._refuse("ratio", "expansion ratio of <{:.0f}> exceeds <{}>".format(size / max(compressed, 1), self.limits["ratio"]))
+
+    def reserve(self, size, entries=1, compressed=None):
+        """
+        .. py:function:: reserve(self, size, entries=1, compressed=None)
+
+        Reserves byte(s) and entry(ies) against the case-wide budget before extracting them. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: number of byte(s) about to be inflated
+        :type size: int
+
+        :param entries: number of entry(ies) about to be extracted
+        :type entries: int
+
+        :param compressed: compressed size of the data, used to enforce the expansion ratio limit
+        :type compressed: int
+
+        :raises BudgetExceeded: if the reservation would exceed one of the limit(s)
+        """
+
+        with self.lock:
+            if compressed is not None:
+                self._check_ratio(size, compressed)
+
+            if self.used["entries"] + entries > self.limits["entries"]:
+                self._refuse("entries", "<{}> entry(ies) already extracted".format(self.used["entries"]))
+
+            if self.used["size"] + size > self.limits["size"]:
+                self._refuse("size", "<{}> byte(s) already inflated".format(self.used["size"]))
+
+            self.used["size"] += size
+            self.used["entries"] += entries
+
+    def is_exhausted(self):
+        """
+        .. py:function:: is_exhausted(self)
+
+        Tests whether the case-wide budget is exhausted, so that container module(s) can stop walking large container(s) early.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: :code:`True` if no more byte(s) or entry(ies) can be reserved, else :code:`False`
+        :rtype: bool
+        """
+
+        with self.lock:
+            return self.used["size"] >= self.limits["size"] or self.used["entries"] >= self.limits["entries"]
+
+    def render(self):
+        """
+        .. py:function:: render(self)
+
+        Renders the budget usage and refusal(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :return: dictionary containing the limit(s), usage and number of refusal(s) per exceeded limit
+        :rtype: dict
+        """
+
+        with self.lock:
+            return {
+                "limits": dict(self.limits),
+                "used": dict(self.used),
+                "refusals": dict(self.refusals)
+            }
+
+    def report(self):
+        """
+        .. py:function:: report(self)
+
+        Displays the budget usage and refusal(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        summary = self.render()
+
+        if summary["used"]["entries"]:
+            _log.info("Inflated <{}> out of <{}> byte(s) and <{}> out of <{}> entry(ies) from container(s).".format(summary["used"]["size"], summary["limits"]["size"], summary["used"]["entries"], summary["limits"]["entries"]))
+
+        if summary["refusals"]:
+            _log.warning("Refused extraction(s) due to the decompression budget: {}.".format(", ".join("<{}> {}".format(count, reason) for reason, count in sorted(summary["refusals"].items()))))
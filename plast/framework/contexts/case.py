@@ -3,6 +3,7 @@
 from framework.api.external import filesystem as _fs
 from framework.api.internal import interaction as _interaction
 
+from framework.contexts.budget import Budget as _budget
 from framework.contexts.logger import Logger as _log
 from framework.contexts.configuration import Configuration as _conf
 
@@ -10,6 +11,7 @@ import os
 import random
 import shutil
 import string
+import threading
 
 try:
     import send2trash
@@ -39,12 +41,20 @@ class Case:
 
         self.arguments = arguments
         self.name = os.path.basename(self.arguments.output)
+        self.engine = None
+        self.pool = None
+        self.fingerprints = set()
+        self.deferred = []
+        self.lock = threading.Lock()
+        self.budget = _budget(self.arguments.max_inflated_size, self.arguments.max_entries, self.arguments.max_ratio)
 
         self.resources = {
             "case": self.arguments.output,
             "matches": os.path.join(self.arguments.output, "{}.{}".format(_conf.MATCHES_FILE_BASENAME, self.arguments.format.lower())),
             "storage": os.path.join(self.arguments.output, _conf.STORAGE_DIRECTORY),
             "evidences": [],
+            "artifacts": [],
+            "parents": {},
             "temporary": []
         }
 
@@ -188,27 +198,150 @@ class Case:
 
             yield file
 
-    def track_file(self, evidence):
+    def track_file(self, evidence, parent=None, context=None, identifier=None):
         """
-        .. py:function:: track_file(self, evidence)
+        .. py:function:: track_file(self, evidence, parent=None, context=None, identifier=None)
 
-        Checks and registers an evidence file for processing.
+        Checks and registers an evidence file for processing, submitting it right away to the attached engine if any.
+
+        Artifact(s) spilled to disk by their container are registered under the identifier built from their lineage (e.g. :code:`archive.zip > folder/file.exe`) rather than the path of the temporary file holding them, along with their context.
 
         :param self: current class instance
         :type self: class
 
         :param evidence: absolute path to the evidence file
         :type evidence: str
+
+        :param parent: identifier of the container the evidence was extracted from
+        :type parent: str
+
+        :param context: dictionary describing where the evidence was found, reported along with its match(es)
+        :type context: dict
+
+        :param identifier: identifier of the artifact held by the file, :code:`None` for a regular evidence
+        :type identifier: str
         """
 
         evidence = os.path.abspath(evidence)
 
         if os.path.isfile(evidence):
+            if identifier and self.engine:
+                self.resources["artifacts"].append(identifier)
+                self.engine.submit(identifier, parent, context=context, path=evidence)
+                return
+
             self.resources["evidences"].append(evidence)
 
+            if parent:
+                self.resources["parents"][evidence] = parent
+
+            if self.engine:
+                self.engine.submit(evidence, parent, context=context)
+
         else:
             _log.warning("Evidence <{}> not found or invalid.".format(evidence))
 
+    def track_data(self, data, name, parent, context=None):
+        """
+        .. py:function:: track_data(self, data, name, parent, context=None)
+
+        Registers an in-memory artifact extracted from a container for processing, without writing it to disk.
+
+        The artifact is identified by the lineage of its container(s) (e.g. :code:`archive.zip > folder/file.exe`). If no engine is attached, it is written to a temporary directory and tracked as a regular evidence.
+
+        :param self: current class instance
+        :type self: class
+
+        :param data: content of the artifact
+        :type data: bytes
+
+        :param name: name of the artifact inside its container
+        :type name: str
+
+        :param parent: identifier of the container the artifact was extracted from
+        :type parent: str
+
+        :param context: dictionary describing where the artifact was found (e.g. the 5-tuple of a network flow), reported along with its match(es)
+        :type context: dict
+
+        :return: identifier of the artifact
+        :rtype: str
+        """
+
+        identifier = "{}{}{}".format(parent, _conf.ARTIFACT_SEPARATOR, name)
+
+        if not self.engine:
+            path = os.path.join(self.require_temporary_directory(), os.path.basename(name))
+
+            with open(path, "wb") as file:
+                file.write(data)
+
+            self.track_file(path, parent=parent)
+            return identifier
+
+        self.resources["artifacts"].append(identifier)
+        self.engine.submit(identifier, parent, data, context)
+
+        return identifier
+
+    def has_fingerprint(self, fingerprint):
+        """
+        .. py:function:: has_fingerprint(self, fingerprint)
+
+        Checks whether the fingerprint of an artifact was already registered case-wide, without registering it. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param fingerprint: hashable fingerprint of the artifact (e.g. a tuple containing its CRC32 and size)
+        :type fingerprint: tuple
+
+        :return: :code:`True` if the fingerprint is already tracked, else :code:`False`
+        :rtype: bool
+        """
+
+        with self.lock:
+            return fingerprint in self.fingerprints
+
+    def track_fingerprint(self, fingerprint):
+        """
+        .. py:function:: track_fingerprint(self, fingerprint)
+
+        Registers the fingerprint of an artifact case-wide so that duplicate artifact(s) are only processed once. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param fingerprint: hashable fingerprint of the artifact (e.g. a tuple containing its CRC32 and size)
+        :type fingerprint: tuple
+
+        :return: :code:`True` if the fingerprint was not tracked yet, else :code:`False`
+        :rtype: bool
+        """
+
+        with self.lock:
+            if fingerprint in self.fingerprints:
+                return False
+
+            self.fingerprints.add(fingerprint)
+            return True
+
+    def defer(self, function):
+        """
+        .. py:function:: defer(self, function)
+
+        Registers a function to call once every tracked evidence has been scanned and every match has been written to the output file, e.g. to persist result(s) across cases.
+
+        :param self: current class instance
+        :type self: class
+
+        :param function: function to call without argument(s)
+        :type function: class
+        """
+
+        with self.lock:
+            self.deferred.append(function)
+
     def track_files(self, evidences, include=[], exclude=[]):
         """
         .. py:function:: track_files(self, evidences)
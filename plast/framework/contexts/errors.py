@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 __all__ = [
+    "BudgetExceeded",
     "CharacterEncoding",
     "InvalidObject",
     "InvalidPackage",
@@ -17,6 +18,9 @@ class CustomException(Exception):
     def __init__(self, *args, **kwargs):
         Exception.__init__(self, *args, **kwargs)
 
+class BudgetExceeded(CustomException):
+    pass
+
 class CharacterEncoding(CustomException):
     pass
 
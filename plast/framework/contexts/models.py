@@ -3,11 +3,59 @@
 from framework.contexts.logger import Logger as _log
 
 __all__ = [
+    "Artifact",
     "Callback",
     "Post",
     "Pre"
 ]
 
+class Artifact:
+    """Child artifact extracted from a container by a :code:`models.Pre` module."""
+
+    __slots__ = [
+        "name",
+        "source",
+        "size",
+        "compressed",
+        "fingerprint",
+        "context"
+    ]
+
+    def __init__(self, name, source, size=None, compressed=None, fingerprint=None, context=None):
+        """
+        .. py:function:: __init__(self, name, source, size=None, compressed=None, fingerprint=None, context=None)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param name: name of the artifact inside its container
+        :type name: str
+
+        :param source: content of the artifact, or binary file-like object it can be read from (read only if the artifact is selected)
+        :type source: bytes
+
+        :param size: size of the artifact if known before reading it
+        :type size: int
+
+        :param compressed: size of the artifact as stored in its container, used to enforce the expansion ratio limit
+        :type compressed: int
+
+        :param fingerprint: hashable fingerprint identifying duplicate artifact(s) before reading them (e.g. a tuple containing their CRC32 and size), the SHA-256 digest of the content being used if :code:`None`
+        :type fingerprint: tuple
+
+        :param context: dictionary describing where the artifact was found, reported along with its match(es)
+        :type context: dict
+        """
+
+        self.name = name
+        self.source = source
+        self.size = size
+        self.compressed = compressed
+        self.fingerprint = fingerprint
+        self.context = context
+
 class Callback:
     """Base callback module class."""
 
@@ -20,9 +68,31 @@ class Callback:
         "__version__"
     ]
 
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
     def run(self, data):
         _log.warning("Unimplemented <{}> module.".format(self.__class__.__name__))
 
+    def run_batch(self, matches):
+        """
+        .. py:function:: run_batch(self, matches)
+
+        Consumes the match(es) of a batch of evidence(s) at once, calling :code:`run` for each match unless overridden.
+
+        :param self: current class instance
+        :type self: class
+
+        :param matches: list of dictionaries containing the match data
+        :type matches: list
+        """
+
+        for data in matches:
+            self.run(data)
+
 class Post:
     """Base postprocessing module class."""
 
@@ -53,5 +123,32 @@ class Pre:
     def __init__(self, parser):
         pass
 
+    def setup(self):
+        pass
+
+    def extract(self, source, identifier):
+        return None
+
+    def walk(self, source, identifier):
+        """
+        .. py:function:: walk(self, source, identifier)
+
+        Walks through a container using the :code:`extract` method of the module, child artifact(s) being filtered, deduplicated, reserved against the decompression budget and dispatched to the module handling their type or fed to the engine by the framework.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the container or binary file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the container
+        :type identifier: str
+
+        :return: number of artifact(s) processed
+        :rtype: int
+        """
+
+        return self.case.dispatcher.walk(self, source, identifier)
+
     def run(self):
         _log.warning("Unimplemented <{}> module.".format(self.__class__.__name__))
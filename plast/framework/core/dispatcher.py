@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.external import filesystem as _fs
+from framework.api.internal.identifier import Identifier as _identifier
+
+from framework.contexts import errors as _errors
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import argparse
+import gzip
+import hashlib
+import io
+import itertools
+import lzma
+import os
+import sys
+import tarfile
+import threading
+import zipfile
+import zlib
+
+__all__ = [
+    "Dispatcher"
+]
+
+class Dispatcher:
+    """Walks through nested container(s), handing every extracted artifact over to the module handling its type or to the engine."""
+
+    def __init__(self, case, modules):
+        """
+        .. py:function:: __init__(self, case, modules)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param case: filled :code:`contexts.Case` instance
+        :type case: class
+
+        :param modules: dictionary containing the loaded :code:`models.Pre` module(s)
+        :type modules: dict
+        """
+
+        self.case = case
+        self.modules = modules
+        self.index = Dispatcher.index_associations(modules)
+        self.prepared = set()
+        self.skipped = {}
+        self.counter = itertools.count()
+        self.tmp = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def index_associations(modules):
+        """
+        .. py:function:: index_associations(modules)
+
+        Builds the lookup table mapping every signature trigger, MIME-type and extension to the preprocessing module it is associated with.
+
+        :param modules: dictionary containing the loaded module(s)
+        :type modules: dictionary
+
+        :return: dictionary containing the name of the associated module indexed by :code:`(kind, value)` tuple(s)
+        :rtype: dict
+        """
+
+        index = {}
+
+        for name, Module in modules.items():
+            associations = getattr(Module, "__associations__", {})
+
+            for kind, key in [("triggers", "trigger"), ("mime", "mime"), ("extensions", "extension")]:
+                for value in associations.get(kind, []):
+                    index.setdefault((key, value), name)
+
+        return index
+
+    @staticmethod
+    def find_association(index, meta):
+        """
+        .. py:function:: find_association(index, meta)
+
+        Finds association(s) to :code:`meta` in the prebuilt association index, signature triggers taking precedence over MIME-types and extensions.
+
+        :param index: dictionary built by :code:`index_associations`
+        :type index: dict
+
+        :param meta: :code:`identifier.Type` instance containing metadata for the target file
+        :type meta: class
+
+        :return: name of the associated module
+        :rtype: str
+
+        :raises UnsupportedType: if :code:`meta` cannot be handled by the available preprocessing module(s)
+        """
+
+        for key in [("trigger", meta.trigger), ("mime", meta.mime), ("extension", meta.extension)]:
+            if key in index:
+                return index[key]
+
+        raise _errors.UnsupportedType
+
+    @staticmethod
+    def set_default_arguments(Module, case):
+        """
+        .. py:function:: set_default_arguments(Module, case)
+
+        Sets the default value of every option of a preprocessing module that was not invoked from the command-line.
+
+        :param Module: loaded preprocessing module
+        :type Module: class
+
+        :param case: preloaded Case class
+        :type case: class
+        """
+
+        for action in Module.parser._actions:
+            if action.dest != argparse.SUPPRESS and not hasattr(case.arguments, action.dest):
+                setattr(case.arguments, action.dest, action.default)
+
+    @staticmethod
+    def is_container(Module):
+        """
+        .. py:function:: is_container(Module)
+
+        Tests whether a preprocessing module can walk through nested container(s), i.e. implements :code:`extract`.
+
+        :param Module: loaded preprocessing module
+        :type Module: class
+
+        :return: :code:`True` if the module implements :code:`extract`, else :code:`False`
+        :rtype: bool
+        """
+
+        return type(Module).extract is not _models.Pre.extract
+
+    def prepare(self, Module):
+        """
+        .. py:function:: prepare(self, Module)
+
+        Attaches a preprocessing module to the case and calls its :code:`setup` method, once for the lifetime of the case.
+
+        :param self: current class instance
+        :type self: class
+
+        :param Module: loaded preprocessing module
+        :type Module: class
+        """
+
+        with self.lock:
+            if Module.__name__ in self.prepared:
+                return
+
+            Dispatcher.set_default_arguments(Module, self.case)
+
+            Module.case = self.case
+            Module.setup()
+
+            self.prepared.add(Module.__name__)
+
+    def skip(self, reason, identifier):
+        """
+        .. py:function:: skip(self, reason, identifier)
+
+        Accounts for an artifact that was not processed.
+
+        :param self: current class instance
+        :type self: class
+
+        :param reason: reason the artifact was skipped
+        :type reason: str
+
+        :param identifier: identifier of the artifact
+        :type identifier: str
+        """
+
+        with self.lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+        _log.debug("Skipped {} artifact <{}>.".format(reason, identifier))
+
+    def report(self):
+        """
+        .. py:function:: report(self)
+
+        Displays the number of artifact(s) skipped for each reason.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.skipped:
+            _log.info("Skipped artifact(s): {}.".format(", ".join("<{}> {}".format(count, reason) for reason, count in sorted(self.skipped.items()))))
+
+    def _is_selected(self, name):
+        """
+        .. py:function:: _is_selected(self, name)
+
+        Tests whether an artifact matches the inclusion and exclusion filter(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param name: name of the artifact
+        :type name: str
+
+        :return: :code:`True` if the artifact must be scanned, else :code:`False`
+        :rtype: bool
+        """
+
+        name = os.path.basename(name)
+
+        if self.case.arguments.include and not _fs.matches_patterns(name, wildcard_patterns=self.case.arguments.include):
+            return False
+
+        return not (self.case.arguments.exclude and _fs.matches_patterns(name, wildcard_patterns=self.case.arguments.exclude))
+
+    def _resolve_container(self, name, header):
+        """
+        .. py:function:: _resolve_container(self, name, header)
+
+        Finds the preprocessing module able to walk through an artifact, from its header or, failing that, its extension.
+
+        :param self: current class instance
+        :type self: class
+
+        :param name: name of the artifact
+        :type name: str
+
+        :param header: first byte(s) of the artifact, :code:`None` to only rely on its extension
+        :type header: bytes
+
+        :return: container module, :code:`None` if the artifact is not a supported container
+        :rtype: class
+        """
+
+        meta = (_identifier.identify_data(header) if header else None)
+
+        try:
+            name = Dispatcher.find_association(self.index, meta) if meta else self.index.get(("extension", os.path.splitext(name)[1][1:].lower()))
+
+        except _errors.UnsupportedType:
+            return None
+
+        if name and Dispatcher.is_container(self.modules[name]):
+            return self.modules[name]
+
+        return None
+
+    def find_container(self, trigger):
+        """
+        .. py:function:: find_container(self, trigger)
+
+        Finds the preprocessing module associated with a signature trigger and prepares it, so that a module can hand a container over to a more specific one (e.g. an Outlook message identified as a plain OLE compound file).
+
+        :param self: current class instance
+        :type self: class
+
+        :param trigger: signature trigger (e.g. :code:`parse.msg`)
+        :type trigger: str
+
+        :return: prepared container module, :code:`None` if no loaded module handles the trigger
+        :rtype: class
+        """
+
+        name = self.index.get(("trigger", trigger))
+
+        if not name or not Dispatcher.is_container(self.modules[name]):
+            return None
+
+        self.prepare(self.modules[name])
+        return self.modules[name]
+
+    def _load(self, artifact):
+        """
+        .. py:function:: _load(self, artifact)
+
+        Reads an artifact against the decompression budget, in memory unless it exceeds the spill threshold.
+
+        :param self: current class instance
+        :type self: class
+
+        :param artifact: :code:`models.Artifact` instance
+        :type artifact: class
+
+        :return: tuple containing the data of the artifact (:code:`None` if spilled) and the absolute path to the spilled artifact (:code:`None` if in memory)
+        :rtype: tuple
+
+        :raises BudgetExceeded: if the artifact exceeds the decompression budget
+        :raises Exception: any exception raised while reading the artifact (e.g. :code:`zipfile.BadZipFile` on a CRC mismatch)
+        """
+
+        if isinstance(artifact.source, (bytes, bytearray, memoryview)):
+            self.case.budget.reserve(len(artifact.source), compressed=artifact.compressed)
+            return bytes(artifact.source), None
+
+        known = artifact.size is not None
+        self.case.budget.reserve((artifact.size if known else 0), compressed=artifact.compressed)
+
+        data = artifact.source.read(self.case.arguments.spill_threshold + 1)
+        inflated = len(data)
+
+        if not known:
+            self.case.budget.reserve(len(data), entries=0)
+            self.case.budget.check_ratio(inflated, artifact.compressed)
+
+        if inflated <= self.case.arguments.spill_threshold:
+            return data, None
+
+        with self.lock:
+            if not self.tmp:
+                self.tmp = self.case.require_temporary_directory()
+
+        path = os.path.join(self.tmp, "{}_{}".format(next(self.counter), os.path.basename(artifact.name)))
+
+        try:
+            with open(path, "wb") as file:
+                file.write(data)
+
+                while True:
+                    chunk = artifact.source.read(_conf.ARTIFACT_CHUNK_SIZE)
+
+                    if not chunk:
+                        break
+
+                    inflated += len(chunk)
+
+                    if not known:
+                        self.case.budget.reserve(len(chunk), entries=0)
+                        self.case.budget.check_ratio(inflated, artifact.compressed)
+
+                    file.write(chunk)
+
+        except BaseException:
+            os.remove(path)
+            raise
+
+        _log.debug("Spilled large artifact <{}> to <{}>.".format(artifact.name, path))
+        return None, path
+
+    def dispatch(self, artifact, parent, level):
+        """
+        .. py:function:: dispatch(self, artifact, parent, level)
+
+        Processes an artifact extracted from a container: filters it, deduplicates it, reads it against the decompression budget, feeds it to the engine and walks through it if it is itself a supported container.
+
+        :param self: current class instance
+        :type self: class
+
+        :param artifact: :code:`models.Artifact` instance
+        :type artifact: class
+
+        :param parent: identifier of the container the artifact was extracted from
+        :type parent: str
+
+        :param level: nesting level of the artifact, the evidence(s) being at level 0
+        :type level: int
+
+        :return: :code:`True` if the artifact was processed, else :code:`False`
+        :rtype: bool
+        """
+
+        identifier = "{}{}{}".format(parent, _conf.ARTIFACT_SEPARATOR, artifact.name)
+        selected = self._is_selected(artifact.name)
+
+        try:
+            if not selected and (level > self.case.arguments.max_depth or not self._resolve_container(artifact.name, None)):
+                self.skip("filtered", identifier)
+                return False
+
+            if self.case.arguments.deduplication and artifact.fingerprint is not None and self.case.has_fingerprint(artifact.fingerprint):
+                self.skip("duplicate", identifier)
+                return False
+
+            try:
+                data, path = self._load(artifact)
+
+            except _errors.BudgetExceeded as exc:
+                self.skip("budget ({})".format(exc.args[0]), identifier)
+                return False
+
+            except (
+                EOFError,
+                NotImplementedError,
+                RuntimeError,
+                gzip.BadGzipFile,
+                lzma.LZMAError,
+                tarfile.TarError,
+                zipfile.BadZipFile,
+                zlib.error) as exc:
+
+                _log.debug("Failed to read artifact <{}>: {}.".format(identifier, exc))
+                self.skip(("encrypted" if isinstance(exc, RuntimeError) and "password" in str(exc).lower() else "corrupted"), identifier)
+                return False
+
+            if self.case.arguments.deduplication and (artifact.fingerprint is not None or data is not None) and not self.case.track_fingerprint(artifact.fingerprint if artifact.fingerprint is not None else hashlib.sha256(data).hexdigest()):
+                self.skip("duplicate", identifier)
+                return False
+
+        finally:
+            if hasattr(artifact.source, "close"):
+                artifact.source.close()
+
+        if data is not None:
+            header = data[:_conf.IDENTIFICATION_HEADER_SIZE]
+
+        else:
+            with open(path, "rb") as file:
+                header = file.read(_conf.IDENTIFICATION_HEADER_SIZE)
+
+        Module = self._resolve_container(artifact.name, header)
+
+        if not selected and not Module:
+            self.skip("filtered", identifier)
+            return False
+
+        if selected and data is not None:
+            self.case.track_data(data, artifact.name, parent, context=artifact.context)
+
+        elif selected:
+            self.case.track_file(path, parent=parent, context=artifact.context, identifier=identifier)
+
+        if Module:
+            self.walk(Module, (io.BytesIO(data) if data is not None else path), identifier, level=level)
+
+        return True
+
+    def walk(self, Module, source, identifier, level=0):
+        """
+        .. py:function:: walk(self, Module, source, identifier, level=0)
+
+        Walks through a container, dispatching every artifact yielded by the :code:`extract` method of the module handling it.
+
+        :param self: current class instance
+        :type self: class
+
+        :param Module: container module
+        :type Module: class
+
+        :param source: absolute path to the container or binary file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the container, i.e. the lineage of its parent container(s)
+        :type identifier: str
+
+        :param level: nesting level of the container, the evidence(s) being at level 0
+        :type level: int
+
+        :return: number of artifact(s) processed
+        :rtype: int
+        """
+
+        if level > self.case.arguments.max_depth:
+            _log.warning("Limit nesting level <{}> exceeded. Stopped walking through container <{}>.".format(self.case.arguments.max_depth, identifier))
+            return 0
+
+        self.prepare(Module)
+        _log.debug("Walking through {}container <{}> using module <{}>.".format("level {} nested ".format(level) if level else "", identifier, Module.__name__))
+
+        count = 0
+
+        try:
+            for artifact in (Module.extract(source, identifier) or []):
+                if self.case.budget.is_exhausted():
+                    _log.warning("Decompression budget exhausted. Stopped walking through container <{}>.".format(identifier))
+                    break
+
+                count += self.dispatch(artifact, identifier, level + 1)
+
+        except _errors.BudgetExceeded as exc:
+            self.skip("budget ({})".format(exc.args[0]), identifier)
+            _log.warning("Stopped walking through container <{}> due to the decompression budget ({}).".format(identifier, exc.args[1]))
+
+        except KeyboardInterrupt:
+            sys.stderr.write("\n")
+            _log.fault("Aborted due to manual user interruption.")
+
+        except Exception:
+            _log.exception("Exception raised while walking through container <{}>.".format(identifier))
+
+        return count
@@ -2,19 +2,25 @@
 
 from framework.api.internal import magic as _magic
 from framework.api.internal.loader import Loader as _loader
+from framework.api.internal.prefilter import Prefilter as _prefilter
 
 from framework.contexts import models as _models
 from framework.contexts.logger import Logger as _log
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.types import Codes as _codes
 
+from framework.core import executor as _executor
 from framework.core import reader as _reader
 from framework.core import processors as _processors
+from framework.core import slab as _slab
 
+import contextlib
 import ctypes
+import functools
 import io
 import multiprocessing
 import os.path
+import threading
 
 try:
     import yara
@@ -44,6 +50,23 @@ class Engine:
 
         self.case = case
         self.buffers = {}
+        self.counts = {}
+        self.prefilters = {}
+        self.externals = _processors.File.declare_externals(self.case.arguments.hash_algorithms)
+        self.referenced = set()
+        self.batch = []
+        self.reported = 0
+        self.slab = None
+        self.callback = None
+        self.pending = 0
+        self.aborted = False
+        self.throttle = threading.Condition()
+        self.lock = threading.Lock()
+        self.statistics = {
+            "prefilter": {"scans": 0, "time": 0.0},
+            "confirm": {"scans": 0, "time": 0.0},
+            "spared": 0
+        }
 
     def _compile_ruleset(self, name, ruleset):
         """
@@ -69,13 +92,21 @@ class Engine:
         try:
             buffer = io.BytesIO()
 
-            rules = yara.compile(ruleset, includes=_conf.YARA_INCLUDES, error_on_warning=(not self.case.arguments.ignore_warnings))
+            rules = yara.compile(ruleset, includes=_conf.YARA_INCLUDES, error_on_warning=(not self.case.arguments.ignore_warnings), externals=self.externals)
             rules.save(file=buffer)
 
             self.buffers[ruleset] = buffer
             count += sum(1 for _ in rules)
 
+            self.counts[ruleset] = count
+
             _log.debug("Precompilated YARA ruleset <{}> in memory with a total of <{}> valid rule(s).".format(name, count))
+
+            self._find_referenced_externals(ruleset)
+
+            if self.case.arguments.prefilter:
+                self._compile_prefilter(name, ruleset)
+
             return True, count
 
         except yara.SyntaxError:
@@ -89,79 +120,239 @@ class Engine:
 
         return False, count
 
-    def _dispatch_jobs(self):
+    def _find_referenced_externals(self, ruleset):
         """
-        .. py:function:: _dispatch_jobs(self)
+        .. py:function:: _find_referenced_externals(self, ruleset)
 
-        Dispatches the processing task(s) to the subprocess(es).
+        Registers the external variable(s) referenced by a ruleset so that costly ones are only computed when needed.
 
         :param self: current class instance
         :type self: class
 
-        :return: number of match(es)
-        :rtype: int
+        :param ruleset: absolute path to the ruleset file
+        :type ruleset: str
         """
 
-        with multiprocessing.Manager() as manager:
-            queue = manager.Queue()
-            results = (multiprocessing.Lock(), multiprocessing.Value(ctypes.c_int, 0), manager.list())
+        self.referenced.update(_prefilter.find_references(ruleset, self.externals))
 
-            reader = multiprocessing.Process(target=_reader.Reader(queue, results, {
-                "target": self.case.resources["matches"],
-                "storage": self.case.resources["storage"],
-                "format": self.case.arguments.format
-            }).run)
+    def _compile_prefilter(self, name, ruleset):
+        """
+        .. py:function:: _compile_prefilter(self, name, ruleset)
 
-            reader.daemon = True
-            reader.start()
+        Compiles and saves the cheap prefilter tier of a ruleset, either hand-written by the rule author(s) or derived from the rule(s) literal string(s).
 
-            _log.debug("Started reader subprocess to consume queue result(s).")
+        :param self: current class instance
+        :type self: class
 
-            with _magic.Pool(processes=self.case.arguments.processes) as pool:
-                for file in self.case.resources["evidences"]:
-                    if os.path.getsize(file) > self.case.arguments.max_size:
-                        _log.warning("Evidence <{}> exceeds the maximum size. Ignoring evidence. Try changing --max-size to override this behavior.".format(file))
-                        continue
+        :param name: name of the ruleset file to derive the prefilter from
+        :type name: str
 
-                    pool.starmap_async(
-                        _processors.File(self.case.arguments.hash_algorithms, self.case.arguments.callbacks, queue, self.case.arguments.fast).run, 
-                        [(file, self.buffers)], 
-                        error_callback=_log.inner_exception)
+        :param ruleset: absolute path to the ruleset file to derive the prefilter from
+        :type ruleset: str
+        """
 
-                    _log.debug("Mapped concurrent job to consume evidence <{}>.".format(file))
+        try:
+            source = _prefilter.render(ruleset)
 
-            queue.put(_codes.DONE)
+            if not source:
+                _log.debug("No prefilter available for YARA ruleset <{}>. Full rule(s) will be applied to every evidence.".format(name))
+                return
 
-            with _magic.Hole(KeyboardInterrupt, action=lambda:_log.fault("Aborted due to manual user interruption <SIGINT>.")):
-                reader.join()
+            buffer = io.BytesIO()
+
+            rules = yara.compile(source=source, includes=_conf.YARA_INCLUDES, error_on_warning=False, externals=self.externals)
+            rules.save(file=buffer)
 
-            return results[1].value
+            self.prefilters[ruleset] = buffer
+            _log.debug("Precompilated prefilter for YARA ruleset <{}> in memory.".format(name))
 
-    def _invoke_post_modules(self):
+        except (
+            Exception,
+            yara.Error):
+
+            _log.exception("Failed to pre-compile prefilter for ruleset <{}>. Full rule(s) will be applied to every evidence.".format(ruleset))
+
+    def _partition_rulesets(self, shards):
         """
-        .. py:function:: _invoke_post_modules(self)
+        .. py:function:: _partition_rulesets(self, shards)
 
-        Invoke the selected :code:`models.Post` module(s).
+        Partitions the precompiled ruleset(s) into balanced shard(s) based on their number of rule(s).
 
         :param self: current class instance
         :type self: class
+
+        :param shards: number of shard(s) to build
+        :type shards: int
+
+        :return: list of tuple(s) containing the precompiled rule(s) and prefilter(s) of each shard
+        :rtype: list
         """
 
-        for name in self.case.arguments.post:
-            Module = _loader.load_module(name, _models.Post)
+        partitions = [({}, {}, [0]) for _ in range(min(shards, len(self.buffers)))]
 
-            if Module:
-                module = Module()
-                module.__name__ = name
+        for ruleset in sorted(self.buffers, key=lambda ruleset: self.counts[ruleset], reverse=True):
+            buffers, prefilters, total = min(partitions, key=lambda partition: partition[2][0])
 
-                with _magic.Invocator(module):
-                    module.run(self.case)
+            buffers[ruleset] = self.buffers[ruleset]
+            total[0] += self.counts[ruleset]
 
-    def run(self):
+            if ruleset in self.prefilters:
+                prefilters[ruleset] = self.prefilters[ruleset]
+
+        for index, (buffers, _, total) in enumerate(partitions):
+            _log.debug("Assigned <{}> YARA rule(s) from <{}> ruleset(s) to shard <{}>.".format(total[0], len(buffers), index))
+
+        return [(buffers, prefilters) for buffers, prefilters, _ in partitions]
+
+    def _collect_statistics(self, statistics):
         """
-        .. py:function:: run(self)
+        .. py:function:: _collect_statistics(self, statistics)
+
+        Aggregates the timing statistics returned by the asynchronous job(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param statistics: dictionary containing the statistics of a job
+        :type statistics: dict
+        """
+
+        with self.lock:
+            for tier in ["prefilter", "confirm"]:
+                self.statistics[tier]["scans"] += statistics[tier]["scans"]
+                self.statistics[tier]["time"] += statistics[tier]["time"]
+
+            self.statistics["spared"] += statistics["spared"]
+
+    def _report_statistics(self):
+        """
+        .. py:function:: _report_statistics(self)
+
+        Displays the timing statistics of the scanning tier(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.prefilters:
+            _log.info("Prefilter tier ran <{}> scan(s) in <{:.3f}> second(s) and spared <{}> full scan(s).".format(self.statistics["prefilter"]["scans"], self.statistics["prefilter"]["time"], self.statistics["spared"]))
+
+        _log.info("Confirm tier ran <{}> scan(s) in <{:.3f}> second(s).".format(self.statistics["confirm"]["scans"], self.statistics["confirm"]["time"]))
+
+    def _complete_batch(self, slots, statistics):
+        """
+        .. py:function:: _complete_batch(self, slots, statistics)
+
+        Callback invoked once a concurrent job has consumed a batch, releasing the shared memory slot(s) it was reading and its place among the pending job(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param slots: list of the :code:`slab.Slot` instance(s) referenced by the batch
+        :type slots: list
+
+        :param statistics: dictionary containing the statistics of the job
+        :type statistics: dict
+        """
+
+        self._collect_statistics(statistics)
+
+        for slot in slots:
+            self.slab.release(slot)
+
+        self._release()
+
+    def _abort_batch(self, slots, exception):
+        """
+        .. py:function:: _abort_batch(self, slots, exception)
+
+        Callback invoked when a concurrent job failed, releasing the shared memory slot(s) it was reading and its place among the pending job(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param slots: list of the :code:`slab.Slot` instance(s) referenced by the batch
+        :type slots: list
+
+        :param exception: exception raised within the job
+        :type exception: class
+        """
+
+        _log.inner_exception(exception)
+
+        for slot in slots:
+            self.slab.release(slot)
+
+        self._release()
+
+    def _reserve(self):
+        """
+        .. py:function:: _reserve(self)
+
+        Waits for a place among the pending job(s), i.e. until fewer than :code:`BATCH_MAX_PENDING` job(s) per concurrent process are queued or running.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: :code:`True` once a place is reserved, :code:`False` if the engine was aborted meanwhile
+        :rtype: bool
+        """
+
+        with self.throttle:
+            self.throttle.wait_for(lambda: self.pending < self.limit or self.aborted)
+
+            if self.aborted:
+                return False
+
+            self.pending += 1
+            return True
+
+    def _release(self):
+        """
+        .. py:function:: _release(self)
 
-        Main entry point for the class.
+        Frees a place among the pending job(s), waking up a producer waiting for it.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        with self.throttle:
+            self.pending -= 1
+            self.throttle.notify()
+
+    def _dispatch_batch(self, batch):
+        """
+        .. py:function:: _dispatch_batch(self, batch)
+
+        Dispatches a batch of evidence(s) to every shard's concurrent process(es), blocking while :code:`BATCH_MAX_PENDING` job(s) per concurrent process are still pending so that producer(s) extracting faster than the scan do not pile data up in the task queue(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param batch: list of tuple(s) containing the identifier of an evidence, the identifier of its parent, its in-memory data (or the :code:`slab.Slot` holding it, or the path to the file it was spilled to) and its context if any
+        :type batch: list
+        """
+
+        slots = [data for _, __, data, ___ in batch if isinstance(data, _slab.Slot)]
+
+        for pool in self.pools:
+            if not self._reserve():
+                return
+
+            pool.apply_async(
+                _processors.File(self.case.arguments.hash_algorithms, self.case.arguments.callbacks, self.queue, self.case.arguments.fast, self.referenced, self.features, self.case.resources["storage"]).run, 
+                (batch,), 
+                callback=functools.partial(self._complete_batch, slots),
+                error_callback=functools.partial(self._abort_batch, slots))
+
+        _log.debug("Mapped concurrent job(s) to consume <{}> evidence(s).".format(len(batch)))
+
+    def _compile_rulesets(self):
+        """
+        .. py:function:: _compile_rulesets(self)
+
+        Compiles every available YARA ruleset.
 
         :param self: current class instance
         :type self: class
@@ -183,10 +374,281 @@ class Engine:
             _log.fault("No YARA ruleset(s) loaded. Quitting.")
 
         _log.info("Applying a total of <{}> YARA rule(s) from <{}> ruleset(s).".format(loaded["rules"], loaded["rulesets"]))
-        del loaded
 
-        if not self._dispatch_jobs():
-            _log.warning("Skipping <{}> module(s) invocation.".format(_models.Post.__name__))
+        if self.case.arguments.prefilter:
+            _log.info("Prefiltering <{}> out of <{}> ruleset(s) using literal atom(s).".format(len(self.prefilters), loaded["rulesets"]))
+
+    def _start_callbacks(self):
+        """
+        .. py:function:: _start_callbacks(self)
+
+        Renders the setting(s) of the callback executor shared by every process and spawns the dedicated callback process in :code:`process` mode.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.settings = {
+            "names": self.case.arguments.callbacks,
+            "mode": self.case.arguments.callback_executor,
+            "size": self.case.arguments.callback_queue_size,
+            "overflow": self.case.arguments.callback_overflow,
+            "spool": (self.case.require_temporary_directory() if self.case.arguments.callback_overflow == "spill" else None)
+        }
+
+        if self.settings["names"] and self.settings["mode"] == "process":
+            self.settings["channel"] = multiprocessing.Queue(maxsize=self.settings["size"])
+
+            self.callback = multiprocessing.Process(target=_executor.Executor.serve, args=(self.settings["names"], self.settings["channel"], self.settings["spool"]))
+            self.callback.daemon = True
+            self.callback.start()
+
+            _log.debug("Started callback subprocess to consume match(es) off the scanning process(es).")
+
+        _processors.File.settings = self.settings
+
+    def start(self):
+        """
+        .. py:function:: start(self)
+
+        Compiles the YARA ruleset(s) and spawns the reader and the concurrent process(es) so that evidence(s) can be scanned as soon as they are submitted.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self._compile_rulesets()
+
+        if _conf.SHARED_MEMORY_SIZE:
+            try:
+                self.slab = _slab.Slab(_conf.SHARED_MEMORY_SIZE)
+                _log.debug("Created shared memory segment <{}> of <{}> byte(s) to hand in-memory artifact(s) over to concurrent process(es).".format(self.slab.name, _conf.SHARED_MEMORY_SIZE))
+
+            except OSError:
+                _log.warning("Failed to create a shared memory segment. In-memory artifact(s) will be pickled to concurrent process(es).")
+
+        self.manager = multiprocessing.Manager()
+        self.queue = self.manager.Queue()
+        self.results = (multiprocessing.Lock(), multiprocessing.Value(ctypes.c_int, 0), self.manager.list())
+
+        self.reader = multiprocessing.Process(target=_reader.Reader(self.queue, self.results, {
+            "target": self.case.resources["matches"],
+            "storage": self.case.resources["storage"],
+            "format": self.case.arguments.format
+        }).run)
+
+        self.reader.daemon = True
+        self.reader.start()
+
+        _log.debug("Started reader subprocess to consume queue result(s).")
+
+        self.features = (self.case.arguments.features or bool(self.referenced & {"plast_entropy", "plast_block_entropy_maximum", "plast_block_entropy_minimum"}))
+
+        if self.features:
+            _log.debug("Computing byte histogram and entropy feature(s) for every evidence.")
+
+        self._start_callbacks()
+
+        shards = self._partition_rulesets(self.case.arguments.shards)
+        processes = max(1, self.case.arguments.processes // len(shards))
+
+        if len(shards) > 1:
+            _log.info("Sharding YARA rule(s) across <{}> group(s) of <{}> concurrent process(es).".format(len(shards), processes))
+
+        self.limit = max(1, _conf.BATCH_MAX_PENDING * processes * len(shards))
+
+        self.stack = contextlib.ExitStack()
+        self.pools = [self.stack.enter_context(_magic.Pool(processes=processes, initializer=_processors.File.initialize, initargs=(shard + ((self.slab.name if self.slab else None), self.settings)))) for shard in shards]
+
+    def submit(self, evidence, parent=None, data=None, context=None, path=None):
+        """
+        .. py:function:: submit(self, evidence, parent=None, data=None, context=None, path=None)
+
+        Queues an evidence for scanning. Small evidence(s) are grouped into batch(es) so that their features are computed in a single vectorized pass, large evidence(s) being dispatched alone.
+
+        This method is thread-safe so that concurrent :code:`models.Pre` module(s) can feed the engine while extracting. It blocks while too many batch(es) are pending, which slows the producer(s) down to the pace of the scan.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the evidence, or identifier of the in-memory artifact
+        :type evidence: str
+
+        :param parent: identifier of the container the evidence was extracted from
+        :type parent: str
+
+        :param data: data of the in-memory artifact, :code:`None` for evidence(s) on disk
+        :type data: bytes
+
+        :param context: dictionary describing where the evidence was found (e.g. the 5-tuple of a network flow), reported along with its match(es)
+        :type context: dict
+
+        :param path: absolute path to the file holding an artifact spilled to disk, :code:`evidence` being its identifier
+        :type path: str
+        """
+
+        size = (len(data) if data is not None else os.path.getsize(path or evidence))
+
+        if size > self.case.arguments.max_size:
+            _log.warning("Evidence <{}> exceeds the maximum size. Ignoring evidence. Try changing --max-size to override this behavior.".format(evidence))
+            return
+
+        if data is not None and self.slab:
+            data = (self.slab.put(data, references=len(self.pools), timeout=_conf.SHARED_MEMORY_TIMEOUT) or data)
+
+        if data is None:
+            data = path
+
+        if size > _conf.BATCH_THRESHOLD:
+            self._dispatch_batch([(evidence, parent, data, context)])
             return
 
+        with self.lock:
+            self.batch.append((evidence, parent, data, context))
+
+            if len(self.batch) < _conf.BATCH_SIZE:
+                return
+
+            batch, self.batch = self.batch, []
+
+        self._dispatch_batch(batch)
+
+    def report(self, data):
+        """
+        .. py:function:: report(self, data)
+
+        Emits a match that was not produced by a scan of the current case (e.g. a result cached by a previous case), as if it had been returned by a concurrent process.
+
+        :param self: current class instance
+        :type self: class
+
+        :param data: dictionary containing the match data
+        :type data: dict
+        """
+
+        with self.lock:
+            self.reported += 1
+
+        self.queue.put(data)
+        _processors.File(self.case.arguments.hash_algorithms, self.case.arguments.callbacks, self.queue)._invoke_callbacks([data])
+
+    def join(self):
+        """
+        .. py:function:: join(self)
+
+        Flushes the pending batch, waits for every submitted evidence to be scanned and invokes the :code:`models.Post` module(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :return: number of match(es)
+        :rtype: int
+        """
+
+        with self.lock:
+            batch, self.batch = self.batch, []
+
+        if batch:
+            self._dispatch_batch(batch)
+
+        self.stack.close()
+        self.queue.put(_codes.DONE)
+
+        if self.slab:
+            self.slab.close()
+
+        _processors.File.stop_executor()
+
+        if self.callback:
+            self.settings["channel"].put(_codes.DONE)
+
+            with _magic.Hole(KeyboardInterrupt, action=lambda:_log.fault("Aborted due to manual user interruption <SIGINT>.")):
+                self.callback.join()
+
+        with _magic.Hole(KeyboardInterrupt, action=lambda:_log.fault("Aborted due to manual user interruption <SIGINT>.")):
+            self.reader.join()
+
+        self._report_statistics()
+
+        count = self.results[1].value
+        self.manager.shutdown()
+
+        for function in self.case.deferred:
+            with _magic.Hole(Exception, action=lambda:_log.exception("Exception raised within deferred function <{}>.".format(function.__qualname__))):
+                function()
+
+        if not count:
+            _log.warning("Skipping <{}> module(s) invocation.".format(_models.Post.__name__))
+            return count
+
         self._invoke_post_modules()
+        return count
+
+    def abort(self):
+        """
+        .. py:function:: abort(self)
+
+        Tears down the concurrent process(es), the reader, the callback executor, the shared memory segment and the manager without waiting for pending evidence(s), so that the program can quit cleanly on a fatal error.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        with self.throttle:
+            self.aborted = True
+            self.throttle.notify_all()
+
+        for pool in self.pools:
+            pool.terminate()
+            pool.join()
+
+        self.stack.pop_all()
+        _processors.File.stop_executor()
+
+        for process in (self.callback, self.reader):
+            if process and process.is_alive():
+                process.terminate()
+                process.join()
+
+        if self.slab:
+            self.slab.close()
+            self.slab = None
+
+        self.manager.shutdown()
+
+    def _invoke_post_modules(self):
+        """
+        .. py:function:: _invoke_post_modules(self)
+
+        Invoke the selected :code:`models.Post` module(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for name in self.case.arguments.post:
+            Module = _loader.load_module(name, _models.Post)
+
+            if Module:
+                module = Module()
+                module.__name__ = name
+
+                with _magic.Invocator(module):
+                    module.run(self.case)
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the class, scanning every evidence tracked by the case at once.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.start()
+
+        for evidence in self.case.resources["evidences"]:
+            self.submit(evidence, self.case.resources["parents"].get(evidence))
+
+        self.join()
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.internal.loader import Loader as _loader
+
+from framework.contexts import models as _models
+from framework.contexts.logger import Logger as _log
+from framework.contexts.types import Codes as _codes
+
+import itertools
+import os
+import pickle
+import queue
+import threading
+import time
+
+__all__ = [
+    "Executor"
+]
+
+class Executor:
+    """Runs the :code:`models.Callback` module(s) off the scanning hot path, match(es) being handed over through a bounded queue."""
+
+    def __init__(self, names, mode="thread", size=64, overflow="block", spool=None, channel=None):
+        """
+        .. py:function:: __init__(self, names, mode="thread", size=64, overflow="block", spool=None, channel=None)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param names: list containing the name of the :code:`models.Callback` modules to invoke
+        :type names: list
+
+        :param mode: :code:`inline` to run the callback(s) in the scanning thread, :code:`thread` to run them in a dedicated thread of the current process or :code:`process` to hand the match(es) over to a dedicated process through :code:`channel`
+        :type mode: str
+
+        :param size: maximum number of batch(es) waiting in the queue
+        :type size: int
+
+        :param overflow: behavior when the queue is full, either :code:`block`, :code:`drop` or :code:`spill` to disk
+        :type overflow: str
+
+        :param spool: absolute path to the directory batch(es) are spilled to
+        :type spool: str
+
+        :param channel: :code:`multiprocessing.Queue` instance feeding the dedicated process in :code:`process` mode
+        :type channel: class
+        """
+
+        self.names = names
+        self.mode = mode
+        self.overflow = overflow
+        self.spool = spool
+        self.channel = channel
+        self.queue = (queue.Queue(maxsize=size) if mode == "thread" else None)
+        self.instances = []
+        self.counter = itertools.count()
+        self.prefix = "{}_".format(os.getpid())
+        self.thread = None
+        self.metrics = {}
+        self.statistics = {
+            "dropped": 0,
+            "spilled": 0
+        }
+
+    def start(self):
+        """
+        .. py:function:: start(self)
+
+        Sets up the callback module(s) and starts the consumer thread, if any.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.mode == "process":
+            return
+
+        self._setup()
+
+        if self.mode == "thread":
+            self.thread = threading.Thread(target=self._consume, args=(self.queue,), daemon=True)
+            self.thread.start()
+
+    def _setup(self):
+        """
+        .. py:function:: _setup(self)
+
+        Loads the callback module(s) and calls their :code:`setup` method once for the lifetime of the executor.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for name in self.names:
+            Module = _loader.load_module(name, _models.Callback)
+
+            if not Module:
+                continue
+
+            module = Module()
+            module.__name__ = name
+
+            try:
+                module.setup()
+
+            except Exception:
+                _log.exception("Failed to set up callback module <{}> in process <{}>. Ignoring module.".format(name, os.getpid()))
+                continue
+
+            self.instances.append(module)
+            self.metrics[name] = {"batches": 0, "matches": 0, "time": 0.0, "maximum": 0.0, "delay": 0.0}
+
+            _log.debug("Set up callback module <{}> in process <{}>.".format(name, os.getpid()))
+
+    def _teardown(self):
+        """
+        .. py:function:: _teardown(self)
+
+        Calls the :code:`teardown` method of the callback module(s) and displays their latency metrics.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for module in self.instances:
+            try:
+                module.teardown()
+                _log.debug("Tore down callback module <{}> in process <{}>.".format(module.__name__, os.getpid()))
+
+            except Exception:
+                _log.exception("Failed to tear down callback module <{}> in process <{}>.".format(module.__name__, os.getpid()))
+
+        for name, metrics in self.metrics.items():
+            if metrics["batches"]:
+                _log.debug("Callback module <{}> consumed <{}> match(es) in <{}> batch(es) in process <{}>: <{:.3f}> ms mean and <{:.3f}> ms maximum latency per batch, <{:.3f}> ms mean queueing delay.".format(
+                    name, metrics["matches"], metrics["batches"], os.getpid(), metrics["time"] * 1000 / metrics["batches"], metrics["maximum"] * 1000, metrics["delay"] * 1000 / metrics["batches"]))
+
+        self.instances = []
+
+    def _deliver(self, matches, queued):
+        """
+        .. py:function:: _deliver(self, matches, queued)
+
+        Hands a batch of match(es) over to every callback module, accounting for the time spent in each one.
+
+        :param self: current class instance
+        :type self: class
+
+        :param matches: list of dictionaries containing the match data
+        :type matches: list
+
+        :param queued: time at which the batch was submitted, as returned by :code:`time.time`
+        :type queued: float
+        """
+
+        for module in self.instances:
+            delay = time.time() - queued
+            start = time.perf_counter()
+
+            try:
+                module.run_batch(matches)
+
+            except Exception:
+                _log.exception("Exception raised within callback module <{}>.".format(module.__name__))
+
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics = self.metrics[module.__name__]
+
+                metrics["batches"] += 1
+                metrics["matches"] += len(matches)
+                metrics["time"] += elapsed
+                metrics["maximum"] = max(metrics["maximum"], elapsed)
+                metrics["delay"] += delay
+
+    def _spill(self, item):
+        """
+        .. py:function:: _spill(self, item)
+
+        Writes a batch that does not fit in the queue to the spool directory, to be consumed once the queue drains.
+
+        :param self: current class instance
+        :type self: class
+
+        :param item: tuple containing the submission time and the list of match(es)
+        :type item: tuple
+        """
+
+        path = os.path.join(self.spool, "{}{:010d}.batch".format(self.prefix, next(self.counter)))
+
+        with open("{}.tmp".format(path), "wb") as file:
+            pickle.dump(item, file)
+
+        os.replace("{}.tmp".format(path), path)
+        self.statistics["spilled"] += len(item[1])
+
+    def _unspool(self, prefix):
+        """
+        .. py:function:: _unspool(self, prefix)
+
+        Reads and removes the oldest spilled batch, if any.
+
+        :param self: current class instance
+        :type self: class
+
+        :param prefix: prefix of the spilled batch(es) to consume
+        :type prefix: str
+
+        :return: tuple containing the submission time and the list of match(es), :code:`None` if no batch was spilled
+        :rtype: tuple
+        """
+
+        if not self.spool or not os.path.isdir(self.spool):
+            return None
+
+        names = sorted(name for name in os.listdir(self.spool) if name.startswith(prefix) and name.endswith(".batch"))
+
+        if not names:
+            return None
+
+        path = os.path.join(self.spool, names[0])
+
+        with open(path, "rb") as file:
+            item = pickle.load(file)
+
+        os.remove(path)
+        return item
+
+    def _consume(self, source, prefix=None):
+        """
+        .. py:function:: _consume(self, source, prefix=None)
+
+        Consumer loop delivering the queued batch(es), then the spilled one(s) whenever the queue is empty, until :code:`Codes.DONE` is received and everything is drained.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: queue to consume
+        :type source: class
+
+        :param prefix: prefix of the spilled batch(es) to consume, the ones of the current process if :code:`None`
+        :type prefix: str
+        """
+
+        prefix = (self.prefix if prefix is None else prefix)
+        done = False
+
+        while True:
+            try:
+                item = source.get(block=False)
+
+            except queue.Empty:
+                item = self._unspool(prefix)
+
+                if item is None:
+                    if done:
+                        break
+
+                    try:
+                        item = source.get(timeout=0.1)
+
+                    except queue.Empty:
+                        continue
+
+            if item == _codes.DONE:
+                done = True
+                continue
+
+            self._deliver(item[1], item[0])
+
+    def submit(self, matches):
+        """
+        .. py:function:: submit(self, matches)
+
+        Submits a batch of match(es) to the callback module(s), applying the overflow behavior if the queue is full. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param matches: list of dictionaries containing the match data
+        :type matches: list
+        """
+
+        if self.mode == "inline":
+            self._deliver(matches, time.time())
+            return
+
+        target = (self.queue if self.mode == "thread" else self.channel)
+        item = (time.time(), matches)
+
+        if self.overflow == "block":
+            target.put(item)
+            return
+
+        try:
+            target.put_nowait(item)
+
+        except queue.Full:
+            if self.overflow == "spill" and self.spool:
+                self._spill(item)
+
+            else:
+                self.statistics["dropped"] += len(matches)
+
+    def close(self):
+        """
+        .. py:function:: close(self)
+
+        Waits for every submitted batch to be delivered, then tears down the callback module(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.thread:
+            self.queue.put(_codes.DONE)
+            self.thread.join()
+
+        if self.statistics["dropped"]:
+            _log.warning("Dropped <{}> match(es) that did not fit in the callback queue of process <{}>. Try --callback-overflow block or spill to change this behavior.".format(self.statistics["dropped"], os.getpid()))
+
+        if self.statistics["spilled"]:
+            _log.debug("Spilled <{}> match(es) that did not fit in the callback queue of process <{}> to <{}>.".format(self.statistics["spilled"], os.getpid(), self.spool))
+
+        self._teardown()
+
+    @staticmethod
+    def serve(names, channel, spool=None):
+        """
+        .. py:function:: serve(names, channel, spool=None)
+
+        Entry point of the dedicated callback process in :code:`process` mode, consuming the batch(es) submitted by every scanning process until :code:`Codes.DONE` is received.
+
+        :param names: list containing the name of the :code:`models.Callback` modules to invoke
+        :type names: list
+
+        :param channel: :code:`multiprocessing.Queue` instance fed by the scanning process(es)
+        :type channel: class
+
+        :param spool: absolute path to the directory batch(es) are spilled to
+        :type spool: str
+        """
+
+        executor = Executor(names, mode="inline", spool=spool)
+        executor.start()
+
+        try:
+            executor._consume(channel, prefix="")
+
+        finally:
+            executor._teardown()
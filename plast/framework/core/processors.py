@@ -1,17 +1,24 @@
 # -*- coding: utf-8 -*-
 
+from framework.api.external import features as _features
 from framework.api.external import rendering as _rendering
 
-from framework.api.internal import magic as _magic
+from framework.api.internal.identifier import Identifier as _identifier
 from framework.api.internal.loader import Loader as _loader
 
-from framework.contexts import models as _models
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.logger import Logger as _log
 from framework.contexts.meta import Meta as _meta
 
+from framework.core import executor as _executor
+from framework.core import slab as _slab
+
 import hashlib
+import multiprocessing.util
 import os.path
+import shutil
+import threading
+import time
 
 try:
     import pendulum
@@ -28,9 +35,137 @@ __all__ = [
 class File:
     """Core multiprocessed class that processes the evidence(s) asynchronously."""
 
-    def __init__(self, algorithms, callbacks, queue, fast=False):
+    buffers = {}
+    prefilters = {}
+    segment = None
+    settings = None
+    executor = None
+    lock = threading.Lock()
+
+    @staticmethod
+    def initialize(buffers, prefilters={}, segment=None, settings=None):
+        """
+        .. py:function:: initialize(buffers, prefilters={}, segment=None, settings=None)
+
+        Initializer of the concurrent process(es), loading the rule(s) and starting the callback executor once for the lifetime of the process.
+
+        :param buffers: dictionary containing precompiled YARA rule(s)
+        :type buffers: dict
+
+        :param prefilters: dictionary containing precompiled prefilter rule(s) indexed by ruleset
+        :type prefilters: dict
+
+        :param segment: name of the shared memory segment holding in-memory artifact(s), if any
+        :type segment: str
+
+        :param settings: dictionary containing the keyword argument(s) of the callback :code:`executor.Executor`
+        :type settings: dict
+        """
+
+        File.load_rules(buffers, prefilters, segment)
+
+        File.settings = settings
+        File.executor = None
+        File.start_executor()
+
+    @staticmethod
+    def load_rules(buffers, prefilters={}, segment=None):
+        """
+        .. py:function:: load_rules(buffers, prefilters={}, segment=None)
+
+        Loads the precompiled YARA rule(s) and attaches to the shared memory segment once for the lifetime of the current concurrent process.
+
+        :param buffers: dictionary containing precompiled YARA rule(s)
+        :type buffers: dict
+
+        :param prefilters: dictionary containing precompiled prefilter rule(s) indexed by ruleset
+        :type prefilters: dict
+
+        :param segment: name of the shared memory segment holding in-memory artifact(s), if any
+        :type segment: str
+        """
+
+        _loader._load_memory_buffers(buffers)
+        _loader._load_memory_buffers(prefilters)
+
+        File.buffers = buffers
+        File.prefilters = prefilters
+
+        if segment:
+            File.segment = _slab.attach(segment)
+
+        _log.debug("Loaded <{}> precompiled YARA ruleset(s) in concurrent process <{}>.".format(len(buffers), os.getpid()))
+
+    @staticmethod
+    def start_executor():
+        """
+        .. py:function:: start_executor()
+
+        Starts the callback executor once for the lifetime of the current process, the executor being closed when the process exits. This method is thread-safe.
+
+        :return: :code:`executor.Executor` instance, :code:`None` if no callback module is selected
+        :rtype: class
+        """
+
+        if File.executor or not File.settings or not File.settings["names"]:
+            return File.executor
+
+        with File.lock:
+            if not File.executor:
+                executor = _executor.Executor(**File.settings)
+                executor.start()
+
+                multiprocessing.util.Finalize(None, File.stop_executor, exitpriority=10)
+                File.executor = executor
+
+        return File.executor
+
+    @staticmethod
+    def stop_executor():
+        """
+        .. py:function:: stop_executor()
+
+        Waits for the callback executor of the current process to deliver every pending match, then closes it.
+        """
+
+        with File.lock:
+            executor, File.executor = File.executor, None
+
+        if executor:
+            executor.close()
+
+    @staticmethod
+    def declare_externals(algorithms):
         """
-        .. py:function:: __init__(self, algorithms, callbacks, queue)
+        .. py:function:: declare_externals(algorithms)
+
+        Renders the YARA external variable(s) precomputed for every evidence along with their default value, prefixed with :code:`plast_` so that they do not collide with the identifier(s) of the rule(s).
+
+        :param algorithms: list containing the name of the hash algorithm(s) to expose
+        :type algorithms: list
+
+        :return: dictionary containing the default value of each external variable
+        :rtype: dict
+        """
+
+        externals = {
+            "plast_filename": "",
+            "plast_filepath": "",
+            "plast_extension": "",
+            "plast_filetype": "",
+            "plast_parent": "",
+            "plast_size": 0,
+            "plast_entropy": 0.0,
+            "plast_block_entropy_maximum": 0.0,
+            "plast_block_entropy_minimum": 0.0
+        }
+
+        externals.update({"plast_{}".format(algorithm): "" for algorithm in algorithms})
+        return externals
+
+    def __init__(self, algorithms, callbacks, queue, fast=False, externals=set(), features=False, storage=None):
+        """
+        .. py:function:: __init__(self, algorithms, callbacks, queue, fast=False, externals=set(), features=False, storage=None)
 
         Initialization method for the class.
 
@@ -48,70 +183,296 @@ class File:
 
         :param queue: :code:`multiprocessing.Manager.Queue` instance
         :type queue: class
+
+        :param externals: set containing the name of the costly external variable(s) referenced by the loaded rule(s)
+        :type externals: set
+
+        :param features: flag specifying whether the byte histogram and entropy of the evidence(s) must be computed
+        :type features: bool
+
+        :param storage: absolute path to the directory where matching in-memory artifact(s) must be saved
+        :type storage: str
         """
 
         self.algorithms = algorithms
         self.callbacks = callbacks
         self.queue = queue
         self.fast = fast
+        self.externals = externals
+        self.features = features
+        self.storage = storage
 
-    def _compute_hash(self, evidence, algorithm="sha256", buffer_size=65536):
+    def _read_evidence(self, evidence):
         """
-        .. py:function:: _compute_hash(self, evidence, algorithm="sha256", buffer_size=65536)
+        .. py:function:: _read_evidence(self, evidence)
 
-        Computes the hash from the evidence's data.
+        Loads a small evidence in memory so that its data is read only once for hashing, feature extraction and matching.
 
         :param self: current class instance
         :type self: class
 
-        :param evidence: absolute path to the evidence to compute the hash from
+        :param evidence: absolute path to the evidence
         :type evidence: str
 
-        :param algorithm: lowercase name of the hash algorithm to compute
-        :type algorithm: str
+        :return: data of the evidence, :code:`None` if it exceeds the batching threshold and must be streamed from disk
+        :rtype: bytes
+        """
+
+        if os.path.getsize(evidence) > _conf.BATCH_THRESHOLD:
+            return None
+
+        with open(evidence, "rb") as file:
+            return file.read()
+
+    def _resolve_buffer(self, evidence, data):
+        """
+        .. py:function:: _resolve_buffer(self, evidence, data)
+
+        Resolves the data of an evidence, in-memory artifact(s) handed over through shared memory being viewed in place rather than copied.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the evidence, or identifier of the in-memory artifact
+        :type evidence: str
+
+        :param data: data of the in-memory artifact, :code:`slab.Slot` instance holding it, absolute path to the file it was spilled to, or :code:`None` for evidence(s) on disk
+        :type data: bytes
+
+        :return: data of the evidence, :code:`None` if it must be streamed from disk
+        :rtype: bytes
+        """
+
+        if isinstance(data, _slab.Slot):
+            return File.segment.buf[data.offset:data.offset + data.length]
+
+        if isinstance(data, str):
+            return self._read_evidence(data)
+
+        return (data if data is not None else self._read_evidence(evidence))
+
+    def _compute_features(self, batch, buffers):
+        """
+        .. py:function:: _compute_features(self, batch, buffers)
+
+        Computes the features of every evidence of the batch, in-memory evidence(s) being processed in a single vectorized pass.
+
+        :param self: current class instance
+        :type self: class
+
+        :param batch: list of tuple(s) containing the identifier of an evidence, the identifier of its parent, its in-memory data and its context if any
+        :type batch: list
+
+        :param buffers: list containing the data of each evidence, :code:`None` for the evidence(s) to stream from disk
+        :type buffers: list
+
+        :return: list containing the features of each evidence
+        :rtype: list
+        """
+
+        if not self.features:
+            return [None] * len(batch)
+
+        loaded = iter(_features.compute_features([data for data in buffers if data is not None]))
+
+        return [(next(loaded) if data is not None else _features.compute_file_features(source if isinstance(source, str) else evidence)) for (evidence, _, source, __), data in zip(batch, buffers)]
+
+    def _compute_hashes(self, algorithms, buffer_size=65536):
+        """
+        .. py:function:: _compute_hashes(self, algorithms, buffer_size=65536)
+
+        Computes several hashes from the evidence's data in a single pass, reusing the in-memory data when available.
+
+        :param self: current class instance
+        :type self: class
+
+        :param algorithms: list containing the lowercase name of the hash algorithm(s) to compute
+        :type algorithms: list
 
         :param buffer_size: size of the buffer
         :type buffer_size: int
 
-        :return: hexadecimal digest of the given file
-        :rtype: str
+        :return: dictionary containing the hexadecimal digest of the given file for each algorithm
+        :rtype: dict
         """
 
-        with open(evidence, "rb") as file:
-            cipher = getattr(hashlib, algorithm)()
+        ciphers = {algorithm: getattr(hashlib, algorithm)() for algorithm in algorithms}
+
+        if not ciphers:
+            return {}
+
+        if self.data is not None:
+            for cipher in ciphers.values():
+                cipher.update(self.data)
 
+            return {algorithm: cipher.hexdigest() for algorithm, cipher in ciphers.items()}
+
+        with open(self.path, "rb") as file:
             while True:
                 data = file.read(buffer_size)
 
                 if not data:
                     break
 
-                cipher.update(data)
-                
-        return cipher.hexdigest()
+                for cipher in ciphers.values():
+                    cipher.update(data)
+
+        return {algorithm: cipher.hexdigest() for algorithm, cipher in ciphers.items()}
+
+    def _compute_externals(self):
+        """
+        .. py:function:: _compute_externals(self)
+
+        Computes the value of the YARA external variable(s) for the evidence.
+
+        Costly variable(s) (i.e. file type and hashes) are only computed when referenced by the loaded rule(s), features being computed upstream for the whole batch.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: dictionary containing the value of each external variable
+        :rtype: dict
+        """
+
+        externals = {
+            "plast_filename": os.path.basename(self.evidence),
+            "plast_filepath": self.evidence,
+            "plast_extension": os.path.splitext(self.evidence)[1][1:].lower(),
+            "plast_parent": (self.parent or ""),
+            "plast_size": (len(self.data) if self.data is not None else os.path.getsize(self.path))
+        }
+
+        if "plast_filetype" in self.externals:
+            meta = (_identifier.identify_data(self.data[:_conf.IDENTIFICATION_HEADER_SIZE]) if self.data is not None else _identifier.identify_evidence(self.path))
+            externals["plast_filetype"] = ((meta.mime or "") if meta else "")
+
+        if self.profile:
+            externals["plast_entropy"] = self.profile["entropy"]
+            externals["plast_block_entropy_maximum"] = self.profile["blocks"]["maximum"]
+            externals["plast_block_entropy_minimum"] = self.profile["blocks"]["minimum"]
+
+        self.hashes = self._compute_hashes([algorithm for algorithm in self.algorithms if "plast_{}".format(algorithm) in self.externals])
+        externals.update({"plast_{}".format(algorithm): digest for algorithm, digest in self.hashes.items()})
+
+        return externals
 
-    def _invoke_callbacks(self, data):
+    def _invoke_callbacks(self, matches):
         """
-        .. py:function:: _invoke_callbacks(self, data)
+        .. py:function:: _invoke_callbacks(self, matches)
 
-        Invokes the selected :code:`models.Callback` module(s) with the matching data.
+        Submits a batch of match(es) to the callback executor of the current process, so that the :code:`models.Callback` module(s) do not stall the scan.
 
         :param self: current class instance
         :type self: class
 
-        :param data: dictionary containing the match data
-        :type data: dict
+        :param matches: list of dictionaries containing the match data
+        :type matches: list
+        """
+
+        executor = File.start_executor()
+
+        if executor:
+            executor.submit(matches)
+
+    def _match(self, tier, rules, fast=False):
+        """
+        .. py:function:: _match(self, tier, rules, fast=False)
+
+        Applies precompiled YARA rule(s) to the evidence and accounts for the time spent in the given tier.
+
+        :param self: current class instance
+        :type self: class
+
+        :param tier: name of the scanning tier (:code:`prefilter` or :code:`confirm`)
+        :type tier: str
+
+        :param rules: precompiled YARA rule(s)
+        :type rules: class
+
+        :param fast: flag specifying whether YARA must be performing a fast scan
+        :type fast: bool
+
+        :return: list of match(es)
+        :rtype: list
         """
 
-        for name in self.callbacks:
-            Module = _loader.load_module(name, _models.Callback)
+        start = time.perf_counter()
 
-            if Module:
-                module = Module()
-                module.__name__ = name
+        try:
+            if self.data is not None:
+                return rules.match(data=self.data, externals=self.values, timeout=_conf.YARA_MATCH_TIMEOUT, fast=fast)
 
-                with _magic.Invocator(module):
-                    module.run(data)
+            return rules.match(self.path, externals=self.values, timeout=_conf.YARA_MATCH_TIMEOUT, fast=fast)
+
+        finally:
+            self.statistics[tier]["scans"] += 1
+            self.statistics[tier]["time"] += time.perf_counter() - start
+
+    def _passes_prefilter(self, ruleset):
+        """
+        .. py:function:: _passes_prefilter(self, ruleset)
+
+        Applies the cheap prefilter tier of :code:`ruleset`, if any, to the evidence.
+
+        :param self: current class instance
+        :type self: class
+
+        :param ruleset: absolute path to the ruleset file
+        :type ruleset: str
+
+        :return: :code:`True` if the full ruleset must be applied to the evidence, else :code:`False`
+        :rtype: bool
+        """
+
+        if ruleset not in self.prefilters:
+            return True
+
+        try:
+            if self._match("prefilter", self.prefilters[ruleset], fast=True):
+                return True
+
+        except (
+            yara.Error,
+            Exception):
+
+            _log.exception("YARA exception raised during prefiltering of evidence <{}>.".format(self.evidence))
+            return True
+
+        self.statistics["spared"] += 1
+        return False
+
+    def _store_artifact(self):
+        """
+        .. py:function:: _store_artifact(self)
+
+        Saves a matching in-memory artifact to the storage directory, as the reader can only copy matching evidence(s) that exist on disk.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if not self.storage or self.stored:
+            return
+
+        self.stored = True
+
+        name = "{}_{}".format(self._compute_hashes(["sha256"])["sha256"][:16], os.path.basename(self.evidence.replace(_conf.ARTIFACT_SEPARATOR, os.sep)))
+        path = (os.path.join(self.storage, name) if not _conf.NEUTRALIZE_MATCHING_EVIDENCES else os.path.join(self.storage, "{}.{}".format(name, _meta.__package__)))
+
+        try:
+            os.makedirs(self.storage, exist_ok=True)
+
+            if self.data is None:
+                shutil.copyfile(self.path, path)
+
+            else:
+                with open(path, "wb") as file:
+                    file.write(self.data)
+
+            _log.debug("Saved matching artifact <{}> as <{}>.".format(self.evidence, path))
+
+        except OSError:
+            _log.exception("Failed to save matching artifact <{}> as <{}>.".format(self.evidence, path))
 
     def _consume_evidence(self):
         """
@@ -123,20 +484,29 @@ class File:
         :type self: class
         """
 
-        for _, buffer in self.buffers.items():
+        for ruleset, buffer in self.buffers.items():
+            if not self._passes_prefilter(ruleset):
+                continue
+
             try:
-                for match in buffer.match(self.evidence, timeout=_conf.YARA_MATCH_TIMEOUT, fast=self.fast):
-                    hashes = {}
+                for match in self._match("confirm", buffer, fast=self.fast):
+                    if _conf.YARA_PREFILTER_TAG in match.tags:
+                        continue
+
+                    if len(self.hashes) < len(self.algorithms):
+                        self.hashes.update(self._compute_hashes([algorithm for algorithm in self.algorithms if algorithm not in self.hashes]))
 
-                    for algorithm in self.algorithms:
-                        hashes[algorithm] = self._compute_hash(self.evidence, algorithm=algorithm)
+                    if self.artifact:
+                        self._store_artifact()
 
-                    for action in [self.queue.put, self._invoke_callbacks]:
+                    for action in [self.queue.put, self.matches.append]:
                         action({
                             "origin": _meta.__package__,
                             "target": {
-                                "type": "file",
-                                "identifier": self.evidence
+                                "type": ("artifact" if self.artifact else "file"),
+                                "identifier": self.evidence,
+                                "parent": self.parent,
+                                "context": self.context
                             },
                             "match": {
                                 "timestamp": _rendering.timestamp(),
@@ -144,7 +514,8 @@ class File:
                                 "meta": match.meta,
                                 "namespace": match.namespace,
                                 "tags": match.tags,
-                                "hashes": hashes,
+                                "hashes": self.hashes,
+                                "features": self.profile,
                                 "strings": [{
                                     "offset": string[0],
                                     "reference": string[1], 
@@ -163,24 +534,47 @@ class File:
                 _log.exception("YARA exception raised during processing of evidence <{}>.".format(self.evidence))
                 continue
 
-    def run(self, evidence, buffers):
+    def run(self, batch):
         """
-        .. py:function:: run(self, evidence, buffers)
+        .. py:function:: run(self, batch)
 
         Main entry point for the class.
 
         :param self: current class instance
         :type self: class
 
-        :param evidence: absolute path to the evidence file to consume
-        :type evidence: str
+        :param batch: list of tuple(s) containing the absolute path to an evidence file to consume (or the identifier of an in-memory artifact), the identifier of the container it was extracted from, the artifact's data (or the :code:`slab.Slot` holding it) and its context if any
+        :type batch: list
 
-        :param buffers: dictionary containing precompiled YARA rule(s)
-        :type buffers: dict
+        :return: dictionary containing the timing statistics of both scanning tiers
+        :rtype: dict
         """
 
-        self.evidence = evidence
-        self.buffers = buffers
+        self.statistics = {
+            "prefilter": {"scans": 0, "time": 0.0},
+            "confirm": {"scans": 0, "time": 0.0},
+            "spared": 0
+        }
+
+        self.matches = []
+        buffers = [self._resolve_buffer(evidence, data) for evidence, _, data, __ in batch]
+
+        try:
+            for (evidence, parent, data, context), buffer, profile in zip(batch, buffers, self._compute_features(batch, buffers)):
+                self.evidence, self.parent, self.data, self.context, self.profile = evidence, parent, buffer, context, profile
+                self.path = (data if isinstance(data, str) else evidence)
+                self.artifact, self.stored = (data is not None), False
+                self.values = self._compute_externals()
+                self._consume_evidence()
+
+        finally:
+            self.data = None
+
+            for buffer in buffers:
+                if isinstance(buffer, memoryview):
+                    buffer.release()
+
+        if self.matches:
+            self._invoke_callbacks(self.matches)
 
-        _loader._load_memory_buffers(self.buffers)
-        self._consume_evidence()
+        return self.statistics
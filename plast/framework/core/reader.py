@@ -118,7 +118,8 @@ class Reader:
             with self.results[0]:
                 self.results[1].value += 1
 
-            self.results[2].append(item["target"]["identifier"])
+            if item["target"]["type"] == "file":
+                self.results[2].append(item["target"]["identifier"])
 
             _log.debug("Matching signature from rule <{}> on evidence <{}>.".format(item["match"]["rule"], item["target"]["identifier"]))
 
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts.logger import Logger as _log
+
+import bisect
+import collections
+import threading
+
+from multiprocessing import shared_memory
+
+__all__ = [
+    "Slab",
+    "Slot",
+    "attach"
+]
+
+Slot = collections.namedtuple("Slot", ["offset", "length"])
+
+_ALIGNMENT = 64
+
+def attach(name):
+    """
+    .. py:function:: attach(name)
+
+    Attaches the current concurrent process to a shared memory segment created by :code:`Slab`.
+
+    :param name: name of the shared memory segment
+    :type name: str
+
+    :return: :code:`multiprocessing.shared_memory.SharedMemory` instance
+    :rtype: class
+    """
+
+    return shared_memory.SharedMemory(name=name)
+
+class Slab:
+    """Shared memory segment carved into variable-size slot(s), so that in-memory artifact(s) are handed over to the concurrent process(es) without being pickled."""
+
+    def __init__(self, size):
+        """
+        .. py:function:: __init__(self, size)
+
+        Initialization method for the class.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: size of the shared memory segment in bytes
+        :type size: int
+        """
+
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.memory.name
+        self.size = size
+        self.free = [(0, size)]
+        self.references = {}
+        self.lock = threading.Lock()
+        self.released = threading.Condition(self.lock)
+        self.statistics = {
+            "shared": 0,
+            "waited": 0,
+            "pickled": 0,
+            "peak": 0,
+            "used": 0
+        }
+
+    def _allocate(self, size):
+        """
+        .. py:function:: _allocate(self, size)
+
+        Reserves the first free block large enough to hold :code:`size` byte(s). Must be called with the lock held.
+
+        :param self: current class instance
+        :type self: class
+
+        :param size: aligned size to reserve
+        :type size: int
+
+        :return: offset of the reserved block, :code:`None` if no free block is large enough
+        :rtype: int
+        """
+
+        for index, (offset, length) in enumerate(self.free):
+            if length < size:
+                continue
+
+            if length == size:
+                del self.free[index]
+
+            else:
+                self.free[index] = (offset + size, length - size)
+
+            return offset
+
+        return None
+
+    def _deallocate(self, offset, size):
+        """
+        .. py:function:: _deallocate(self, offset, size)
+
+        Returns a block to the free list, merging it with its free neighbour(s). Must be called with the lock held.
+
+        :param self: current class instance
+        :type self: class
+
+        :param offset: offset of the block
+        :type offset: int
+
+        :param size: aligned size of the block
+        :type size: int
+        """
+
+        index = bisect.bisect(self.free, (offset, size))
+
+        if index < len(self.free) and offset + size == self.free[index][0]:
+            size += self.free.pop(index)[1]
+
+        if index and self.free[index - 1][0] + self.free[index - 1][1] == offset:
+            offset, size = self.free[index - 1][0], self.free[index - 1][1] + size
+            index -= 1
+            del self.free[index]
+
+        self.free.insert(index, (offset, size))
+
+    def put(self, data, references=1, timeout=0):
+        """
+        .. py:function:: put(self, data, references=1, timeout=0)
+
+        Copies data to a free slot of the segment, waiting for slot(s) to be released if the segment is full so that producer(s) are slowed down to the pace of the concurrent process(es). This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param data: data to hand over
+        :type data: bytes
+
+        :param references: number of :code:`release` call(s) needed before the slot is freed, i.e. the number of concurrent job(s) reading it
+        :type references: int
+
+        :param timeout: maximum number of second(s) to wait for enough space to be released
+        :type timeout: float
+
+        :return: :code:`Slot` instance, :code:`None` if the segment is still full after :code:`timeout` second(s) and the data must be pickled instead
+        :rtype: class
+        """
+
+        length = len(data)
+        size = max(_ALIGNMENT, -(-length // _ALIGNMENT) * _ALIGNMENT)
+
+        with self.lock:
+            offset = self._allocate(size)
+
+            if offset is None and size <= self.size:
+                self.statistics["waited"] += 1
+                self.released.wait_for(lambda: any(length >= size for _, length in self.free), timeout=timeout)
+
+                offset = self._allocate(size)
+
+            if offset is None:
+                self.statistics["pickled"] += 1
+                return None
+
+            self.references[offset] = [references, size]
+            self.statistics["shared"] += 1
+            self.statistics["used"] += size
+            self.statistics["peak"] = max(self.statistics["peak"], self.statistics["used"])
+
+        self.memory.buf[offset:offset + length] = data
+        return Slot(offset, length)
+
+    def release(self, slot):
+        """
+        .. py:function:: release(self, slot)
+
+        Drops a reference to a slot, freeing it once every concurrent job reading it is done and waking up the producer(s) waiting for space. This method is thread-safe.
+
+        :param self: current class instance
+        :type self: class
+
+        :param slot: :code:`Slot` instance
+        :type slot: class
+        """
+
+        with self.lock:
+            reference = self.references[slot.offset]
+            reference[0] -= 1
+
+            if reference[0]:
+                return
+
+            del self.references[slot.offset]
+
+            self.statistics["used"] -= reference[1]
+            self._deallocate(slot.offset, reference[1])
+
+            self.released.notify_all()
+
+    def close(self):
+        """
+        .. py:function:: close(self)
+
+        Displays the transport statistics, then destroys the shared memory segment.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.statistics["shared"] or self.statistics["pickled"]:
+            _log.debug("Handed <{}> in-memory artifact(s) over through shared memory (peak usage <{}> out of <{}> byte(s)), waited <{}> time(s) for space to be released and pickled <{}> that did not fit.".format(self.statistics["shared"], self.statistics["peak"], self.size, self.statistics["waited"], self.statistics["pickled"]))
+
+        if self.references:
+            _log.warning("<{}> shared memory slot(s) were never released.".format(len(self.references)))
+
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.internal.renderer import Renderer as _renderer
+
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import collections
+import http.client
+import itertools
+import os
+import socket
+import threading
+import time
+import urllib.parse
+
+__all__ = [
+    "Callback"
+]
+
+class Callback(_models.Callback):
+    __author__ = "sk4la"
+    __description__ = "Forwards match(es) as NDJSON to a Unix socket, TCP or HTTP endpoint over a persistent connection, in batch(es)."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+
+    def setup(self):
+        """
+        .. py:function:: setup(self)
+
+        Parses the endpoint and starts the thread flushing the buffer periodically.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.endpoint = (urllib.parse.urlsplit(_conf.SINK_ENDPOINT) if _conf.SINK_ENDPOINT else None)
+        self.buffer = collections.deque()
+        self.connection = None
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.flushed = time.time()
+        self.failures = 0
+        self.retry = 0.0
+        self.statistics = {
+            "sent": 0,
+            "dropped": 0,
+            "connections": 0
+        }
+
+        if not self.endpoint:
+            _log.debug("No endpoint configured. Set SINK_ENDPOINT in order to forward match(es).")
+            return
+
+        if self.endpoint.scheme not in ("unix", "tcp", "http", "https"):
+            _log.error("Unsupported endpoint scheme <{}>. Use unix://, tcp://, http:// or https://.".format(self.endpoint.scheme))
+            self.endpoint = None
+            return
+
+        self.flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def _connect(self):
+        """
+        .. py:function:: _connect(self)
+
+        Opens the persistent connection to the endpoint.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: connected :code:`socket.socket` or :code:`http.client.HTTPConnection` instance
+        :rtype: class
+        """
+
+        if self.endpoint.scheme == "unix":
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(_conf.SINK_TIMEOUT)
+
+            try:
+                connection.connect(self.endpoint.path)
+
+            except OSError:
+                connection.close()
+                raise
+
+        elif self.endpoint.scheme == "tcp":
+            connection = socket.create_connection((self.endpoint.hostname, self.endpoint.port), timeout=_conf.SINK_TIMEOUT)
+
+        else:
+            Connection = (http.client.HTTPSConnection if self.endpoint.scheme == "https" else http.client.HTTPConnection)
+            connection = Connection(self.endpoint.hostname, self.endpoint.port, timeout=_conf.SINK_TIMEOUT)
+            connection.connect()
+
+        self.statistics["connections"] += 1
+        _log.debug("Connected to endpoint <{}> in process <{}>.".format(self.endpoint.geturl(), os.getpid()))
+
+        return connection
+
+    def _disconnect(self):
+        """
+        .. py:function:: _disconnect(self)
+
+        Closes the persistent connection, if any.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if self.connection:
+            try:
+                self.connection.close()
+
+            except OSError:
+                pass
+
+            self.connection = None
+
+    def _send(self, payload):
+        """
+        .. py:function:: _send(self, payload)
+
+        Sends a batch of NDJSON record(s) over the persistent connection, opening it first if needed.
+
+        :param self: current class instance
+        :type self: class
+
+        :param payload: NDJSON-encoded record(s)
+        :type payload: bytes
+
+        :raises OSError: if the batch could not be delivered
+        :raises HTTPException: if the endpoint answered with an HTTP error
+        """
+
+        if not self.connection:
+            self.connection = self._connect()
+
+        if self.endpoint.scheme in ("unix", "tcp"):
+            self.connection.sendall(payload)
+            return
+
+        self.connection.request("POST", (self.endpoint.path or "/") + ("?{}".format(self.endpoint.query) if self.endpoint.query else ""), body=payload, headers={"Content-Type": "application/x-ndjson"})
+
+        response = self.connection.getresponse()
+        response.read()
+
+        if response.status >= 300:
+            raise http.client.HTTPException("HTTP status <{} {}>".format(response.status, response.reason))
+
+        if response.will_close:
+            self._disconnect()
+
+    def _flush(self):
+        """
+        .. py:function:: _flush(self)
+
+        Sends the buffered record(s) in batch(es) of :code:`SINK_BATCH_SIZE`, backing off exponentially after a failure so that the endpoint is not hammered while it is down.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: :code:`True` if the buffer was emptied, else :code:`False`
+        :rtype: bool
+        """
+
+        with self.lock:
+            while self.buffer:
+                if time.time() < self.retry:
+                    return False
+
+                batch = list(itertools.islice(self.buffer, _conf.SINK_BATCH_SIZE))
+
+                try:
+                    self._send(b"".join(batch))
+
+                except (OSError, http.client.HTTPException) as exc:
+                    self._disconnect()
+
+                    self.failures += 1
+                    self.retry = time.time() + min(_conf.SINK_RETRY_DELAY * 2 ** (self.failures - 1), _conf.SINK_MAX_RETRY_DELAY)
+
+                    (_log.warning if self.failures == 1 else _log.debug)("Failed to send <{}> record(s) to endpoint <{}> ({}). Keeping <{}> record(s) buffered, retrying in <{:.1f}> second(s).".format(len(batch), self.endpoint.geturl(), exc, len(self.buffer), self.retry - time.time()))
+                    return False
+
+                for _ in batch:
+                    self.buffer.popleft()
+
+                self.failures, self.retry = 0, 0.0
+                self.statistics["sent"] += len(batch)
+
+            self.flushed = time.time()
+            return True
+
+    def _flush_periodically(self):
+        """
+        .. py:function:: _flush_periodically(self)
+
+        Flushes the buffer every :code:`SINK_FLUSH_INTERVAL` second(s) so that record(s) do not linger when match(es) are scarce.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        while not self.stopped.wait(_conf.SINK_FLUSH_INTERVAL):
+            with self.lock:
+                if self.buffer and time.time() - self.flushed >= _conf.SINK_FLUSH_INTERVAL:
+                    self._flush()
+
+    def run(self, data):
+        self.run_batch([data])
+
+    def run_batch(self, matches):
+        """
+        .. py:function:: run_batch(self, matches)
+
+        Buffers a batch of match(es) as NDJSON record(s), the oldest record(s) being dropped if the buffer exceeds :code:`SINK_MAX_BUFFERED`, and sends them once :code:`SINK_BATCH_SIZE` record(s) are pending.
+
+        :param self: current class instance
+        :type self: class
+
+        :param matches: list of dictionaries containing the match data
+        :type matches: list
+        """
+
+        if not self.endpoint:
+            return
+
+        with self.lock:
+            for data in matches:
+                self.buffer.append("{}\n".format(_renderer.to_json(data)).encode("utf-8"))
+
+            while len(self.buffer) > _conf.SINK_MAX_BUFFERED:
+                self.buffer.popleft()
+                self.statistics["dropped"] += 1
+
+            if len(self.buffer) >= _conf.SINK_BATCH_SIZE:
+                self._flush()
+
+    def teardown(self):
+        """
+        .. py:function:: teardown(self)
+
+        Stops the periodic flush and sends the remaining record(s), retrying up to :code:`SINK_FINAL_RETRIES` time(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        if not self.endpoint:
+            return
+
+        self.stopped.set()
+        self.flusher.join()
+
+        for _ in range(_conf.SINK_FINAL_RETRIES + 1):
+            if self._flush():
+                break
+
+            time.sleep(max(0.0, self.retry - time.time()))
+
+        self._disconnect()
+
+        if self.buffer:
+            self.statistics["dropped"] += len(self.buffer)
+            self.buffer.clear()
+
+        if self.statistics["dropped"]:
+            _log.warning("Dropped <{}> record(s) that could not be sent to endpoint <{}> from process <{}>.".format(self.statistics["dropped"], self.endpoint.geturl(), os.getpid()))
+
+        _log.debug("Sent <{}> record(s) to endpoint <{}> over <{}> connection(s) from process <{}>.".format(self.statistics["sent"], self.endpoint.geturl(), self.statistics["connections"], os.getpid()))
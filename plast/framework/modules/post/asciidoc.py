@@ -60,6 +60,11 @@ class Post(_models.Post):
         self._asciidoc.heading("Preamble", level=2)
         self._asciidoc.content("This is a sample report generated by the AsciiDoc postprocessing module.")
 
+        budget = self.case.budget.render()
+
+        self._asciidoc.heading("Decompression budget", level=2)
+        self._asciidoc.list(["{}: `{}` out of `{}`".format(key, budget["used"][key], budget["limits"][key]) for key in ["size", "entries"]] + ["refused ({}): `{}`".format(reason, count) for reason, count in sorted(budget["refusals"].items())], prefix="Below is the amount of data inflated from container(s) during the case:")
+
         self._asciidoc.heading("Match(es)", level=2)
         self._asciidoc.list(["`{}` [`{}`]".format(match["target"]["identifier"], match["match"]["rule"]) for match in _rendering.iterate_matches(self.case.resources["matches"])], prefix="Below are listed the evidence(s) that have matched one or several YARA rules:")
 
@@ -1,20 +1,14 @@
 # -*- coding: utf-8 -*-
 
-from framework.api.external import filesystem as _fs
+from framework.api.external import mail as _mail
 
 from framework.contexts import models as _models
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.logger import Logger as _log
 
-import base64
-import multiprocessing
-import os.path
-
-try:
-    import eml_parser
-
-except ImportError as exc:
-    _log.fault("Missing dependency <{0}>. Try <pip install {0}> or manually build the required module to fix the issue. Module <{0}> may require the installation of the <{1}> library.".format(exc.name, "libmagic"))
+import email.parser
+import email.policy
+import sys
 
 __all__ = [
     "Pre"
@@ -26,65 +20,94 @@ class Pre(_models.Pre):
     __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
     __maintainer__ = ["sk4la"]
     __system__ = ["Darwin", "Linux", "Windows"]
-    __version__ = "0.1"
+    __version__ = "0.2"
     __associations__ = {
         "extensions": [
             "eml"
+        ],
+        "mime": [
+            "message/rfc822"
+        ],
+        "triggers": [
+            "parse.eml"
         ]
     }
 
-    def __init__(self, parser):
-        parser.add_argument(
-            "--exclude", nargs="+", default=_conf.DEFAULTS["EXCLUSION_FILTERS"], metavar="FILTER", dest="_exclude", 
-            help="ignore file(s) matching wildcard filter(s) {}".format(_conf.DEFAULTS["EXCLUSION_FILTERS"]))
+    @staticmethod
+    def _parse_message(evidence):
+        """
+        .. py:function:: _parse_message(evidence)
+
+        Parses a message and decodes its attachment(s), meant to be mapped to concurrent process(es).
 
-        parser.add_argument(
-            "--include", nargs="+", default=_conf.DEFAULTS["INCLUSION_FILTERS"], metavar="FILTER", dest="_include", 
-            help="only add file(s) matching wildcard filter(s) {}".format(_conf.DEFAULTS["INCLUSION_FILTERS"]))
+        :param evidence: absolute path to the message
+        :type evidence: str
 
-    def run(self):
+        :return: tuple containing the absolute path to the message and the list of its attachment(s), :code:`None` if the message could not be parsed
+        :rtype: tuple
         """
-        .. py:function:: run(self)
 
-        Main entry point for the module.
+        try:
+            with open(evidence, "rb") as file:
+                message = email.parser.BytesParser(policy=email.policy.default).parse(file)
+
+            return evidence, _mail.render_attachments(message)
+
+        except Exception:
+            return evidence, None
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Parses a message nested in another container and decodes its attachment(s).
 
         :param self: current class instance
         :type self: class
-        """
 
-        tmp = self.case.require_temporary_directory()
+        :param source: absolute path to the message or binary file-like object containing it
+        :type source: str
 
-        for evidence in self.feed:
-            try:
-                mail = eml_parser.eml_parser.decode_email(evidence, include_raw_body=True, include_attachment_data=True)
-                _log.info("Extracted <{}> attachment(s) from <{}>.".format(len(mail["attachment"]), evidence))
+        :param identifier: identifier of the message
+        :type identifier: str
 
-            except Exception:
-                _log.exception("Failed to extract data from <{}>. Ignoring evidence.".format(evidence))
-                continue
+        :return: generator yielding a :code:`models.Artifact` instance for every attachment
+        :rtype: generator
+        """
 
-            output_directory = os.path.join(tmp, os.path.basename(evidence))
+        if isinstance(source, str):
+            with open(source, "rb") as file:
+                message = email.parser.BytesParser(policy=email.policy.default).parse(file)
 
-            if not os.path.isdir(output_directory):
-                _fs.create_local_directory(output_directory)
+        else:
+            message = email.parser.BytesParser(policy=email.policy.default).parse(source)
 
-            for attachment in mail["attachment"]:
-                if not attachment["filename"]:
-                    attachment["filename"] = idx
+        for name, digest, payload in _mail.render_attachments(message):
+            yield _models.Artifact(name, payload, fingerprint=digest)
 
-                if not _fs.matches_patterns(attachment["filename"], self.case.arguments._include):
-                    _log.warning("Ignoring attachment <{}> not matching inner inclusion pattern(s).".format(attachment["filename"]))
-                    continue
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
 
-                if _fs.matches_patterns(attachment["filename"], self.case.arguments._exclude):
-                    _log.warning("Ignoring attachment <{}> matching inner exclusion pattern(s).".format(attachment["filename"]))
+        try:
+            for evidence, attachments in self.case.pool.imap_unordered(Pre._parse_message, self.feed, chunksize=_conf.MAIL_CHUNK_SIZE):
+                if attachments is None:
+                    _log.error("Failed to extract data from <{}>. Ignoring evidence.".format(evidence))
                     continue
 
-                output_path = os.path.join(output_directory, attachment["filename"])
+                count = 0
 
-                with open(output_path, "wb") as out:
-                    out.write(base64.b64decode(attachment["raw"]))
+                for name, digest, payload in attachments:
+                    count += self.case.dispatcher.dispatch(_models.Artifact(name, payload, fingerprint=digest), evidence, 1)
 
-                _log.debug("Attachment <{}> extracted from <{}> stored locally as <{}>.".format(attachment["filename"], evidence, output_path))
+                _log.info("Extracted <{}> attachment(s) from <{}>.".format(count, evidence))
 
-                self.case.track_file(output_path)
+        except KeyboardInterrupt:
+            sys.stderr.write("\n")
+            _log.fault("Aborted due to manual user interruption.")
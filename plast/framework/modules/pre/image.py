@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.external import container as _container
+from framework.api.internal import parser as _parser
+from framework.api.internal.loader import Loader as _loader
+
+from framework.contexts import errors as _errors
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import hashlib
+import json
+import os.path
+import sqlite3
+import sys
+import tarfile
+import time
+import zlib
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Reads OCI and docker save image archive(s), scans each distinct layer once and attributes its match(es) to every image including it."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {}
+
+    def __init__(self, parser):
+        parser.add_argument(
+            "--cache", action=_parser.AbsolutePath, metavar="PATH", dest="_cache",
+            help="path to the layer cache database to create or update, so that layer(s) already scanned with the same ruleset(s) are not scanned again")
+
+    def _fingerprint_rulesets(self):
+        """
+        .. py:function:: _fingerprint_rulesets(self)
+
+        Computes a fingerprint of the loaded ruleset(s) and of the option(s) affecting the result(s) of a layer scan, cached result(s) being only valid for an identical fingerprint.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: hexadecimal SHA-256 fingerprint
+        :rtype: str
+        """
+
+        cipher = hashlib.sha256()
+
+        for name, ruleset in sorted(_loader.iterate_rulesets(), key=lambda item: item[1]):
+            with open(ruleset, "rb") as file:
+                cipher.update("{}\x00{}\x00".format(name, hashlib.sha256(file.read()).hexdigest()).encode("utf-8"))
+
+        cipher.update(json.dumps([
+            self.case.arguments.fast,
+            sorted(self.case.arguments.hash_algorithms),
+            self.case.arguments.max_size,
+            self.case.arguments.max_depth,
+            self.case.arguments.include,
+            self.case.arguments.exclude
+        ]).encode("utf-8"))
+
+        return cipher.hexdigest()
+
+    def _index_images(self, evidence):
+        """
+        .. py:function:: _index_images(self, evidence)
+
+        Resolves the image(s) stored in an archive and registers their layer(s) by digest.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the image archive
+        :type evidence: str
+        """
+
+        with tarfile.open(evidence, "r:*") as archive:
+            for name, layers in _container.resolve_images(archive):
+                _log.debug("Found image <{}> with <{}> layer(s) in <{}>.".format(name, len(layers), evidence))
+
+                for digest, member in layers:
+                    try:
+                        size = archive.getmember(member).size
+
+                    except KeyError:
+                        _log.warning("Layer <{}> of image <{}> not found in <{}>.".format(member, name, evidence))
+                        continue
+
+                    digest = digest or _container.hash_member(archive, member)
+                    layer = self.layers.setdefault(digest, {"evidence": evidence, "member": member, "size": size, "images": []})
+
+                    if {"image": name, "evidence": evidence} not in layer["images"]:
+                        layer["images"].append({"image": name, "evidence": evidence})
+
+    def _open_cache(self):
+        """
+        .. py:function:: _open_cache(self)
+
+        Opens the layer cache database, creating its schema if needed.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: :code:`sqlite3.Connection` instance
+        :rtype: class
+        """
+
+        database = sqlite3.connect(self.case.arguments._cache)
+
+        database.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+
+            CREATE TABLE IF NOT EXISTS layers (digest TEXT, rulesets TEXT, scanned REAL, PRIMARY KEY (digest, rulesets)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS matches (digest TEXT, rulesets TEXT, record TEXT);
+            CREATE INDEX IF NOT EXISTS matches_layer ON matches (digest, rulesets);
+        """)
+
+        return database
+
+    def _replay_layer(self, database, digest, layer):
+        """
+        .. py:function:: _replay_layer(self, database, digest, layer)
+
+        Emits the cached match(es) of a layer, attributed to the image(s) including it in the current case.
+
+        :param self: current class instance
+        :type self: class
+
+        :param database: :code:`sqlite3.Connection` instance
+        :type database: class
+
+        :param digest: digest of the layer
+        :type digest: str
+
+        :param layer: dictionary describing the layer
+        :type layer: dict
+
+        :return: :code:`True` if the layer was found in the cache, else :code:`False`
+        :rtype: bool
+        """
+
+        if not database.execute("SELECT 1 FROM layers WHERE digest = ? AND rulesets = ?", (digest, self.rulesets)).fetchone():
+            return False
+
+        for record, in database.execute("SELECT record FROM matches WHERE digest = ? AND rulesets = ?", (digest, self.rulesets)):
+            record = json.loads(record)
+            record["target"]["context"] = dict(record["target"].get("context") or {}, layer=digest, images=layer["images"], cached=True)
+
+            self.case.engine.report(record)
+
+        return True
+
+    def _scan_layer(self, digest, layer):
+        """
+        .. py:function:: _scan_layer(self, digest, layer)
+
+        Streams the file(s) of a layer to the dispatcher, reading the layer exactly once.
+
+        Files are fingerprinted by layer so that a file shared by several layer(s) is attributed to each of them, keeping the cached result(s) of every layer complete.
+
+        :param self: current class instance
+        :type self: class
+
+        :param digest: digest of the layer
+        :type digest: str
+
+        :param layer: dictionary describing the layer
+        :type layer: dict
+
+        :return: :code:`True` if every file of the layer was fed to the engine, else :code:`False`
+        :rtype: bool
+        """
+
+        refusals = sum(self.case.budget.refusals.values())
+
+        _log.debug("Scanning layer <{}> shared by <{}> image(s).".format(digest, len(layer["images"])))
+
+        try:
+            with tarfile.open(layer["evidence"], "r:*") as archive, archive.extractfile(layer["member"]) as blob, tarfile.open(fileobj=blob, mode="r|*") as stream:
+                for member in stream:
+                    if not member.isfile() or os.path.basename(member.name).startswith(".wh."):
+                        continue
+
+                    if self.case.budget.is_exhausted():
+                        _log.warning("Decompression budget exhausted. Stopped scanning layer <{}>.".format(digest))
+                        return False
+
+                    self.case.dispatcher.dispatch(_models.Artifact(
+                        member.name,
+                        stream.extractfile(member),
+                        size=member.size,
+                        fingerprint=(digest, member.name),
+                        context={"layer": digest, "images": layer["images"], "path": member.name}), digest, 1)
+
+        except (tarfile.TarError, OSError, EOFError, zlib.error):
+            _log.exception("Corrupted, truncated or unsupported layer <{}>. Stopped scanning layer.".format(digest))
+            return False
+
+        return sum(self.case.budget.refusals.values()) == refusals
+
+    def _update_cache(self):
+        """
+        .. py:function:: _update_cache(self)
+
+        Saves the match(es) of the layer(s) scanned during the current case to the layer cache, once every match has been written to the output file.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        records = {digest: [] for digest in self.scanned}
+
+        if os.path.isfile(self.case.resources["matches"]):
+            with open(self.case.resources["matches"], encoding=_conf.OUTPUT_CHARACTER_ENCODING) as file:
+                for line in file:
+                    record = json.loads(line)
+
+                    layer = (record["target"].get("parent") or "").split(_conf.ARTIFACT_SEPARATOR)[0]
+
+                    if layer in records:
+                        records[layer].append(line.strip())
+
+        database = self._open_cache()
+
+        try:
+            with database:
+                for digest, lines in records.items():
+                    database.execute("DELETE FROM matches WHERE digest = ? AND rulesets = ?", (digest, self.rulesets))
+                    database.execute("INSERT OR REPLACE INTO layers VALUES (?, ?, ?)", (digest, self.rulesets, time.time()))
+                    database.executemany("INSERT INTO matches VALUES (?, ?, ?)", ((digest, self.rulesets, line) for line in lines))
+
+        finally:
+            database.close()
+
+        _log.info("Cached the result(s) of <{}> layer(s) to <{}>.".format(len(records), self.case.arguments._cache))
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.layers, self.scanned = {}, []
+
+        for evidence in self.feed:
+            try:
+                self._index_images(evidence)
+
+            except (_errors.MalformatedData, tarfile.TarError) as exc:
+                _log.error("Archive <{}> is not a supported image archive ({}). Ignoring evidence.".format(evidence, exc))
+
+            except KeyboardInterrupt:
+                sys.stderr.write("\n")
+                _log.fault("Aborted due to manual user interruption.")
+
+            except Exception:
+                _log.exception("Exception raised while reading image archive <{}>.".format(evidence))
+
+        _log.info("Found <{}> distinct layer(s) in <{}> image archive(s).".format(len(self.layers), len(self.feed)))
+
+        database, cached = None, 0
+
+        if self.case.arguments._cache:
+            self.rulesets = self._fingerprint_rulesets()
+            database = self._open_cache()
+
+        try:
+            for digest, layer in sorted(self.layers.items(), key=lambda item: (item[1]["evidence"], item[1]["member"])):
+                if database and self._replay_layer(database, digest, layer):
+                    cached += 1
+                    continue
+
+                if self._scan_layer(digest, layer):
+                    self.scanned.append(digest)
+
+        except KeyboardInterrupt:
+            sys.stderr.write("\n")
+            _log.fault("Aborted due to manual user interruption.")
+
+        finally:
+            if database:
+                database.close()
+
+        if database:
+            _log.info("Reused the cached result(s) of <{}> layer(s) out of <{}>.".format(cached, len(self.layers)))
+
+            if self.scanned:
+                self.case.defer(self._update_cache)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.internal import parser as _parser
+from framework.api.internal.loader import Loader as _loader
+from framework.api.internal.prefilter import Prefilter as _prefilter
+
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import functools
+import os.path
+import sqlite3
+
+try:
+    import numpy
+
+except ImportError as exc:
+    _log.fault("Missing dependency <{0}>. Try <pip install {0}> or manually build the required module to fix the issue.".format(exc.name))
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Maintains an on-disk n-gram index of the evidence(s) content and only feeds the evidence(s) that may match the loaded ruleset(s) to the engine."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {}
+
+    def __init__(self, parser):
+        parser.add_argument(
+            "--database", required=True, action=_parser.AbsolutePath, metavar="PATH", dest="_database",
+            help="path to the index database to create or update")
+
+        parser.add_argument(
+            "--gram-size", type=int, choices=[3, 4], default=_conf.INDEX_GRAM_SIZE, metavar="NUMBER", dest="_gram_size",
+            help="size of the indexed n-gram(s) for a new index [{}]".format(_conf.INDEX_GRAM_SIZE))
+
+    @staticmethod
+    def _extract_grams(evidence, size):
+        """
+        .. py:function:: _extract_grams(evidence, size)
+
+        Computes the set of distinct n-gram(s) found in an evidence.
+
+        The evidence is streamed :code:`INDEX_BUFFER_SIZE` byte(s) at a time, the n-gram(s) of each buffer being computed and deduplicated with :code:`numpy`.
+
+        :param evidence: absolute path to the evidence
+        :type evidence: str
+
+        :param size: size of the n-gram(s)
+        :type size: int
+
+        :return: tuple containing the path to the evidence, its size, its last modification time and its sorted n-gram(s) packed as 32-bit integer(s)
+        :rtype: tuple
+        """
+
+        status = os.stat(evidence)
+        grams, tail = [], b""
+
+        with open(evidence, "rb") as file:
+            while True:
+                chunk = file.read(_conf.INDEX_BUFFER_SIZE)
+
+                if not chunk:
+                    break
+
+                data = tail + chunk
+                tail = data[-(size - 1):]
+
+                buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+                count = len(buffer) - size + 1
+
+                if count <= 0:
+                    continue
+
+                values = buffer[:count].astype(numpy.uint32)
+
+                for offset in range(1, size):
+                    values = (values << 8) | buffer[offset:offset + count]
+
+                grams.append(numpy.unique(values))
+
+                if len(grams) > 16:
+                    grams = [numpy.unique(numpy.concatenate(grams))]
+
+        grams = (numpy.unique(numpy.concatenate(grams)) if grams else numpy.empty(0, dtype=numpy.uint32))
+
+        return evidence, status.st_size, status.st_mtime, grams.astype("<u4").tobytes()
+
+    def _open_database(self):
+        """
+        .. py:function:: _open_database(self)
+
+        Opens the index database, creating its schema if needed.
+
+        The posting list of every n-gram is stored as a single blob of packed file identifier(s). Identifiers are never reused, so that the identifier(s) of reindexed file(s) left in posting list(s) are simply ignored.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.database = sqlite3.connect(self.case.arguments._database)
+
+        if self.database.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'postings'").fetchone():
+            _log.warning("Index <{}> uses a former layout. Rebuilding index.".format(self.case.arguments._database))
+            self.database.executescript("DROP TABLE postings; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS grams;")
+
+        self.database.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT UNIQUE, size INTEGER, mtime REAL);
+            CREATE TABLE IF NOT EXISTS grams (gram INTEGER PRIMARY KEY, files BLOB);
+        """)
+
+        self.database.execute("INSERT OR IGNORE INTO meta VALUES ('gram_size', ?)", (str(self.case.arguments._gram_size),))
+        self.gram_size = int(self.database.execute("SELECT value FROM meta WHERE key = 'gram_size'").fetchone()[0])
+
+        if self.gram_size != self.case.arguments._gram_size:
+            _log.warning("Using the <{}>-gram(s) of existing index <{}>.".format(self.gram_size, self.case.arguments._database))
+
+    def _iterate_stale_evidences(self):
+        """
+        .. py:function:: _iterate_stale_evidences(self)
+
+        Iterates over the evidence(s) that are missing from the index or changed since they were indexed.
+
+        :param self: current class instance
+        :type self: class
+
+        :return: absolute path to the stale evidence
+        :rtype: str
+        """
+
+        for evidence in self.feed:
+            status = os.stat(evidence)
+
+            if status.st_size > self.case.arguments.max_size:
+                _log.warning("Evidence <{}> exceeds the maximum size. Not indexing evidence.".format(evidence))
+                continue
+
+            if self.database.execute("SELECT 1 FROM files WHERE path = ? AND size = ? AND mtime = ?", (evidence, status.st_size, status.st_mtime)).fetchone():
+                continue
+
+            yield evidence
+
+    def _flush_postings(self, results):
+        """
+        .. py:function:: _flush_postings(self, results)
+
+        Registers indexed evidence(s) and appends their identifier to the posting list of each of their n-gram(s), in a single transaction.
+
+        :param self: current class instance
+        :type self: class
+
+        :param results: list of tuple(s) returned by :code:`_extract_grams`
+        :type results: list
+        """
+
+        grams, files = [], []
+
+        with self.database:
+            for evidence, size, mtime, packed in results:
+                self.database.execute("DELETE FROM files WHERE path = ?", (evidence,))
+                identifier = self.database.execute("INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)", (evidence, size, mtime)).lastrowid
+
+                grams.append(numpy.frombuffer(packed, dtype="<u4"))
+                files.append(numpy.full(len(grams[-1]), identifier, dtype="<u4"))
+
+            grams, files = numpy.concatenate(grams), numpy.concatenate(files)
+            order = numpy.argsort(grams, kind="stable")
+            keys, starts = numpy.unique(grams[order], return_index=True)
+            keys, postings = keys.tolist(), numpy.split(files[order], starts[1:])
+
+            for index in range(0, len(keys), 512):
+                chunk = keys[index:index + 512]
+                existing = dict(self.database.execute("SELECT gram, files FROM grams WHERE gram IN ({})".format(", ".join("?" * len(chunk))), chunk))
+
+                self.database.executemany("INSERT OR REPLACE INTO grams VALUES (?, ?)", ((gram, existing.get(gram, b"") + posting.tobytes()) for gram, posting in zip(chunk, postings[index:index + 512])))
+
+    def _update_index(self):
+        """
+        .. py:function:: _update_index(self)
+
+        Incrementally (re)indexes the stale evidence(s) using the concurrent process(es) of the case-wide pool.
+
+        Posting(s) are buffered and flushed to the index every :code:`INDEX_FLUSH_SIZE` n-gram(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        stale = list(self._iterate_stale_evidences())
+        _log.info("Indexing <{}> new or modified evidence(s) out of <{}>.".format(len(stale), len(self.feed)))
+
+        results, buffered = [], 0
+
+        for count, result in enumerate(self.case.pool.imap_unordered(functools.partial(Pre._extract_grams, size=self.gram_size), stale, chunksize=_conf.INDEX_CHUNK_SIZE), 1):
+            results.append(result)
+            buffered += len(result[3]) // 4
+
+            _log.debug("Indexed evidence <{}> ({}/{}).".format(result[0], count, len(stale)))
+
+            if buffered >= _conf.INDEX_FLUSH_SIZE:
+                self._flush_postings(results)
+                results, buffered = [], 0
+
+        if results:
+            self._flush_postings(results)
+
+    def _query_gram(self, gram, nocase=False):
+        """
+        .. py:function:: _query_gram(self, gram, nocase=False)
+
+        Retrieves the identifier(s) of the indexed file(s) containing an n-gram.
+
+        :param self: current class instance
+        :type self: class
+
+        :param gram: n-gram to look for
+        :type gram: bytes
+
+        :param nocase: flag specifying whether every case variant of :code:`gram` must be looked for
+        :type nocase: bool
+
+        :return: set of file identifier(s)
+        :rtype: set
+        """
+
+        variants = {gram}
+
+        if nocase:
+            for index in range(len(gram)):
+                variants |= {variant[:index] + bytes([char]) + variant[index + 1:] for variant in variants for char in {bytes([variant[index]]).lower()[0], bytes([variant[index]]).upper()[0]}}
+
+        grams = [int.from_bytes(variant, "big") for variant in variants]
+        files = set()
+
+        for postings, in self.database.execute("SELECT files FROM grams WHERE gram IN ({})".format(", ".join("?" * len(grams))), grams):
+            files.update(numpy.frombuffer(postings, dtype="<u4").tolist())
+
+        return files
+
+    def _query_atom(self, atom, modifiers):
+        """
+        .. py:function:: _query_atom(self, atom, modifiers)
+
+        Retrieves the identifier(s) of the indexed file(s) that may contain a literal atom.
+
+        :param self: current class instance
+        :type self: class
+
+        :param atom: literal atom
+        :type atom: bytes
+
+        :param modifiers: list of YARA modifier(s) applied to :code:`atom`
+        :type modifiers: list
+
+        :return: set of file identifier(s), :code:`None` if :code:`atom` cannot be looked up in the index
+        :rtype: set
+        """
+
+        if any(modifier.startswith("xor") for modifier in modifiers) or len(atom) < self.gram_size:
+            return None
+
+        forms = []
+
+        if "wide" in modifiers:
+            forms.append(bytes(byte for char in atom for byte in (char, 0)))
+
+        if "ascii" in modifiers or "wide" not in modifiers:
+            forms.append(atom)
+
+        candidates = set()
+
+        for form in forms:
+            files = None
+
+            for index in range(len(form) - self.gram_size + 1):
+                postings = self._query_gram(form[index:index + self.gram_size], nocase=("nocase" in modifiers))
+                files = (postings if files is None else files & postings)
+
+                if not files:
+                    break
+
+            candidates |= files
+
+        return candidates
+
+    def _query_candidates(self):
+        """
+        .. py:function:: _query_candidates(self)
+
+        Retrieves the indexed evidence(s) that may match the loaded ruleset(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :return: set of absolute path(s) to the candidate evidence(s), :code:`None` if every evidence must be scanned
+        :rtype: set
+        """
+
+        candidates, paths = set(), dict(self.database.execute("SELECT id, path FROM files"))
+
+        for name, ruleset in _loader.iterate_rulesets():
+            _, includes, rules = _prefilter.parse(ruleset)
+
+            if includes:
+                _log.warning("Ruleset <{}> includes external file(s) and cannot be looked up in the index. Falling back to a full scan.".format(name))
+                return None
+
+            for rule in rules:
+                if rule["private"] or rule["global"]:
+                    continue
+
+                atoms = _prefilter.extract_atoms(rule)
+                files = set()
+
+                for atom in (atoms or [None]):
+                    found = (self._query_atom(*atom) if atom else None)
+
+                    if found is None:
+                        _log.warning("Rule <{}> from ruleset <{}> cannot be looked up in the index. Falling back to a full scan.".format(rule["name"], name))
+                        return None
+
+                    files |= found
+
+                files &= paths.keys()
+                _log.debug("Rule <{}> from ruleset <{}> has <{}> candidate(s) in the index.".format(rule["name"], name, len(files)))
+                candidates |= files
+
+        return {paths[identifier] for identifier in candidates}
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self._open_database()
+
+        try:
+            self._update_index()
+            candidates = self._query_candidates()
+
+        finally:
+            self.database.close()
+
+        if candidates is None:
+            self.case.track_files(self.feed)
+            return
+
+        feed = [evidence for evidence in self.feed if evidence in candidates]
+        _log.info("Retro-hunt selected <{}> candidate(s) out of <{}> evidence(s).".format(len(feed), len(self.feed)))
+
+        self.case.track_files(feed)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.external import mail as _mail
+
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import contextlib
+import functools
+import mailbox
+import sys
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Parses mbox mailbox(es), extracts attachment(s) and feeds the resulting evidence(s) to the engine."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {
+        "extensions": [
+            "mbox",
+            "mbx"
+        ],
+        "mime": [
+            "application/mbox"
+        ],
+        "triggers": [
+            "parse.mbox"
+        ]
+    }
+
+    @staticmethod
+    def _index_messages(file):
+        """
+        .. py:function:: _index_messages(file)
+
+        Locates the message(s) of a mailbox in a single sequential pass, splitting on :code:`From_` line(s) the same way :code:`mailbox.mbox` does.
+
+        :param file: binary file-like object containing the mailbox
+        :type file: class
+
+        :return: tuple containing the index, offset and length of the current message
+        :rtype: tuple
+        """
+
+        index, start, position = 0, None, 0
+
+        for line in file:
+            if line.startswith(b"From "):
+                if start is not None:
+                    yield index, start, position - start
+                    index += 1
+
+                start = position
+
+            position += len(line)
+
+        if start is not None:
+            yield index, start, position - start
+
+    @staticmethod
+    def _read_message(file, offset, length):
+        """
+        .. py:function:: _read_message(file, offset, length)
+
+        Reads a single message from a mailbox and decodes its attachment(s).
+
+        :param file: binary file-like object containing the mailbox
+        :type file: class
+
+        :param offset: offset of the message in the mailbox
+        :type offset: int
+
+        :param length: length of the message
+        :type length: int
+
+        :return: list of tuple(s) containing the name, the hexadecimal SHA-256 digest and the payload of each attachment
+        :rtype: list
+        """
+
+        file.seek(offset)
+        return _mail.render_attachments(mailbox.mboxMessage(file.read(length)))
+
+    @staticmethod
+    def _parse_message(evidence, span):
+        """
+        .. py:function:: _parse_message(evidence, span)
+
+        Reads a single message from a mailbox and extracts its attachment(s), meant to be mapped to concurrent process(es).
+
+        :param evidence: absolute path to the mailbox
+        :type evidence: str
+
+        :param span: tuple containing the index, offset and length of the message
+        :type span: tuple
+
+        :return: tuple containing the index of the message and the list of its attachment(s), :code:`None` if the message could not be parsed
+        :rtype: tuple
+        """
+
+        index, offset, length = span
+
+        try:
+            with open(evidence, "rb") as file:
+                return index, Pre._read_message(file, offset, length)
+
+        except Exception:
+            return index, None
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Parses a mailbox nested in another container and decodes the attachment(s) of its message(s) one message at a time.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the mailbox or binary file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the mailbox
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every attachment, named after the index of its message
+        :rtype: generator
+        """
+
+        with contextlib.ExitStack() as stack:
+            file = (stack.enter_context(open(source, "rb")) if isinstance(source, str) else source)
+
+            for index, offset, length in list(Pre._index_messages(file)):
+                try:
+                    attachments = Pre._read_message(file, offset, length)
+
+                except Exception:
+                    _log.error("Failed to parse message <{}> from mailbox <{}>. Ignoring message.".format(index, identifier))
+                    continue
+
+                for name, digest, payload in attachments:
+                    yield _models.Artifact("#{}{}{}".format(index, _conf.ARTIFACT_SEPARATOR, name), payload, fingerprint=digest)
+
+    def _process_mailbox(self, evidence):
+        """
+        .. py:function:: _process_mailbox(self, evidence)
+
+        Indexes a mailbox, then parses its message(s) using the concurrent process(es) of the case-wide pool and feeds their attachment(s) to the engine as they are extracted.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the mailbox
+        :type evidence: str
+        """
+
+        with open(evidence, "rb") as file:
+            spans = list(Pre._index_messages(file))
+
+        _log.debug("Indexed <{}> message(s) in mailbox <{}>.".format(len(spans), evidence))
+
+        if not spans:
+            _log.warning("No message found in mailbox <{}>. Ignoring evidence.".format(evidence))
+            return
+
+        count = 0
+
+        for index, attachments in self.case.pool.imap_unordered(functools.partial(Pre._parse_message, evidence), spans, chunksize=_conf.MAIL_CHUNK_SIZE):
+            if attachments is None:
+                _log.error("Failed to parse message <{}> from mailbox <{}>. Ignoring message.".format(index, evidence))
+                continue
+
+            for name, digest, payload in attachments:
+                count += self.case.dispatcher.dispatch(_models.Artifact(name, payload, fingerprint=digest), "{}{}#{}".format(evidence, _conf.ARTIFACT_SEPARATOR, index), 2)
+
+        _log.info("Extracted <{}> attachment(s) from <{}> message(s) of mailbox <{}>.".format(count, len(spans), evidence))
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for evidence in self.feed:
+            try:
+                self._process_mailbox(evidence)
+
+            except KeyboardInterrupt:
+                sys.stderr.write("\n")
+                _log.fault("Aborted due to manual user interruption.")
+
+            except Exception:
+                _log.exception("Failed to process mailbox <{}>. Ignoring evidence.".format(evidence))
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
 from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.logger import Logger as _log
 
+import functools
+import hashlib
+import os.path
+import sys
+
 try:
     import ExtractMsg
 
@@ -15,20 +21,173 @@ __all__ = [
 
 class Pre(_models.Pre):
     __author__ = "sk4la"
-    __description__ = "Parses .msg file(s), extracts attachment(s) and feeds the resulting evidence(s) to the engine."
+    __description__ = "Parses .msg file(s), extracts their body and attachment(s), including the one(s) of embedded message(s), and feeds the resulting evidence(s) to the engine."
     __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
     __maintainer__ = ["sk4la"]
     __system__ = ["Darwin", "Linux", "Windows"]
-    __version__ = "0.1"
+    __version__ = "0.2"
     __associations__ = {
         "extensions": [
             "msg"
         ],
         "mime": [
             "application/vnd.ms-outlook"
+        ],
+        "triggers": [
+            "parse.msg"
         ]
     }
 
+    @staticmethod
+    def _name_attachment(attachment, index):
+        """
+        .. py:function:: _name_attachment(attachment, index)
+
+        Derives a safe name for an attachment from its long or short file name.
+
+        :param attachment: :code:`ExtractMsg.Attachment` instance
+        :type attachment: class
+
+        :param index: index of the attachment in its message
+        :type index: int
+
+        :return: name of the attachment
+        :rtype: str
+        """
+
+        name = getattr(attachment, "longFilename", None) or getattr(attachment, "shortFilename", None)
+
+        return (os.path.basename(name.replace("\\", "/")) if name else None) or "attachment_{}".format(index)
+
+    @staticmethod
+    def _render_body(message):
+        """
+        .. py:function:: _render_body(message)
+
+        Renders the header(s), subject and body of a message as UTF-8 text, the HTML body being used if there is no plain text one.
+
+        :param message: :code:`ExtractMsg.Message` instance
+        :type message: class
+
+        :return: rendered message
+        :rtype: bytes
+        """
+
+        headers = getattr(message, "headerText", None) or ""
+        subject = getattr(message, "subject", None)
+        body = getattr(message, "body", None) or getattr(message, "htmlBody", None) or ""
+
+        if subject and subject not in headers:
+            headers += "Subject: {}\r\n".format(subject)
+
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+
+        return "{}\r\n{}".format(headers, body).encode("utf-8")
+
+    @staticmethod
+    def _walk_message(message, lineage, level, maximum):
+        """
+        .. py:function:: _walk_message(message, lineage, level, maximum)
+
+        Recursively iterates through the body and attachment(s) of a message and of its embedded message(s).
+
+        :param message: :code:`ExtractMsg.Message` instance
+        :type message: class
+
+        :param lineage: list of the name(s) of the embedded message(s) leading to :code:`message`
+        :type lineage: list
+
+        :param level: current embedding level
+        :type level: int
+
+        :param maximum: maximum embedding level
+        :type maximum: int
+
+        :return: tuple containing the lineage, the name, the hexadecimal SHA-256 digest and the payload of the current body or attachment
+        :rtype: tuple
+        """
+
+        body = Pre._render_body(message)
+
+        if body.strip():
+            yield lineage, _conf.MSG_BODY_NAME, hashlib.sha256(body).hexdigest(), body
+
+        for index, attachment in enumerate(message.attachments):
+            name = Pre._name_attachment(attachment, index)
+            data = attachment.data
+
+            if hasattr(data, "attachments"):
+                if level < maximum:
+                    yield from Pre._walk_message(data, lineage + [name], level + 1, maximum)
+
+                continue
+
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+
+            if data:
+                yield lineage, name, hashlib.sha256(data).hexdigest(), data
+
+    @staticmethod
+    def _parse_message(evidence, maximum):
+        """
+        .. py:function:: _parse_message(evidence, maximum)
+
+        Parses a message and extracts its body and attachment(s) recursively, meant to be mapped to concurrent process(es).
+
+        :param evidence: absolute path to the message
+        :type evidence: str
+
+        :param maximum: maximum embedding level
+        :type maximum: int
+
+        :return: tuple containing the absolute path to the message and the list of its bod(ies) and attachment(s), :code:`None` if the message could not be parsed
+        :rtype: tuple
+        """
+
+        try:
+            message = ExtractMsg.Message(evidence)
+
+            try:
+                return evidence, list(Pre._walk_message(message, [], 0, maximum))
+
+            finally:
+                if hasattr(message, "close"):
+                    message.close()
+
+        except Exception:
+            return evidence, None
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Parses a message nested in another container (or handed over by the module handling OLE compound file(s)) and extracts its body and attachment(s) recursively.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the message or binary file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the message
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every body and attachment, named after the embedded message(s) leading to it
+        :rtype: generator
+        """
+
+        message = ExtractMsg.Message(source)
+
+        try:
+            for lineage, name, digest, payload in Pre._walk_message(message, [], 0, self.case.arguments.max_depth):
+                yield _models.Artifact(_conf.ARTIFACT_SEPARATOR.join(lineage + [name]), payload, fingerprint=digest)
+
+        finally:
+            if hasattr(message, "close"):
+                message.close()
+
     def run(self):
         """
         .. py:function:: run(self)
@@ -39,13 +198,19 @@ class Pre(_models.Pre):
         :type self: class
         """
 
-        for evidence in self.feed:
-            msg = ExtractMsg.Message(evidence)
+        try:
+            for evidence, attachments in self.case.pool.imap_unordered(functools.partial(Pre._parse_message, maximum=self.case.arguments.max_depth), self.feed, chunksize=_conf.MAIL_CHUNK_SIZE):
+                if attachments is None:
+                    _log.error("Failed to extract data from <{}>. Ignoring evidence.".format(evidence))
+                    continue
+
+                count = 0
+
+                for lineage, name, digest, payload in attachments:
+                    count += self.case.dispatcher.dispatch(_models.Artifact(name, payload, fingerprint=digest), _conf.ARTIFACT_SEPARATOR.join([evidence] + lineage), len(lineage) + 1)
 
-            for attachment in msg.attachments:
-                print(attachment.shortFilename)
+                _log.info("Extracted <{}> bod(ies) and attachment(s) from <{}>.".format(count, evidence))
 
-            print("Sender: {}".format(msg.sender))
-            print("Sent On: {}".format(msg.date))
-            print("Subject: {}".format(msg.subject))
-            print("Body: {}".format(msg.body))
+        except KeyboardInterrupt:
+            sys.stderr.write("\n")
+            _log.fault("Aborted due to manual user interruption.")
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.external import filesystem as _fs
+from framework.api.external import office as _office
+
+from framework.contexts import errors as _errors
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import zipfile
+
+try:
+    import olefile
+
+except ImportError as exc:
+    _log.fault("Missing dependency <{0}>. Try <pip install {0}> or manually build the required module to fix the issue.".format(exc.name))
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Extracts the macro(s), embedded object(s) and relationship(s) of OOXML and OLE document(s) and feeds them to the engine."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {
+        "extensions": [
+            "doc",
+            "docm",
+            "docx",
+            "dot",
+            "dotm",
+            "ppsm",
+            "ppt",
+            "pptm",
+            "pptx",
+            "xla",
+            "xlam",
+            "xls",
+            "xlsb",
+            "xlsm",
+            "xlsx"
+        ],
+        "mime": [
+            "application/msword",
+            "application/vnd.ms-excel",
+            "application/vnd.ms-powerpoint",
+            "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            "application/x-ole-storage"
+        ],
+        "triggers": [
+            "parse.ole",
+            "parse.ooxml"
+        ]
+    }
+
+    def __init__(self, parser):
+        parser.add_argument(
+            "--parts", nargs="+", default=_conf.OFFICE_PARTS, metavar="FILTER", dest="_parts",
+            help="OOXML part(s) to scan, as wildcard filter(s) {}".format(_conf.OFFICE_PARTS))
+
+        parser.add_argument(
+            "--streams", nargs="+", default=_conf.OFFICE_STREAMS, metavar="FILTER", dest="_streams",
+            help="OLE stream(s) to scan in addition to the VBA source code and Ole10Native object(s), as wildcard filter(s) {}".format(_conf.OFFICE_STREAMS))
+
+    def _extract_ole(self, source, identifier):
+        """
+        .. py:function:: _extract_ole(self, source, identifier)
+
+        Walks through the VBA project(s), :code:`Ole10Native` object(s) and selected stream(s) of an OLE compound file.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the compound file or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the compound file
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every stream
+        :rtype: generator
+        """
+
+        with olefile.OleFileIO(source) as ole:
+            entries = ole.listdir(streams=True, storages=False)
+
+            for storage in [entry[:-1] for entry in entries if entry[-1].lower() == "dir" and len(entry) >= 2 and entry[-2].upper() == "VBA"]:
+                for name, compressed, code in _office.iterate_vba_modules(ole, storage):
+                    yield _models.Artifact("/".join(storage + [name]), code, compressed=compressed)
+
+            for entry in entries:
+                path = "/".join(entry).replace("\x01", "")
+
+                if entry[-1] == "\x01Ole10Native":
+                    data = ole.openstream(entry).read()
+
+                    try:
+                        name, data = _office.parse_ole10native(data)
+                        path = "/".join(entry[:-1] + [name])
+
+                    except _errors.MalformatedData as exc:
+                        _log.debug("Failed to parse Ole10Native stream <{}{}{}>: {}.".format(identifier, _conf.ARTIFACT_SEPARATOR, path, exc))
+
+                    yield _models.Artifact(path, data)
+
+                elif _fs.matches_patterns(path, wildcard_patterns=self.case.arguments._streams):
+                    yield _models.Artifact(path, ole.openstream(entry), size=ole.get_size(entry))
+
+    def _extract_ooxml(self, source, identifier):
+        """
+        .. py:function:: _extract_ooxml(self, source, identifier)
+
+        Walks through the selected part(s) of an OOXML package, without inflating the other one(s).
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the package or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the package
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every selected part
+        :rtype: generator
+        """
+
+        with zipfile.ZipFile(source) as package:
+            for member in package.infolist():
+                if member.is_dir() or not _fs.matches_patterns(member.filename, wildcard_patterns=self.case.arguments._parts):
+                    continue
+
+                yield _models.Artifact(
+                    member.filename,
+                    package.open(member),
+                    size=member.file_size,
+                    compressed=member.compress_size,
+                    fingerprint=(member.CRC, member.file_size))
+
+    def _find_message_module(self, source):
+        """
+        .. py:function:: _find_message_module(self, source)
+
+        Tests whether an OLE compound file is an Outlook message, whose property stream(s) may lie past the header used for identification.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the compound file or file-like object containing it
+        :type source: str
+
+        :return: module handling Outlook message(s) if the compound file contains :code:`__substg1.0_` stream(s), else :code:`None`
+        :rtype: class
+        """
+
+        with olefile.OleFileIO(source) as ole:
+            if not any(entry[0].startswith("__substg1.0_") for entry in ole.listdir(streams=True, storages=False)):
+                return None
+
+        return self.case.dispatcher.find_container("parse.msg")
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Walks through an OLE or OOXML document, nested document(s) (e.g. an embedded workbook) being walked through by the framework. Outlook message(s) identified as plain OLE compound file(s) are handed over to the module handling them.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the document or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the document
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every stream or part
+        :rtype: generator
+        """
+
+        if olefile.isOleFile(source):
+            Module = self._find_message_module(source)
+
+            if Module:
+                _log.debug("Handing Outlook message <{}> over to module <{}>.".format(identifier, Module.__name__))
+                yield from Module.extract(source, identifier)
+
+            else:
+                yield from self._extract_ole(source, identifier)
+
+        elif zipfile.is_zipfile(source):
+            yield from self._extract_ooxml(source, identifier)
+
+        else:
+            _log.error("Unsupported document format. Cannot walk through evidence <{}>.".format(identifier))
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        count = 0
+
+        for evidence in self.feed:
+            count += self.walk(evidence, evidence)
+
+        _log.info("Extracted <{}> stream(s) from <{}> document(s).".format(count, len(self.feed)))
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 
+from framework.api.external import network as _network
+
+from framework.contexts import errors as _errors
 from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import sys
 
 __all__ = [
     "Pre"
@@ -13,7 +20,109 @@ class Pre(_models.Pre):
     __maintainer__ = ["sk4la"]
     __system__ = ["Darwin", "Linux", "Windows"]
     __version__ = "0.1"
-    __associations__ = {}
+    __associations__ = {
+        "extensions": [
+            "pcap",
+            "pcapng",
+            "cap"
+        ],
+        "mime": [
+            "application/vnd.tcpdump.pcap",
+            "application/x-pcapng"
+        ],
+        "triggers": [
+            "reassemble.pcap",
+            "reassemble.pcapng"
+        ]
+    }
+
+    def __init__(self, parser):
+        parser.add_argument(
+            "--carve-http", action="store_true", dest="_carve_http",
+            help="also scan the body of the HTTP/1.x message(s) found in reassembled stream(s), decoded from their transfer and content encoding(s)")
+
+        parser.add_argument(
+            "--buffer-size", type=int, default=_conf.PCAP_BUFFER_SIZE, metavar="BYTES", dest="_buffer_size",
+            help="maximum size of a stream buffer, full buffer(s) being scanned and recycled [{}]".format(_conf.PCAP_BUFFER_SIZE))
+
+        parser.add_argument(
+            "--max-flows", type=int, default=_conf.PCAP_MAX_FLOWS, metavar="NUMBER", dest="_max_flows",
+            help="maximum number of stream(s) reassembled concurrently, the least recently active one being evicted first [{}]".format(_conf.PCAP_MAX_FLOWS))
+
+        parser.add_argument(
+            "--idle-timeout", type=float, default=_conf.PCAP_IDLE_TIMEOUT, metavar="SECONDS", dest="_idle_timeout",
+            help="evict stream(s) inactive for this amount of capture time [{}]".format(_conf.PCAP_IDLE_TIMEOUT))
+
+    def _track_stream(self, evidence, key, data, context):
+        """
+        .. py:function:: _track_stream(self, evidence, key, data, context)
+
+        Feeds a reassembled stream buffer to the engine in memory, the HTTP bod(ies) carved from it being dispatched like any extracted artifact if requested, so that they are deduplicated and walked through if they are themselves containers.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the capture
+        :type evidence: str
+
+        :param key: flow key of the stream
+        :type key: tuple
+
+        :param data: data of the stream buffer
+        :type data: bytes
+
+        :param context: dictionary containing the 5-tuple of the flow and the position of the buffer in the stream
+        :type context: dict
+        """
+
+        name = "tcp {source}:{source_port} -> {destination}:{destination_port} @{offset}".format(**context)
+        identifier = self.case.track_data(data, name, evidence, context=context)
+
+        self.count += 1
+
+        if not self.case.arguments._carve_http:
+            return
+
+        for index, raw, body in _network.carve_http_bodies(data, self.case.arguments._buffer_size):
+            self.case.dispatcher.dispatch(_models.Artifact("http body {}".format(index), body, compressed=raw, context=dict(context, http=index)), identifier, 1)
+
+    def _reassemble(self, evidence):
+        """
+        .. py:function:: _reassemble(self, evidence)
+
+        Reads a capture packet by packet, reassembles its TCP stream(s) and feeds them to the engine as soon as they are complete, evicted or their buffer is full.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the capture
+        :type evidence: str
+        """
+
+        reassembler = _network.Reassembler(
+            self.case.arguments._max_flows,
+            self.case.arguments._buffer_size,
+            _conf.PCAP_BUFFER_OVERLAP,
+            self.case.arguments._idle_timeout,
+            _conf.PCAP_MAX_PENDING_SEGMENTS)
+
+        packets = 0
+
+        with open(evidence, "rb", buffering=_conf.PCAP_READ_BUFFER_SIZE) as file:
+            try:
+                for timestamp, linktype, packet in _network.iterate_packets(file):
+                    packets += 1
+                    segment = _network.decode_tcp_segment(linktype, packet)
+
+                    if segment:
+                        for stream in reassembler.feed(timestamp, *segment):
+                            self._track_stream(evidence, *stream)
+
+            finally:
+                for stream in reassembler.flush():
+                    self._track_stream(evidence, *stream)
+
+        _log.debug("Read <{}> packet(s) from capture <{}>.".format(packets, evidence))
 
     def run(self):
         """
@@ -25,4 +134,20 @@ class Pre(_models.Pre):
         :type self: class
         """
 
-        print("Unimplemented.")
+        self.count = 0
+
+        for evidence in self.feed:
+            try:
+                self._reassemble(evidence)
+
+            except _errors.MalformatedData as exc:
+                _log.error("Capture <{}> cannot be parsed ({}). Ignoring evidence.".format(evidence, exc))
+
+            except KeyboardInterrupt:
+                sys.stderr.write("\n")
+                _log.fault("Aborted due to manual user interruption.")
+
+            except Exception:
+                _log.exception("Exception raised while reassembling capture <{}>.".format(evidence))
+
+        _log.info("Reassembled <{}> stream buffer(s) from <{}> capture(s).".format(self.count, len(self.feed)))
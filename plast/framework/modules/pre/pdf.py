@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+from framework.api.external import pdf as _pdf
+
+from framework.contexts import errors as _errors
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import contextlib
+import mmap
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Decodes the stream object(s) of PDF document(s) and feeds them to the engine in memory, along with the document(s) themselves."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {
+        "extensions": [
+            "pdf"
+        ],
+        "mime": [
+            "application/pdf"
+        ],
+        "triggers": [
+            "decode.pdf"
+        ]
+    }
+
+    def __init__(self, parser):
+        parser.add_argument(
+            "--max-stream-size", type=int, default=_conf.PDF_MAX_STREAM_SIZE, metavar="BYTES", dest="_max_stream_size",
+            help="maximum size of a decoded stream, larger stream(s) being truncated [{}]".format(_conf.PDF_MAX_STREAM_SIZE))
+
+        parser.add_argument(
+            "--skip-undecoded", action="store_true", dest="_skip_undecoded",
+            help="do not scan unfiltered stream(s), which are already covered by the scan of the document itself")
+
+    def _decode_stream(self, identifier, data, number, generation, dictionary, start, end):
+        """
+        .. py:function:: _decode_stream(self, identifier, data, number, generation, dictionary, start, end)
+
+        Decodes a stream object unless it cannot be decoded.
+
+        :param self: current class instance
+        :type self: class
+
+        :param identifier: identifier of the document
+        :type identifier: str
+
+        :param data: content of the document
+        :type data: bytes
+
+        :param number: object number of the stream, :code:`None` if unknown
+        :type number: int
+
+        :param generation: generation number of the stream, :code:`None` if unknown
+        :type generation: int
+
+        :param dictionary: raw stream dictionary
+        :type dictionary: bytes
+
+        :param start: offset of the raw stream data in the document
+        :type start: int
+
+        :param end: end offset of the raw stream data in the document
+        :type end: int
+
+        :return: tuple containing the :code:`models.Artifact` instance of the decoded stream (:code:`None` if it was skipped) and the reason it was skipped
+        :rtype: tuple
+        """
+
+        filters = _pdf.parse_filters(dictionary)
+        name = "obj {} {} @{}".format(number, generation, start) if number is not None else "stream @{}".format(start)
+
+        if not filters and self.case.arguments._skip_undecoded:
+            return None, "undecoded"
+
+        try:
+            decoded, truncated = _pdf.decode_stream(data[start:end], filters, self.case.arguments._max_stream_size)
+
+        except _errors.UnsupportedType as exc:
+            _log.debug("Skipped stream <{}> from <{}> encoded with unsupported filter <{}>.".format(name, identifier, exc))
+            return None, "unsupported filter"
+
+        except _errors.MalformatedData as exc:
+            _log.debug("Failed to decode stream <{}> from <{}>: {}.".format(name, identifier, exc))
+            return None, "malformed"
+
+        if not decoded:
+            return None, "empty"
+
+        if truncated:
+            _log.debug("Truncated stream <{}> from <{}> to <{}> byte(s).".format(name, identifier, len(decoded)))
+
+        return _models.Artifact(name, decoded, compressed=((end - start) if filters else None), context={
+            "object": number,
+            "generation": generation,
+            "offset": start,
+            "length": end - start,
+            "filters": filters,
+            "truncated": truncated
+        }), None
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Maps a document in memory, locates its stream object(s) and decodes them one at a time.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the document or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the document
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every decoded stream
+        :rtype: generator
+        """
+
+        with contextlib.ExitStack() as stack:
+            if isinstance(source, str):
+                file = stack.enter_context(open(source, "rb"))
+
+                try:
+                    data = stack.enter_context(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+                except ValueError:
+                    _log.debug("Document <{}> is empty. Ignoring evidence.".format(identifier))
+                    return
+
+            else:
+                data = source.getvalue()
+
+            if _pdf.is_encrypted(data):
+                _log.warning("Document <{}> is encrypted. Its stream(s) will not be decoded.".format(identifier))
+                return
+
+            for number, generation, dictionary, start, end in _pdf.iterate_streams(data):
+                artifact, reason = self._decode_stream(identifier, data, number, generation, dictionary, start, end)
+
+                if artifact:
+                    yield artifact
+
+                else:
+                    self.case.dispatcher.skip("{} stream".format(reason), identifier)
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        count = 0
+
+        for evidence in self.feed:
+            self.case.track_file(evidence)
+            count += self.walk(evidence, evidence)
+
+        _log.info("Decoded <{}> stream(s) from <{}> document(s).".format(count, len(self.feed)))
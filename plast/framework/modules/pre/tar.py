@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import bz2
+import gzip
+import lzma
+import os.path
+import tarfile
+import zlib
+
+__all__ = [
+    "Pre"
+]
+
+class Pre(_models.Pre):
+    __author__ = "sk4la"
+    __description__ = "Streams .tar archive(s) and .gz, .bz2 or .xz compressed file(s) and feeds the resulting evidence(s) to the engine."
+    __license__ = "GNU GPLv3 <https://github.com/sk4la/plast/blob/master/LICENSE>"
+    __maintainer__ = ["sk4la"]
+    __system__ = ["Darwin", "Linux", "Windows"]
+    __version__ = "0.1"
+    __associations__ = {
+        "extensions": [
+            "tar",
+            "tgz",
+            "tbz2",
+            "txz",
+            "gz",
+            "bz2",
+            "xz"
+        ],
+        "mime": [
+            "application/x-tar",
+            "application/gzip",
+            "application/x-gzip",
+            "application/x-bzip2",
+            "application/x-xz"
+        ],
+        "triggers": [
+            "inflate.tar",
+            "inflate.gzip",
+            "inflate.bzip2",
+            "inflate.xz"
+        ]
+    }
+
+    _decompressors = {
+        b"\x1f\x8b": gzip.open,
+        b"BZh": bz2.open,
+        b"\xfd7zXZ\x00": lzma.open
+    }
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Walks through the member(s) of a (compressed) TAR archive in streaming mode, so that the archive is read exactly once and never extracted as a whole, or, failing that, inflates a single-stream compressed file.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the evidence or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the evidence
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every member
+        :rtype: generator
+        """
+
+        file = open(source, "rb") if isinstance(source, str) else source
+        compressed = (os.path.getsize(source) if isinstance(source, str) else len(source.getbuffer()))
+
+        try:
+            try:
+                archive = tarfile.open(fileobj=file, mode="r|*")
+
+            except tarfile.ReadError:
+                archive = None
+                file.seek(0)
+
+            if archive:
+                with archive:
+                    inflated = 0
+
+                    for member in archive:
+                        if not member.isfile():
+                            continue
+
+                        inflated += member.size
+                        self.case.budget.check_ratio(inflated, compressed)
+
+                        yield _models.Artifact(member.name, archive.extractfile(member), size=member.size)
+
+                return
+
+            header = file.read(max(len(magic) for magic in self._decompressors))
+            file.seek(0)
+
+            for magic, decompress in self._decompressors.items():
+                if header.startswith(magic):
+                    with decompress(file) as stream:
+                        yield _models.Artifact(self._strip_extension(identifier), stream, compressed=compressed)
+
+                    break
+
+            else:
+                _log.error("Bad file header. Cannot inflate evidence <{}>. Try to filter out unsupported file(s) using --include.".format(identifier))
+
+        except (tarfile.TarError, OSError, EOFError, lzma.LZMAError, zlib.error):
+            _log.exception("Corrupted or truncated stream. Stopped inflating evidence <{}>.".format(identifier))
+
+        finally:
+            if isinstance(source, str):
+                file.close()
+
+    @staticmethod
+    def _strip_extension(identifier):
+        """
+        .. py:function:: _strip_extension(identifier)
+
+        Derives the name of the decompressed content of a single-stream compressed file from the name of the file.
+
+        :param identifier: identifier of the compressed file
+        :type identifier: str
+
+        :return: name of the decompressed content
+        :rtype: str
+        """
+
+        name = os.path.basename(identifier.rsplit(_conf.ARTIFACT_SEPARATOR, 1)[-1])
+        stem, extension = os.path.splitext(name)
+
+        if extension.lower() in (".tgz", ".tbz2", ".txz"):
+            return "{}.tar".format(stem)
+
+        return stem if extension.lower() in (".gz", ".bz2", ".xz") and stem else "{}.out".format(name)
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for evidence in self.feed:
+            self.walk(evidence, evidence)
@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
 
+from framework.api.external import features as _features
+
 from framework.contexts import models as _models
+from framework.contexts.configuration import Configuration as _conf
+from framework.contexts.logger import Logger as _log
+
+import os.path
+import shutil
+import subprocess
 
 __all__ = [
     "Pre"
@@ -13,7 +21,65 @@ class Pre(_models.Pre):
     __maintainer__ = ["sk4la"]
     __system__ = ["Darwin", "Linux", "Windows"]
     __version__ = "0.1"
-    __associations__ = {}
+    __associations__ = {
+        "triggers": [
+            "unpack.upx"
+        ]
+    }
+
+    def _is_packed(self, evidence):
+        """
+        .. py:function:: _is_packed(self, evidence)
+
+        Uses the block entropy of an evidence as a cheap signal that it may be packed.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the evidence
+        :type evidence: str
+
+        :return: :code:`True` if at least one block of the evidence exceeds the entropy threshold, else :code:`False`
+        :rtype: bool
+        """
+
+        features = _features.compute_file_features(evidence)
+        _log.debug("Evidence <{}> has a maximum block entropy of <{}>.".format(evidence, features["blocks"]["maximum"]))
+
+        return features["blocks"]["maximum"] >= _conf.PACKED_ENTROPY_THRESHOLD
+
+    def _unpack(self, evidence, output_directory):
+        """
+        .. py:function:: _unpack(self, evidence, output_directory)
+
+        Decompresses a UPX-packed evidence using the :code:`upx` binary.
+
+        :param self: current class instance
+        :type self: class
+
+        :param evidence: absolute path to the evidence
+        :type evidence: str
+
+        :param output_directory: absolute path to the directory to unpack the evidence to
+        :type output_directory: str
+
+        :return: absolute path to the unpacked evidence, :code:`None` on failure
+        :rtype: str
+        """
+
+        target = os.path.join(output_directory, os.path.basename(evidence))
+
+        if os.path.exists(target):
+            target = "{}.{}".format(target, len(os.listdir(output_directory)))
+
+        try:
+            subprocess.run([self.binary, "-d", "-q", "-o", target, evidence], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+
+        except subprocess.CalledProcessError as exc:
+            _log.debug("Evidence <{}> could not be unpacked: {}.".format(evidence, exc.stderr.decode("utf-8", "backslashreplace").strip()))
+            return None
+
+        return target
 
     def run(self):
         """
@@ -23,6 +89,26 @@ class Pre(_models.Pre):
 
         :param self: current class instance
         :type self: class
+
+        :return: absolute path to the evidence or tuple containing the absolute path to the unpacked evidence and its parent
+        :rtype: str
         """
 
-        print("Unimplemented.")
+        self.binary = shutil.which("upx")
+
+        if not self.binary:
+            _log.warning("Binary <upx> not found in PATH. Packed evidence(s) will be scanned as is.")
+
+        tmp = self.case.require_temporary_directory()
+
+        for evidence in self.feed:
+            yield evidence
+
+            if not self.binary or not self._is_packed(evidence):
+                continue
+
+            unpacked = self._unpack(evidence, tmp)
+
+            if unpacked:
+                _log.debug("Unpacked evidence <{}> to <{}>.".format(evidence, unpacked))
+                yield unpacked, evidence
@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
 
-from framework.api.external import filesystem as _fs
 from framework.api.internal import interaction as _interaction
+from framework.api.internal import parser as _parser
 
 from framework.contexts import models as _models
 from framework.contexts.configuration import Configuration as _conf
 from framework.contexts.logger import Logger as _log
 
-import os.path
-import sys
+import contextlib
+import functools
+import io
+import itertools
+import os
+import re
+import struct
 import zipfile
+import zlib
 
 __all__ = [
     "Pre"
@@ -31,22 +37,14 @@ class Pre(_models.Pre):
             "application/zip",
             "application/zip-compressed",
             "application/x-zip-compressed"
+        ],
+        "triggers": [
+            "inflate.jar",
+            "inflate.zip"
         ]
     }
 
     def __init__(self, parser):
-        parser.add_argument(
-            "--level", type=int, choices=range(101), default=10, metavar="NUMBER", dest="_level", 
-            help="maximum number of level(s) to unpack [10]")
-
-        parser.add_argument(
-            "--include", nargs="+", default=_conf.DEFAULTS["INCLUSION_FILTERS"], metavar="FILTER", dest="_include", 
-            help="only add file(s) matching wildcard filter(s) {}".format(_conf.DEFAULTS["INCLUSION_FILTERS"]))
-
-        parser.add_argument(
-            "--exclude", nargs="+", default=_conf.DEFAULTS["EXCLUSION_FILTERS"], metavar="FILTER", dest="_exclude", 
-            help="override include and ignore file(s) matching wildcard filter(s)".format(_conf.DEFAULTS["EXCLUSION_FILTERS"]))
-
         parser.add_argument(
             "--inline-password", metavar="PASSWORD", dest="_inline_password", 
             help="specify an inline password to open the archive(s)")
@@ -56,82 +54,358 @@ class Pre(_models.Pre):
             help="ask for a password to open the archive(s)")
 
         parser.add_argument(
-            "--no-recursion", action="store_true", dest="_no_recursion", 
-            help="do not unpack archive(s) and walk through directory(ies) recursively")
+            "--password-list", action=_parser.AbsolutePath, metavar="PATH", dest="_password_list",
+            help="path to a file containing one candidate password per line to try against encrypted archive(s)")
+
+        parser.add_argument(
+            "--max-member-size", type=int, default=_conf.ZIP_MAX_MEMBER_SIZE, metavar="BYTES", dest="_max_member_size",
+            help="skip member(s) whose uncompressed size exceeds this limit without inflating them [{}]".format(_conf.ZIP_MAX_MEMBER_SIZE))
+
+    def _filter_member(self, member, password=None):
+        """
+        .. py:function:: _filter_member(self, member, password=None)
+
+        Decides from the central directory entry of a member, before inflating anything, whether it must be processed.
+
+        :param self: current class instance
+        :type self: class
+
+        :param member: :code:`zipfile.ZipInfo` instance
+        :type member: class
+
+        :param password: password used to open the archive
+        :type password: str
 
-    def recursive_inflate(self, archive, output_directory, level=0, password=None):
-        if level > self.case.arguments._level:
-            _log.warning("Limit unpacking level <{}> exceeded. Stopped unpacking.".format(self.case.arguments._level))
-            return
+        :return: reason for skipping the member, :code:`None` if it must be processed
+        :rtype: str
+        """
+
+        if member.is_dir():
+            return "directory"
+
+        if member.file_size > self.case.arguments._max_member_size:
+            return "size"
+
+        if member.flag_bits & 0x1 and not password:
+            return "encrypted"
+
+        return None
+
+    @staticmethod
+    def _read_member(source, member):
+        """
+        .. py:function:: _read_member(source, member)
+
+        Reads the raw (i.e. still encrypted and compressed) data of a single member, without its local file header.
+
+        :param source: absolute path to the archive or file-like object containing it
+        :type source: str
 
-        _log.debug("Inflating {}archive <{}> to temporary directory <{}>.".format("level {} sub".format(level) if level else "base ", archive, output_directory))
+        :param member: :code:`zipfile.ZipInfo` instance of the member
+        :type member: class
 
-        sub_directory = os.path.join(output_directory, os.path.basename(archive))
+        :return: raw data of the member
+        :rtype: bytes
+        """
+
+        with contextlib.ExitStack() as stack:
+            file = (stack.enter_context(open(source, "rb")) if isinstance(source, str) else source)
+            position = file.tell()
+
+            try:
+                file.seek(member.header_offset)
+                header = file.read(30)
+
+                if len(header) != 30 or header[:4] != b"PK\x03\x04":
+                    raise zipfile.BadZipFile("bad local file header")
+
+                file.seek(sum(struct.unpack("<HH", header[26:30])), io.SEEK_CUR)
+                return file.read(member.compress_size)
+
+            finally:
+                file.seek(position)
+
+    @staticmethod
+    def _try_passwords(data, member, candidates):
+        """
+        .. py:function:: _try_passwords(data, member, candidates)
+
+        Tries candidate password(s) against the raw data of a single encrypted member.
+
+        The member is read entirely so that its CRC32 is checked, weeding out the false positive(s) of the ZipCrypto header check.
+
+        :param data: raw data of the member, as returned by :code:`_read_member`
+        :type data: bytes
+
+        :param member: :code:`zipfile.ZipInfo` instance of the member
+        :type member: class
+
+        :param candidates: list of candidate password(s)
+        :type candidates: list
+
+        :return: first working password, :code:`None` if none worked
+        :rtype: str
+        """
+
+        for candidate in candidates:
+            try:
+                with zipfile.ZipExtFile(io.BytesIO(data), "r", member, candidate.encode()) as stream:
+                    while stream.read(65536):
+                        pass
+
+                return candidate
+
+            except (
+                EOFError,
+                NotImplementedError,
+                RuntimeError,
+                zipfile.BadZipFile,
+                zlib.error):
+
+                continue
+
+        return None
+
+    @staticmethod
+    def _try_spilled_passwords(path, member, candidates):
+        """
+        .. py:function:: _try_spilled_passwords(path, member, candidates)
+
+        Tries candidate password(s) against an encrypted member spilled to disk, meant to be mapped to concurrent process(es).
+
+        The spilled member is removed as soon as a password is found, so that the chunk(s) still pending return right away.
+
+        :param path: absolute path to the raw data of the member
+        :type path: str
+
+        :param member: :code:`zipfile.ZipInfo` instance of the member
+        :type member: class
+
+        :param candidates: list of candidate password(s)
+        :type candidates: list
+
+        :return: first working password, :code:`None` if none worked
+        :rtype: str
+        """
 
         try:
-            with zipfile.ZipFile(archive) as z:
-                z.extractall(path=sub_directory, pwd=(password.encode() if password else password))
+            with open(path, "rb") as file:
+                data = file.read()
 
-        except zipfile.BadZipFile:
-            _log.error("Bad file header. Cannot inflate evidence <{}>. Try to filter out non-zip file(s) using --include \"*.zip\" \".*.zip\".".format(archive))
-            return
+        except FileNotFoundError:
+            return None
+
+        return Pre._try_passwords(data, member, candidates)
+
+    def _find_password(self, source, member, candidates):
+        """
+        .. py:function:: _find_password(self, source, member, candidates)
 
-        except RuntimeError as exc:
-            if "password required" in str(exc):
-                _log.error("Archive <{}> seems to be encrypted. Please specify a password using --password or --inline-password.".format(archive))
+        Looks for the password of an archive among the candidate(s), splitting large candidate list(s) across the concurrent process(es) of the case-wide pool.
 
-            elif "Bad password" in str(exc):
-                _log.error("Password {}seems to be incorrect for archive <{}>. Please specify another password using --password or --inline-password.".format("<{}> ".format(self.case.arguments._inline_password) if not hasattr(self, "_password") else "", archive))
+        Only the raw data of the target member is handed over to the concurrent process(es), spilled once to the temporary directory so that task(s) only carry its path.
 
-            else:
-                _log.exception("Runtime exception raised while unpacking archive <{}>.".format(archive))
+        :param self: current class instance
+        :type self: class
 
-            return
+        :param source: absolute path to the archive or file-like object containing it
+        :type source: str
 
-        except KeyboardInterrupt:
-            sys.stderr.write("\n")
-            _log.fault("Aborted due to manual user interruption.")
+        :param member: :code:`zipfile.ZipInfo` instance of the encrypted member to try the candidate(s) against
+        :type member: class
 
-        except Exception:
-            _log.exception("Exception raised while unpacking archive <{}>.".format(archive))
+        :param candidates: list of candidate password(s)
+        :type candidates: list
 
-        if self.case.arguments._no_recursion:
-            return
+        :return: first working password, :code:`None` if none worked
+        :rtype: str
+        """
 
-        for subarchive in _fs.enumerate_matching_files(sub_directory, 
-            wildcard_patterns=(["*.{}".format(_) for _ in self.__associations__["extensions"]] + [".*.{}".format(_) for _ in self.__associations__["extensions"]] if hasattr(self, "__associations__") and "extensions" in self.__associations__ else None), 
-            mime_types=(self.__associations__["mime"] if hasattr(self, "__associations__") and "mime" in self.__associations__ else None), 
-            recursive=True):
+        data = Pre._read_member(source, member)
+        size = _conf.ZIP_PASSWORD_CHUNK_SIZE
 
-            self.recursive_inflate(subarchive, sub_directory, level=(level + 1), password=password)
+        if len(candidates) <= size:
+            return Pre._try_passwords(data, member, candidates)
 
-    def run(self):
+        if not self.tmp:
+            self.tmp = self.case.require_temporary_directory()
+
+        chunks = [candidates[index:index + size] for index in range(0, len(candidates), size)]
+        path = os.path.join(self.tmp, "{}.member".format(next(self.counter)))
+
+        with open(path, "wb") as file:
+            file.write(data)
+
+        try:
+            for password in self.case.pool.imap(functools.partial(Pre._try_spilled_passwords, path, member), chunks):
+                if password is not None:
+                    return password
+
+        finally:
+            os.remove(path)
+
+        return None
+
+    def _resolve_password(self, archive, source, identifier):
         """
-        .. py:function:: run(self)
+        .. py:function:: _resolve_password(self, archive, source, identifier)
 
-        Main entry point for the module.
+        Resolves the password of an encrypted archive, trying the password cached for its family first, then the candidate list.
+
+        Archives belong to the same family when their name only differs by digit(s) (e.g. :code:`sample_01.zip` and :code:`sample_02.zip`).
+
+        AES-encrypted member(s) (compression method 99) cannot be opened by :code:`zipfile` and are never used as the target member.
 
         :param self: current class instance
         :type self: class
+
+        :param archive: :code:`zipfile.ZipFile` instance
+        :type archive: class
+
+        :param source: absolute path to the archive or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the archive
+        :type identifier: str
+
+        :return: password to use, :code:`None` if the archive is not encrypted or no password is available
+        :rtype: str
         """
 
-        if self.case.arguments._inline_password:
-            _log.debug("Using inline password <{}> to unpack archive(s).".format(self.case.arguments._inline_password))
+        encrypted = [member for member in archive.infolist() if member.flag_bits & 0x1 and not member.is_dir()]
+
+        if not encrypted or not self.candidates:
+            return self.password
+
+        family = re.sub(r"\d+", "", os.path.basename(identifier.split(_conf.ARTIFACT_SEPARATOR)[-1]))
+        candidates = list(dict.fromkeys(candidate for candidate in [self.families.get(family), self.password] + self.candidates if candidate is not None))
+
+        supported = [member for member in encrypted if member.compress_type != 99]
+
+        if not supported:
+            _log.warning("Archive <{}> only contains AES-encrypted member(s), which are not supported.".format(identifier))
+            return self.password
+
+        member = min(supported, key=lambda member: member.compress_size)
+
+        try:
+            password = self._find_password(source, member, candidates)
+
+        except (OSError, zipfile.BadZipFile) as exc:
+            _log.error("Failed to read encrypted member <{}> of archive <{}> ({}).".format(member.filename, identifier, exc))
+            return self.password
+
+        if password is None:
+            _log.error("None of the <{}> candidate password(s) opened archive <{}>.".format(len(candidates), identifier))
+            return self.password
+
+        if self.families.get(family) != password:
+            _log.info("Found password <{}> for archive <{}>. Caching it for archive family <{}>.".format(password, identifier, family))
+            self.families[family] = password
+
+        return password
+
+    def setup(self):
+        """
+        .. py:function:: setup(self)
+
+        Resolves the password and the candidate password list used to open encrypted archive(s).
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        self.password = self.case.arguments._inline_password
+
+        if self.password:
+            _log.debug("Using inline password <{}> to unpack archive(s).".format(self.password))
 
         elif self.case.arguments._password:
-            self._password = _interaction.password_prompt("Unpacking password: ")
+            self.password = _interaction.password_prompt("Unpacking password: ")
 
-        if self.case.arguments._no_recursion:
-            _log.debug("Recursive unpacking manually disabled using --no-recursion.")
+        self.candidates = []
+        self.families = {}
+        self.counter = itertools.count()
+        self.tmp = None
 
-        tmp = self.case.require_temporary_directory()
+        if self.case.arguments._password_list:
+            with open(self.case.arguments._password_list, encoding="utf-8", errors="replace") as file:
+                self.candidates = list(dict.fromkeys(line.rstrip("\r\n") for line in file if line.rstrip("\r\n")))
 
-        for evidence in self.feed:
-            self.recursive_inflate(evidence, tmp, password=(self.case.arguments._inline_password if not hasattr(self, "_password") else self._password))
+            _log.debug("Loaded <{}> candidate password(s) from <{}>.".format(len(self.candidates), self.case.arguments._password_list))
+
+    def extract(self, source, identifier):
+        """
+        .. py:function:: extract(self, source, identifier)
+
+        Walks through the member(s) of a ZIP archive without extracting it to disk, member(s) being only inflated if the framework reads them.
+
+        :param self: current class instance
+        :type self: class
+
+        :param source: absolute path to the archive or file-like object containing it
+        :type source: str
+
+        :param identifier: identifier of the archive
+        :type identifier: str
+
+        :return: generator yielding a :code:`models.Artifact` instance for every member
+        :rtype: generator
+        """
+
+        try:
+            with zipfile.ZipFile(source) as z:
+                password = self._resolve_password(z, source, identifier)
+
+                if password:
+                    z.setpassword(password.encode())
+
+                for member in z.infolist():
+                    reason = self._filter_member(member, password)
+
+                    if not reason:
+                        try:
+                            stream = z.open(member)
+
+                        except RuntimeError as exc:
+                            if "Bad password" in str(exc):
+                                _log.error("Password {}seems to be incorrect for member <{}> of archive <{}>. Please specify another password using --password, --inline-password or --password-list.".format("<{}> ".format(password) if self.case.arguments._inline_password else "", member.filename, identifier))
+
+                            reason = "encrypted"
+
+                        except (
+                            NotImplementedError,
+                            zipfile.BadZipFile) as exc:
 
-        for evidence in _fs.expand_files([tmp],
-            recursive=True, 
-            include=self.case.arguments._include, 
-            exclude=self.case.arguments._exclude):
+                            _log.debug("Cannot open member <{}> of archive <{}>: {}.".format(member.filename, identifier, exc))
+                            reason = "corrupted"
+
+                    if reason:
+                        self.case.dispatcher.skip(reason, "{}{}{}".format(identifier, _conf.ARTIFACT_SEPARATOR, member.filename))
+                        continue
+
+                    yield _models.Artifact(
+                        member.filename,
+                        stream,
+                        size=member.file_size,
+                        compressed=member.compress_size,
+                        fingerprint=(member.CRC, member.file_size))
+
+        except zipfile.BadZipFile:
+            _log.error("Bad file header. Cannot inflate evidence <{}>. Try to filter out non-zip file(s) using --include \"*.zip\" \".*.zip\".".format(identifier))
+
+    def run(self):
+        """
+        .. py:function:: run(self)
+
+        Main entry point for the module.
+
+        :param self: current class instance
+        :type self: class
+        """
+
+        for evidence in self.feed:
+            self.walk(evidence, evidence)
 
-            print("found {}".format(evidence))
+        if self.case.dispatcher.skipped.get("encrypted"):
+            _log.warning("Skipped <{}> encrypted member(s). Please specify a password using --password, --inline-password or --password-list.".format(self.case.dispatcher.skipped["encrypted"]))
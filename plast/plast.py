@@ -12,6 +12,7 @@ from framework.api.internal import interaction as _interaction
 from framework.api.internal import magic as _magic
 from framework.api.internal import parser as _parser
 from framework.api.internal.checker import Checker as _checker
+from framework.api.internal.identifier import Identifier as _identifier
 from framework.api.internal.loader import Loader as _loader
 
 from framework.contexts import case as _case
@@ -19,6 +20,7 @@ from framework.contexts import errors as _errors
 from framework.contexts import models as _models
 from framework.contexts.logger import Logger as _log
 
+from framework.core import dispatcher as _dispatcher
 from framework.core import engine as _engine
 
 import framework.modules.callback as _callback
@@ -26,42 +28,50 @@ import framework.modules.pre as _pre
 import framework.modules.post as _post
 
 import argparse
+import concurrent.futures
 import multiprocessing
 import os.path
+import types
 
 __all__ = [
     "main"
 ]
 
-def _find_association(modules, meta):
+def _invoke_module(Module, case, feed):
     """
-    .. py:function:: _find_association(modules, meta)
+    .. py:function:: _invoke_module(Module, case, feed)
 
-    Finds association(s) to :code:`meta` in the available preprocessing module(s).
+    Runs a preprocessing module, tracking the artifact(s) it yields if its :code:`run` method is a generator.
 
-    :param modules: dictionary containing the loaded module(s)
-    :type modules: dictionary
+    Yielded artifact(s) are either absolute path(s) or tuple(s) containing an absolute path and the identifier of its parent.
 
-    :param meta: object containing metadata for the target file
-    :type meta: class
+    :param Module: loaded preprocessing module
+    :type Module: class
 
-    :return: tuple containing the name of the associated module and actual module object
-    :rtype: tuple
+    :param case: preloaded Case class
+    :type case: class
 
-    :raises UnsupportedType: if :code:`meta` cannot be handled by the available preprocessing module(s)
+    :param feed: list of evidence(s) to feed the module with
+    :type feed: list
     """
 
-    for name, Module in modules.items():
-        if hasattr(Module, "__associations__") and (meta.mime in Module.__associations__.get("mime", []) or meta.extension in Module.__associations__.get("extensions", [])):
-            return name, Module
+    case.dispatcher.prepare(Module)
+    Module.feed = feed
 
-    raise _errors.UnsupportedType
+    with _magic.Invocator(Module):
+        artifacts = Module.run()
+
+        if isinstance(artifacts, types.GeneratorType):
+            for artifact in artifacts:
+                case.track_file(*((artifact,) if isinstance(artifact, str) else artifact))
 
 def _dispatch_preprocessing(modules, case, feed):
     """
     .. py:function:: _dispatch_preprocessing(container, case, feed)
 
-    Guessing function that dispatches preprocessing using MIME-types.
+    Guessing function that dispatches preprocessing using the bundled signature(s) and MIME-types, identification being mapped to the concurrent process(es) of the case-wide pool.
+
+    Independent preprocessing module(s) run concurrently in separate thread(s) while the engine scans the artifact(s) they track.
 
     :param modules: dictionary containing the loaded module(s)
     :type modules: dictionary
@@ -74,35 +84,48 @@ def _dispatch_preprocessing(modules, case, feed):
     """
 
     tasks = {}
+    unknown = 0
 
-    for file in feed:
-        meta = _fs.guess_file_type(file)
+    chunks = [feed[offset:offset + _conf.IDENTIFICATION_CHUNK_SIZE] for offset in range(0, len(feed), _conf.IDENTIFICATION_CHUNK_SIZE)]
 
-        if not meta:
-            tasks.setdefault(("raw", modules["raw"]), []).append(file)
-            _log.warning("Could not determine data type. Added evidence <{}> to the force-feeding list.".format(file))
-            continue
+    for chunk in case.pool.imap_unordered(_identifier.identify_evidences, chunks):
+        for file, meta in chunk:
+            if not meta:
+                tasks.setdefault("raw", []).append(file)
+                unknown += 1
 
-        try:
-            name, Module = _find_association(modules, meta)
+                _log.debug("Could not determine data type. Added evidence <{}> to the force-feeding list.".format(file))
+                continue
+
+            try:
+                name = _dispatcher.Dispatcher.find_association(case.dispatcher.index, meta)
+
+                tasks.setdefault(name, []).append(file)
+                _log.debug("Identified data type <{}> for evidence <{}>. Dispatching to <{}>.".format(meta.trigger or meta.mime, file, name))
+
+            except _errors.UnsupportedType:
+                tasks.setdefault("raw", []).append(file)
+                unknown += 1
 
-            tasks.setdefault((name, Module), []).append(file)
-            _log.debug("Identified data type <{}> for evidence <{}>. Dispatching to <{}>.".format(meta.mime, file, name))
+                _log.debug("Data type <{}> unsupported. Added evidence <{}> to the force-feeding list.".format(meta.mime, file))
 
-        except _errors.UnsupportedType:
-            tasks.setdefault(("raw", modules["raw"]), []).append(file)
-            _log.warning("Data type <{}> unsupported. Added evidence <{}> to the force-feeding list.".format(meta.mime, file))
+    if unknown:
+        _log.warning("Could not determine a supported data type for <{}> evidence(s). Added evidence(s) to the force-feeding list.".format(unknown))
 
-    if tasks:
-        for (name, Module), partial_feed in tasks.items():
-            if _interaction.prompt("Found <{}> evidence(s) that can be dispatched. Do you want to automatically invoke the <{}> module using default option(s)?".format(len(partial_feed), name), default_state=True):
-                Module.case = case
-                Module.feed = partial_feed
+    selected = {name: partial_feed for name, partial_feed in tasks.items() if _interaction.prompt("Found <{}> evidence(s) that can be dispatched. Do you want to automatically invoke the <{}> module using default option(s)?".format(len(partial_feed), name), default_state=True)}
 
-                with _magic.Hole(Exception, action=lambda:_log.fault("Fatal exception raised within preprocessing module <{}>.".format(name), post_mortem=True)), _magic.Invocator(Module):
-                    Module.run()
+    if not selected:
+        return
 
-                del Module
+    for name in selected:
+        case.dispatcher.prepare(modules[name])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        futures = {executor.submit(_invoke_module, modules[name], case, partial_feed): name for name, partial_feed in selected.items()}
+
+        for future in concurrent.futures.as_completed(futures):
+            with _magic.Hole(Exception, action=lambda:_log.fault("Fatal exception raised within preprocessing module <{}>.".format(futures[future]), post_mortem=True)):
+                future.result()
 
 def _argparser(parser):
     """
@@ -127,6 +150,18 @@ def _argparser(parser):
         "-o", "--output", required=True, action=_parser.AbsolutePath, metavar="PATH",
         help="path to the output directory to be created for the current case")
 
+    parser.add_argument(
+        "--callback-executor", choices=["inline", "thread", "process"], default=_conf.DEFAULTS["CALLBACK_EXECUTOR"],
+        help="run the callback(s) in the scanning thread, in a dedicated thread of each scanning process or in a single dedicated process [{}]".format(_conf.DEFAULTS["CALLBACK_EXECUTOR"]))
+
+    parser.add_argument(
+        "--callback-overflow", choices=["block", "drop", "spill"], default=_conf.DEFAULTS["CALLBACK_OVERFLOW"],
+        help="behavior when the callback queue is full: wait for a free slot, drop the match(es) or spill them to disk [{}]".format(_conf.DEFAULTS["CALLBACK_OVERFLOW"]))
+
+    parser.add_argument(
+        "--callback-queue-size", type=int, choices=range(1, 100001), default=_conf.DEFAULTS["CALLBACK_QUEUE_SIZE"], metavar="NUMBER",
+        help="maximum number of match batch(es) waiting for the callback(s) [{}]".format(_conf.DEFAULTS["CALLBACK_QUEUE_SIZE"]))
+
     parser.add_argument(
         "--callbacks", nargs="*", choices=_loader.render_modules(_callback, _models.Callback), default=(_loader.render_modules(_callback, _models.Callback) if _conf.INVOKE_ALL_MODULES_IF_NONE_SPECIFIED else []), action=_parser.Unique,
         help="select the callback(s) that will handle the resulting data [*]")
@@ -139,6 +174,10 @@ def _argparser(parser):
         "--fast", action="store_true", default=_conf.DEFAULTS["YARA_FAST_MODE"],
         help="enable YARA's fast matching mode")
 
+    parser.add_argument(
+        "--features", action="store_true", default=_conf.DEFAULTS["FEATURES"],
+        help="compute the byte histogram, entropy and block entropy of every evidence and attach them to the match(es)")
+
     parser.add_argument(
         "--format", choices=["json"], default=_conf.DEFAULTS["OUTPUT_FORMAT"].lower(),
         help="output format for detection(s) {}".format(_conf.DEFAULTS["OUTPUT_FORMAT"].lower()))
@@ -160,10 +199,30 @@ def _argparser(parser):
         "--logging", choices=["debug", "info", "warning", "error", "critical", "suppress"], default=_conf.DEFAULTS["LOGGING_LEVEL"].lower(),
         help="override the default console logging level [{}]".format(_conf.DEFAULTS["LOGGING_LEVEL"].lower()))
 
+    parser.add_argument(
+        "--max-depth", type=int, choices=range(101), default=_conf.DEFAULTS["MAX_DEPTH"], metavar="NUMBER",
+        help="maximum nesting level of the container(s) to walk through [{}]".format(_conf.DEFAULTS["MAX_DEPTH"]))
+
+    parser.add_argument(
+        "--max-entries", type=int, default=_conf.DEFAULTS["MAX_ENTRIES"], metavar="NUMBER",
+        help="maximum number of entry(ies) container module(s) may extract case-wide [{}]".format(_conf.DEFAULTS["MAX_ENTRIES"]))
+
+    parser.add_argument(
+        "--max-inflated-size", type=int, default=_conf.DEFAULTS["MAX_INFLATED_SIZE"], metavar="BYTES",
+        help="maximum number of byte(s) container module(s) may inflate case-wide [{}]".format(_conf.DEFAULTS["MAX_INFLATED_SIZE"]))
+
+    parser.add_argument(
+        "--max-ratio", type=int, default=_conf.DEFAULTS["MAX_RATIO"], metavar="NUMBER",
+        help="maximum expansion ratio of a single archive member [{}]".format(_conf.DEFAULTS["MAX_RATIO"]))
+
     parser.add_argument(
         "--max-size", type=int, default=300000000, metavar="BYTES",
         help="maximum size for the evidence(s) [300MB]")
 
+    parser.add_argument(
+        "--no-deduplication", action="store_false", default=_conf.DEFAULTS["ARTIFACT_DEDUPLICATION"], dest="deduplication",
+        help="scan extracted artifact(s) identical to an artifact already processed in the current case")
+
     parser.add_argument(
         "--no-prompt", action="store_true", default=_conf.DEFAULTS["NO_PROMPT"],
         help="always use default answer when prompted")
@@ -176,10 +235,22 @@ def _argparser(parser):
         "--post", nargs="*", choices=_loader.render_modules(_post, _models.Post), default=(_loader.render_modules(_post, _models.Post) if _conf.INVOKE_ALL_MODULES_IF_NONE_SPECIFIED else []), action=_parser.Unique,
         help="select the postprocessing module(s) that will handle the resulting data [*]")
 
+    parser.add_argument(
+        "--prefilter", action="store_true", default=_conf.DEFAULTS["YARA_PREFILTER"],
+        help="only apply full YARA rule(s) to evidence(s) passing a cheap literal prefilter")
+
     parser.add_argument(
         "--processes", type=int, choices=range(1, 1001), default=(multiprocessing.cpu_count() or _conf.DEFAULTS["PROCESSES_FALLBACK"]), metavar="NUMBER",
         help="override the number of concurrent processe(s) [{}]".format(multiprocessing.cpu_count() or (_conf.DEFAULTS["PROCESSES_FALLBACK"] if _conf.DEFAULTS["PROCESSES_FALLBACK"] in range(1, 1001) else 4)))
 
+    parser.add_argument(
+        "--shards", type=int, choices=range(1, 1001), default=_conf.DEFAULTS["YARA_SHARDS"], metavar="NUMBER",
+        help="partition the YARA ruleset(s) across this number of process group(s) instead of loading every rule in every process [{}]".format(_conf.DEFAULTS["YARA_SHARDS"]))
+
+    parser.add_argument(
+        "--spill-threshold", type=int, default=_conf.DEFAULTS["SPILL_THRESHOLD"], metavar="BYTES",
+        help="write extracted artifact(s) larger than this size to disk instead of scanning them in memory [{}]".format(_conf.DEFAULTS["SPILL_THRESHOLD"]))
+
     parser.add_argument(
         "-r", "--recursive", action="store_true", 
         help="walk through directory(ies) recursively")
@@ -192,6 +263,7 @@ def _argparser(parser):
 
         modules[name] = Module(subparser)
         modules[name].__name__ = name
+        modules[name].parser = subparser
 
         with _magic.Hole(argparse.ArgumentError):
             parser.register_help_hook(subparser)
@@ -238,29 +310,39 @@ def _initialize(container):
     if not feed:
         _log.fault("No evidence(s) to process. Quitting.")
 
-    if args._subparser:
-        Module = container[0][args._subparser]
-        Module.case = case
-        Module.feed = feed
+    if case.arguments.fast:
+        _log.warning("Fast mode is enabled. Some strings occurences may be ommited.")
 
-        with _magic.Hole(Exception, action=lambda:_log.fault("Fatal exception raised within preprocessing module <{}>.".format(args._subparser), post_mortem=True)), _magic.Invocator(Module):
-            Module.run()
+    with _magic.Pool(processes=args.processes, initializer=_identifier.load_signatures) as pool:
+        case.pool = pool
 
-        del Module
+        engine = _engine.Engine(case)
+        engine.start()
 
-    else:
-        _log.debug("Guessing data type(s).")
-        _dispatch_preprocessing(modules, case, feed)
+        case.engine = engine
+        case.dispatcher = _dispatcher.Dispatcher(case, modules)
 
-    if not case.resources["evidences"]:
-        _log.fault("No evidence(s) to process. Quitting.")
+        try:
+            if args._subparser:
+                with _magic.Hole(Exception, action=lambda:_log.fault("Fatal exception raised within preprocessing module <{}>.".format(args._subparser), post_mortem=True)):
+                    _invoke_module(modules[args._subparser], case, feed)
 
-    _log.info("Currently tracking <{}> evidence(s).".format(len(case.resources["evidences"])))
+            else:
+                _log.debug("Guessing data type(s).")
+                _dispatch_preprocessing(modules, case, feed)
 
-    if case.arguments.fast:
-        _log.warning("Fast mode is enabled. Some strings occurences may be ommited.")
+            if not case.resources["evidences"] and not case.resources["artifacts"] and not engine.reported:
+                _log.fault("No evidence(s) to process. Quitting.")
+
+        except BaseException:
+            engine.abort()
+            raise
+
+        _log.info("Tracked a total of <{}> evidence(s) and <{}> in-memory artifact(s).".format(len(case.resources["evidences"]), len(case.resources["artifacts"])))
+        case.dispatcher.report()
+        case.budget.report()
 
-    _engine.Engine(case).run()
+    engine.join()
 
 def main():
     """